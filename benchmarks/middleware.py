@@ -0,0 +1,81 @@
+"""
+Requests per second of the API middleware as BaseHTTPMiddleware (i.e. @app.middleware('http')) and as
+pure ASGI middleware, calling the apps in process without a server.
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI
+from starlette.requests import Request
+
+from fas.environment import settings
+from fas.util.database import DBPool
+from fas.util.web import DBMiddleware, HeadersMiddleware
+
+
+async def measure_middleware(requests: int, concurrency: int):
+    async with DBPool(**{**settings.DB, 'min_size': concurrency, 'max_size': concurrency}) as pool:
+        for name, app in (('base http', _create_base_http_middleware_app(pool)),
+                          ('pure asgi', _create_pure_asgi_middleware_app(pool))):
+            for path in ('/', '/db'):
+                started_at = time.perf_counter()
+                await asyncio.gather(*(_call_app(app, path, requests // concurrency) for _ in range(concurrency)))
+                print(f'{name:>12} {path:<4}: {requests / (time.perf_counter() - started_at):8.1f} req/s')
+
+
+def _create_base_http_middleware_app(pool: DBPool) -> FastAPI:
+    app = _create_app()
+
+    @app.middleware('http')
+    async def inject_database_connection_to_request(request: Request, call_next):
+        try:
+            request.state.db = pool.acquire(acquire_timeout=3, release_timeout=3)
+            return await call_next(request)
+        finally:
+            if request.state.db.is_connected:
+                await request.state.db.release()
+
+    @app.middleware('http')
+    async def add_custom_headers(request: Request, call_next):
+        response = await call_next(request)
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+    return app
+
+
+def _create_pure_asgi_middleware_app(pool: DBPool) -> FastAPI:
+    app = _create_app()
+    app.add_middleware(DBMiddleware, pool=pool, acquire_timeout=3, release_timeout=3)
+    app.add_middleware(HeadersMiddleware, headers={'X-Content-Type-Options': 'nosniff'})
+    return app
+
+
+def _create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/')
+    def read_root():
+        return {'Hello': 'World'}
+
+    @app.get('/db')
+    async def read_db(request: Request):
+        return {'Hello': await request.state.db.get_scalar('SELECT 1::INT')}
+
+    return app
+
+
+async def _call_app(app: FastAPI, path: str, requests: int) -> None:
+    scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': path, 'root_path': '',
+             'query_string': b'', 'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 12345),
+             'server': ('localhost', 80)}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start' and message['status'] != 200:
+            raise Exception(f'Failed requesting {path}: status={message["status"]}')
+
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
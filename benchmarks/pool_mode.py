@@ -0,0 +1,59 @@
+"""
+Throughput and connection usage of the session and transaction pool modes, see the task bench.pool-mode.
+"""
+import asyncio
+import time
+from typing import Optional, Dict
+
+import asyncpg
+
+from fas.environment import settings
+from fas.util.database import DBPool
+
+
+class Stats:
+    __slots__ = ('throughput', 'busy_connections', 'peak_connections')
+
+    def __init__(self, throughput: float, busy_connections: float, peak_connections: int) -> None:
+        self.throughput: float = throughput
+        self.busy_connections: float = busy_connections
+        self.peak_connections: int = peak_connections
+
+
+class _CountingDBPool(DBPool):
+    __slots__ = ('connections', 'peak_connections', 'busy_seconds', '_acquired_at')
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.connections: int = 0
+        self.peak_connections: int = 0
+        self.busy_seconds: float = 0
+        self._acquired_at: Dict[asyncpg.Connection, float] = {}
+
+    async def _acquire(self, *, timeout: Optional[float] = None) -> asyncpg.Connection:
+        conn = await super()._acquire(timeout=timeout)
+        self._acquired_at[conn] = time.perf_counter()
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        return conn
+
+    async def _release(self, conn: asyncpg.Connection, *, timeout: Optional[float] = None) -> None:
+        self.busy_seconds += time.perf_counter() - self._acquired_at.pop(conn)
+        self.connections -= 1
+        await super()._release(conn, timeout=timeout)
+
+
+async def measure_pool_mode(mode: str, clients: int, requests: int, pool_size: int, think: float) -> Stats:
+    options = {**settings.DB, 'min_size': pool_size, 'max_size': pool_size, 'mode': mode}
+    async with _CountingDBPool(**options) as pool:
+        async def run_client():
+            for _ in range(requests):
+                async with pool.acquire() as db:
+                    await db.get_scalar('SELECT 1::INT')
+                    await asyncio.sleep(think)
+                    await db.get_scalar('SELECT 2::INT')
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(run_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started_at
+        return Stats(clients * requests / elapsed, pool.busy_seconds / elapsed, pool.peak_connections)
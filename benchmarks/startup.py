@@ -0,0 +1,49 @@
+"""
+Cold start of fresh processes: the wall time of importing a module or running a command,
+and the import-time profile of a module by ``python -X importtime``.
+"""
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Sequence
+
+ROOT_DIR = Path(__file__).parents[1]
+
+
+class ImportTime:
+    __slots__ = ('module', 'self_us', 'cumulative_us')
+
+    def __init__(self, module: str, self_us: int, cumulative_us: int) -> None:
+        self.module: str = module
+        self.self_us: int = self_us  # microseconds importing the module itself
+        self.cumulative_us: int = cumulative_us  # including the modules imported by it for the first time
+
+
+def measure_cold_start(command: Sequence[str], *, repeat: int = 5) -> float:
+    """
+    Run the command in a fresh process ``repeat`` times, return the median seconds
+    """
+    seconds = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        subprocess.run(command, cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - started_at)
+    return statistics.median(seconds)
+
+
+def profile_imports(module: str) -> List[ImportTime]:
+    """
+    Import the module in a fresh interpreter, return the import time of every module imported by it, in import order
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT_DIR, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    import_times = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        import_times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us)))
+    return import_times
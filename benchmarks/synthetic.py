@@ -0,0 +1,217 @@
+"""
+Reproducible synthetic data at production scale, for load tests and benchmarks.
+
+The same seed and scale always generate the same rows, except the salts of the password hashes. The rows of every
+table are generated by a random generator seeded with the seed and the table name, so that changing the scale of
+one table does not change the rows of the other tables. Ids are explicit (from 1 on), and the identity sequences
+are moved past them.
+"""
+import asyncio
+import datetime as dt
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
+from fas.util.database import DBClient, DBPool
+from fas.util.web import hash_password
+
+TABLES = ('organization', 'operator', 'knowledge_base', 'knowledge', 'channel', 'channel_knowledge_base',
+          'channel_event')
+WORDS = ('账户', '密码', '登录', '注册', '订单', '退款', '发票', '快递', '地址', '会员',
+         '积分', '优惠券', '支付', '银行卡', '手机号', '验证码', '客服', '投诉', '售后', '退货',
+         '换货', '价格', '库存', '活动', '预约', '营业时间', '门店', '配送', '保修', '安装')
+ANSWER_TYPES = (1, 2, 3, 4, 5)  # text, image, news, voice and video
+
+
+class Scale:
+    __slots__ = ('organizations', 'operators', 'knowledge_bases', 'knowledge', 'channels', 'events')
+
+    def __init__(self, *, organizations: int = 1000, operators: int = 10, knowledge_bases: int = 3,
+                 knowledge: int = 200, channels: int = 2, events: int = 1000000) -> None:
+        self.organizations: int = organizations
+        self.operators: int = operators  # per organization
+        self.knowledge_bases: int = knowledge_bases  # per organization
+        self.knowledge: int = knowledge  # per knowledge base
+        self.channels: int = channels  # per organization
+        self.events: int = events  # in total
+
+
+async def generate(pool: DBPool, scale: Scale, *, seed: int = 0, passwords: int = 1000, workers: int = 4,
+                   chunk_size: int = 100000) -> None:
+    """
+    Generate the rows of all the tables, which should be empty.
+
+    Operator i (from 1 on) logs on with mobile ``operator_mobile(i)`` and password ``operator_password(i)``.
+    There are at most ``passwords`` distinct passwords, each hashed once, in parallel by ``workers`` processes.
+    Events are generated by the database, in chunks of ``chunk_size`` rows copied by ``workers`` connections.
+    """
+    async with pool.acquire() as db:
+        for table in TABLES:
+            if await db.exists(f'SELECT 1 FROM {table} LIMIT 1'):
+                raise Exception(f'Cannot generate synthetic data: table {table} is not empty')
+        await _timed('organization', _generate_organizations(db, scale, seed))
+        await _timed('operator', _generate_operators(db, scale, seed, passwords, workers))
+        await _timed('knowledge_base', _generate_knowledge_bases(db, scale, seed))
+        await _timed('knowledge', _generate_knowledge(db, scale, seed, chunk_size))
+        await _timed('channel', _generate_channels(db, scale, seed))
+    await _timed('channel_event', _generate_events(pool, scale, seed, workers, chunk_size))
+    async with pool.acquire() as db:
+        for table in ('organization', 'operator', 'knowledge_base', 'knowledge', 'channel'):
+            await db.execute(f"SELECT SETVAL(PG_GET_SERIAL_SEQUENCE('{table}', 'id'), "
+                             f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), FALSE)")
+        await db.execute('ANALYZE')
+
+
+async def _timed(table: str, coro) -> None:
+    started_at = time.monotonic()
+    count = await coro
+    print(f'{table:>24}: {count:>12,} rows in {time.monotonic() - started_at:8.1f} seconds')
+
+
+def operator_mobile(operator_id: int) -> str:
+    return f'1{operator_id:010}'
+
+
+def operator_password(operator_id: int, passwords: int = 1000) -> str:
+    return f'password-{operator_id % passwords}'
+
+
+def _random(seed: int, table: str) -> random.Random:
+    return random.Random(f'{seed}-{table}')
+
+
+async def _generate_organizations(db: DBClient, scale: Scale, seed: int) -> int:
+    rnd = _random(seed, 'organization')
+    records = ((i, f'组织{i}-{rnd.choice(WORDS)}') for i in range(1, scale.organizations + 1))
+    return await db.copy_records('organization', records, columns=('id', 'name'))
+
+
+async def _generate_operators(db: DBClient, scale: Scale, seed: int, passwords: int, workers: int) -> int:
+    rnd = _random(seed, 'operator')
+    operator_count = scale.organizations * scale.operators
+    loop = asyncio.get_event_loop()
+    # argon2 is slow by design, so only the distinct passwords are hashed, in parallel processes
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        password_hashes = await asyncio.gather(*(
+            loop.run_in_executor(executor, hash_password, operator_password(i, passwords))
+            for i in range(min(passwords, operator_count + 1))))
+
+    def iter_records() -> Iterator[Tuple]:
+        for i in range(1, operator_count + 1):
+            organization_id = (i - 1) // scale.operators + 1
+            is_admin = (i - 1) % scale.operators == 0
+            yield (i, organization_id, f'操作员{i}', operator_mobile(i), password_hashes[i % passwords], is_admin,
+                   is_admin or rnd.random() < 0.9)
+
+    return await db.copy_records('operator', iter_records(), columns=(
+        'id', 'organization_id', 'name', 'mobile', 'password_hash', 'is_admin', 'active'))
+
+
+async def _generate_knowledge_bases(db: DBClient, scale: Scale, seed: int) -> int:
+    rnd = _random(seed, 'knowledge_base')
+    records = ((i, (i - 1) // scale.knowledge_bases + 1, f'知识库{i}', rnd.choice((1, 2, 3)))
+               for i in range(1, scale.organizations * scale.knowledge_bases + 1))
+    return await db.copy_records('knowledge_base', records,
+                                 columns=('id', 'organization_id', 'name', 'target_audience'))
+
+
+async def _generate_knowledge(db: DBClient, scale: Scale, seed: int, chunk_size: int) -> int:
+    rnd = _random(seed, 'knowledge')
+    knowledge_count = scale.organizations * scale.knowledge_bases * scale.knowledge
+
+    def iter_records() -> Iterator[Tuple]:
+        for i in range(1, knowledge_count + 1):
+            keywords = rnd.sample(WORDS, rnd.randint(0, 4))
+            question = f'{"".join(keywords) or rnd.choice(WORDS)}怎么办？#{i}'
+            answer_type = rnd.choice(ANSWER_TYPES)
+            yield (i, (i - 1) // scale.knowledge + 1, question, answer_type,
+                   _generate_answer_content(rnd, answer_type, keywords), keywords)
+
+    count = 0
+    records = iter_records()
+    while True:
+        chunk = [record for _, record in zip(range(chunk_size), records)]
+        if not chunk:
+            return count
+        count += await db.copy_records('knowledge', chunk, columns=(
+            'id', 'knowledge_base_id', 'question', 'answer_type', 'answer_content', 'keywords'))
+
+
+def _generate_answer_content(rnd: random.Random, answer_type: int, keywords: List[str]) -> dict:
+    if answer_type == 1:
+        topic = '、'.join(keywords) or '这个问题'
+        return {'content': f'关于{topic}，请参考帮助中心的说明。' * rnd.randint(1, 5)}
+    if answer_type == 3:
+        return {'articles': [{'title': f'{rnd.choice(WORDS)}指南',
+                              'description': f'{rnd.choice(WORDS)}的常见问题',
+                              'pic_url': f'https://example.com/{rnd.getrandbits(64):x}.jpg',
+                              'url': f'https://example.com/articles/{rnd.getrandbits(32)}'}
+                             for _ in range(rnd.randint(1, 3))]}
+    media = {'media_id': f'{rnd.getrandbits(128):032x}'}
+    if answer_type == 5:
+        media.update(title=f'{rnd.choice(WORDS)}演示', description=f'{rnd.choice(WORDS)}的操作步骤')
+    return media
+
+
+async def _generate_channels(db: DBClient, scale: Scale, seed: int) -> int:
+    rnd = _random(seed, 'channel')
+    channel_count = scale.organizations * scale.channels
+    count = await db.copy_records('channel', (
+        (i, (i - 1) // scale.channels + 1, f'渠道{i}') for i in range(1, channel_count + 1)),
+        columns=('id', 'organization_id', 'name'))
+    records = []
+    for i in range(1, channel_count + 1):
+        organization_id = (i - 1) // scale.channels + 1
+        knowledge_base_ids = range((organization_id - 1) * scale.knowledge_bases + 1,
+                                   organization_id * scale.knowledge_bases + 1)
+        records.extend((i, kb_id) for kb_id in rnd.sample(knowledge_base_ids, rnd.randint(1, len(knowledge_base_ids))))
+    await db.copy_records('channel_knowledge_base', records, columns=('channel_id', 'knowledge_base_id'))
+    return count
+
+
+EVENTS_SQL = '''
+    INSERT INTO channel_event (channel_id, inquirer_id, type, detail, occurred_at)
+    SELECT channel_id, 'inquirer-' || (channel_id * 1000 + inquirer_no), type,
+        CASE type
+            WHEN 1 THEN JSONB_BUILD_OBJECT('question', :question_prefix || knowledge_id)
+            ELSE JSONB_BUILD_OBJECT('knowledge_id', knowledge_id)
+        END,
+        CAST(:ended_at AS TIMESTAMPTZ) - seconds_ago * INTERVAL '1 second'
+    FROM (
+        SELECT 1 + FLOOR(RANDOM() * :channel_count)::INT AS channel_id,
+            FLOOR(RANDOM() * 1000)::INT AS inquirer_no,
+            (ARRAY[1, 1, 1, 2, 3])[1 + FLOOR(RANDOM() * 5)::INT]::SMALLINT AS type,
+            1 + FLOOR(RANDOM() * :knowledge_count)::INT AS knowledge_id,
+            FLOOR(RANDOM() * :seconds)::INT AS seconds_ago
+        FROM GENERATE_SERIES(1, :rows)
+    ) AS e
+    '''
+
+
+async def _generate_events(pool: DBPool, scale: Scale, seed: int, workers: int, chunk_size: int) -> int:
+    """
+    Events are generated by the database, which is much faster than generating and copying them from Python.
+    Every chunk is seeded on its own, so the events do not depend on which connection generates which chunk.
+    """
+    knowledge_count = max(1, scale.organizations * scale.knowledge_bases * scale.knowledge)
+    ended_at = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+    chunks = asyncio.Queue()
+    for chunk_no, start in enumerate(range(0, scale.events, chunk_size)):
+        chunks.put_nowait((chunk_no, min(chunk_size, scale.events - start)))
+
+    async def generate_chunks(db: DBClient) -> int:
+        count = 0
+        await db.execute('SET synchronous_commit TO OFF')  # losing the last chunks in a crash does no harm
+        while not chunks.empty():
+            chunk_no, rows = chunks.get_nowait()
+            async with await db.transaction():
+                await db.execute('SELECT SETSEED(:seed)', seed=_random(seed, f'channel_event-{chunk_no}').random())
+                count += await db.execute(EVENTS_SQL, channel_count=scale.organizations * scale.channels,
+                                          knowledge_count=knowledge_count, question_prefix=f'{WORDS[0]}怎么办？#',
+                                          ended_at=ended_at, seconds=365 * 24 * 3600, rows=rows)
+        await db.execute('RESET synchronous_commit')
+        return count
+
+    counts = await pool.gather(*(generate_chunks for _ in range(workers)), max_connections=workers)
+    return sum(counts)
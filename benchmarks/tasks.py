@@ -0,0 +1,145 @@
+import asyncio
+import sys
+import time
+import timeit
+
+from blessings import Terminal
+from invoke import task, Collection
+
+from fas.environment import settings
+from .startup import measure_cold_start, profile_imports
+
+t = Terminal()
+
+
+@task(name='pool-mode')
+def benchmark_pool_mode(c, clients=100, requests=10, pool_size=10, think_ms=20):
+    """
+    Compare throughput and connection usage of session and transaction pool modes
+
+    The pool plays the role of a transaction pooler with ``pool_size`` server connections.
+    Each simulated request runs a query, does ``think_ms`` of non-database work and runs another query,
+    like a typical API request does.
+
+    :param clients: number of concurrent clients
+    :param requests: number of requests per client
+    :param pool_size: number of database connections
+    :param think_ms: milliseconds of non-database work between the queries of a request
+    """
+    from .pool_mode import measure_pool_mode
+
+    for mode in ('session', 'transaction'):
+        stats = asyncio.run(measure_pool_mode(mode, clients, requests, pool_size, think_ms / 1000))
+        print(f'{mode:>12}: {stats.throughput:8.1f} req/s, {stats.busy_connections:5.1f} busy connections on average, '
+              f'peak {stats.peak_connections} of {pool_size} connections for {clients} concurrent clients')
+
+
+@task(name='seed')
+def seed_synthetic_data(c, seed=0, organizations=1000, operators=10, knowledge_bases=3, knowledge=200, channels=2,
+                        events=1000000, passwords=1000, workers=4):
+    """
+    Generate reproducible synthetic data at the given scale into the empty database, for load tests and benchmarks
+    :param seed: the same seed generates the same data
+    :param organizations: number of organizations
+    :param operators: number of operators per organization, the 1st of which is the admin
+    :param knowledge_bases: number of knowledge bases per organization
+    :param knowledge: number of knowledge per knowledge base
+    :param channels: number of channels per organization
+    :param events: number of channel events in total
+    :param passwords: number of distinct operator passwords, each of which is hashed once
+    :param workers: number of processes hashing passwords, and of connections generating events
+    """
+    from .synthetic import Scale
+
+    scale = Scale(organizations=organizations, operators=operators, knowledge_bases=knowledge_bases,
+                  knowledge=knowledge, channels=channels, events=events)
+    print(f'Be about to generate synthetic data into {settings.DB.database}: seed={seed}')
+    started_at = time.monotonic()
+    asyncio.run(_seed_synthetic_data(scale, seed, passwords, workers))
+    print(t.green(f'Generated synthetic data into {settings.DB.database} '
+                  f'in {time.monotonic() - started_at:.1f} seconds'))
+
+
+async def _seed_synthetic_data(scale, seed: int, passwords: int, workers: int):
+    from fas.util.database import DBPool
+    from .synthetic import generate
+
+    options = {**settings.DB, 'min_size': 1, 'max_size': workers + 1, 'fan_out_size': workers}
+    async with DBPool(**options) as pool:
+        await generate(pool, scale, seed=seed, passwords=passwords, workers=workers)
+
+
+@task(name='settings')
+def benchmark_settings(c, number=100000):
+    """
+    Compare reading the settings from dynaconf and from the frozen snapshot, per read and per authenticated request,
+    which reads the cookie secrets to verify the operator cookie
+    :param number: number of reads and requests
+    """
+    from fas.environment import get_settings
+    from fas.util.web import get_secure_cookie
+
+    request = _create_request_with_operator_cookie()
+    for source, read_secret in (('dynaconf', lambda: settings.COOKIE_SECRET),
+                                ('snapshot', lambda: get_settings().cookie_secrets)):
+        read_seconds = timeit.timeit(read_secret, number=number)
+        request_seconds = timeit.timeit(
+            lambda: get_secure_cookie(request, 'op', max_age_days=None, secret=read_secret()), number=number)
+        print(f'{source:>12}: {read_seconds / number * 1e9:8.0f} ns per read, '
+              f'{request_seconds / number * 1e6:8.2f} us per request verifying the cookie')
+
+
+def _create_request_with_operator_cookie():
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from fas.util.web import set_secure_cookie
+
+    response = Response()
+    set_secure_cookie(response, 'op', '1', expires_days=None)
+    cookie = response.headers['set-cookie'].split(';')[0]
+    return Request({'type': 'http', 'headers': [(b'cookie', cookie.encode('latin-1'))]})
+
+
+@task(name='middleware')
+def benchmark_middleware(c, requests=5000, concurrency=10):
+    """
+    Compare requests per second of the API middleware as BaseHTTPMiddleware (i.e. @app.middleware('http')) and as
+    pure ASGI middleware, calling the apps in process without a server, for a response without and with a query
+    :param requests: number of requests per app and path
+    :param concurrency: number of concurrent requests
+    """
+    from .middleware import measure_middleware
+
+    asyncio.run(measure_middleware(requests, concurrency))
+
+
+@task(name='startup')
+def benchmark_startup(c, repeat=5):
+    """
+    Measure the cold start of fresh processes: an API worker importing the app, and invoke listing the tasks and
+    running a task without the database
+    :param repeat: number of runs of every command, whose median is reported
+    """
+    for name, command in (('api worker', [sys.executable, '-c', 'from fas.api import app']),
+                          ('invoke --list', ['invoke', '--list']),
+                          ('invoke task', ['invoke', 'db.migrate', '--help'])):
+        print(f'{name:>16}: {measure_cold_start(command, repeat=repeat) * 1000:8.1f} ms')
+
+
+@task(name='imports')
+def profile_imports_(c, module='fas.api.application', top=20):
+    """
+    Profile the imports of the module in a fresh interpreter, list the modules taking the most time to import
+    :param module: the module to import
+    :param top: number of the modules listed, by the time importing the module itself
+    """
+    import_times = profile_imports(module)
+    print(f'{"self ms":>10} {"cumulative ms":>14}  module')
+    for it in sorted(import_times, key=lambda it: it.self_us, reverse=True)[:top]:
+        print(f'{it.self_us / 1000:10.1f} {it.cumulative_us / 1000:14.1f}  {it.module}')
+    total_ms = sum(it.self_us for it in import_times) / 1000
+    print(t.green(f'Imported {module} with {len(import_times)} modules in {total_ms:.1f} ms'))
+
+
+bench_tasks = Collection('bench', benchmark_pool_mode, seed_synthetic_data, benchmark_settings, benchmark_middleware,
+                         benchmark_startup, profile_imports_)
@@ -0,0 +1,16 @@
+-- 限流数据丢失（如数据库崩溃）无妨，不记WAL以减少写入开销
+CREATE UNLOGGED TABLE throttle_bucket (
+    throttle TEXT NOT NULL,
+    key TEXT NOT NULL,
+    tokens DOUBLE PRECISION NOT NULL,
+    allowed BOOLEAN NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+
+    PRIMARY KEY (throttle, key)
+);
+COMMENT ON TABLE throttle_bucket IS '限流令牌桶：多个进程共享的限流状态';
+COMMENT ON COLUMN throttle_bucket.throttle IS '限流器名称';
+COMMENT ON COLUMN throttle_bucket.key IS '限流键：如组织ID和手机号、客户端地址';
+COMMENT ON COLUMN throttle_bucket.tokens IS '更新时剩余的令牌数';
+COMMENT ON COLUMN throttle_bucket.allowed IS '最近一次尝试是否被允许';
+COMMENT ON COLUMN throttle_bucket.updated_at IS '更新时间';
@@ -0,0 +1,10 @@
+-- 操作员被修改或删除时通知各进程，使其缓存的操作员失效
+CREATE FUNCTION notify_operator_changed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM PG_NOTIFY('operator_changed', OLD.id::TEXT);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER operator_changed AFTER UPDATE OR DELETE ON operator
+    FOR EACH ROW EXECUTE FUNCTION notify_operator_changed();
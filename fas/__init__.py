@@ -1,6 +0,0 @@
-import dynaconf
-
-if dynaconf.settings.DEBUG:
-    import logging
-
-    logging.getLogger(__name__).setLevel(logging.DEBUG)
@@ -0,0 +1,97 @@
+import json
+import logging
+import pathlib
+from typing import Any, Dict, Set, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.openapi.utils import get_openapi
+from fastapi.routing import APIRoute
+from starlette.responses import PlainTextResponse
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from fas.environment import get_settings
+from fas.util.database import DBPool
+from fas.util.web import format_throttle_metrics, DBMiddleware, HeadersMiddleware, CompressionMiddleware
+from . import organization, operator, knowledge
+
+LOGGER = logging.getLogger(__name__)
+OPENAPI_SCHEMA_PATH = pathlib.Path(__file__).parent / 'openapi.json'  # generated at build time by invoke api.openapi
+
+_settings = get_settings()
+_pool: DBPool = DBPool(**_settings.db)
+
+app = FastAPI(debug=True)
+
+
+@app.on_event('startup')
+async def open_database_connection_pool():
+    LOGGER.info(f'Current ENV: {_settings.env.name}')
+    await _pool.open()
+    if _pool.mode == 'session':
+        await operator.listen_to_operator_changes(_pool)
+    else:
+        LOGGER.warning('Operator changes are not listened to in transaction mode, the operator cache relies on ttl')
+
+
+@app.on_event('shutdown')
+async def close_database_connection_pool():
+    await _pool.close()
+
+
+app.add_middleware(DBMiddleware, pool=_pool, acquire_timeout=3, release_timeout=3)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_middleware(HeadersMiddleware, headers={'X-Content-Type-Options': 'nosniff'})
+if _settings.forwarded_allow_ips:
+    # the client of the request, e.g. throttled on login, is the one the trusted proxy forwards for
+    app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=list(_settings.forwarded_allow_ips))
+
+
+@app.get('/')
+def read_root():
+    return {'Hello': 'World'}
+
+
+@app.get('/metrics', include_in_schema=False)
+def read_metrics():
+    if not get_settings().expose_metrics:
+        raise HTTPException(status_code=404)
+    return PlainTextResponse(format_throttle_metrics(), media_type='text/plain; version=0.0.4')
+
+
+app.include_router(operator.router, prefix='/operators', tags=['operators'])
+app.include_router(organization.router, prefix='/organizations', dependencies=[operator.require_auth(is_admin=True)],
+                   tags=['organizations'])
+app.include_router(knowledge.router, prefix='/knowledge-bases', dependencies=[operator.require_auth(is_admin=True)],
+                   tags=['knowledge'])
+
+
+def build_openapi_schema() -> Dict[str, Any]:
+    """
+    Build the OpenAPI schema from the routes, as FastAPI does by the first request of the docs
+    """
+    return get_openapi(title=app.title, version=app.version, openapi_version=app.openapi_version,
+                       description=app.description, routes=app.routes, openapi_prefix=app.openapi_prefix)
+
+
+def load_openapi_schema() -> Dict[str, Any]:
+    """
+    Read the OpenAPI schema generated at build time, failing when it is missing, or stale, i.e. its operations differ
+    from the routes
+    """
+    if not OPENAPI_SCHEMA_PATH.exists():
+        raise Exception(f'OpenAPI schema {OPENAPI_SCHEMA_PATH} not generated, run invoke api.openapi at build time')
+    schema = json.loads(OPENAPI_SCHEMA_PATH.read_bytes())
+    operations = {(path, method) for path, path_item in schema['paths'].items() for method in path_item}
+    if operations != _get_route_operations():
+        raise Exception(f'OpenAPI schema {OPENAPI_SCHEMA_PATH} is stale, run invoke api.openapi again')
+    return schema
+
+
+def _get_route_operations() -> Set[Tuple[str, str]]:
+    return {(route.path_format, method.lower()) for route in app.routes
+            if isinstance(route, APIRoute) and route.include_in_schema for method in route.methods}
+
+
+if not (_settings.env.is_dev or _settings.env.is_test):
+    # read from the file generated at build time, instead of being built from the routes by a worker
+    app.openapi_schema = load_openapi_schema()
@@ -0,0 +1,70 @@
+import io
+import logging
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from fas.model.knowledge import *
+from fas.util.model import Message
+
+LOGGER = logging.getLogger(__name__)
+
+router = APIRouter()
+
+FORMAT_REGEX = f'^({"|".join(KNOWLEDGE_FORMATS)})$'
+MEDIA_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson; charset=utf-8'}
+
+
+class KnowledgeImportResult(BaseModel):
+    inserted: int
+    updated: int
+
+
+@router.post('/{knowledge_base_id}/knowledge/import', response_model=KnowledgeImportResult,
+             responses={404: {'model': Message}, 422: {'model': Message}})
+async def import_(request: Request, knowledge_base_id: int,
+                  knowledge_format: str = Query('csv', alias='format', regex=FORMAT_REGEX)):
+    """
+    Import knowledge from the request body, in CSV (with the header) or NDJSON
+    """
+    await _check_knowledge_base(request, knowledge_base_id)
+    # the body is streamed into a temporary file instead of memory, and then parsed line by line
+    with tempfile.TemporaryFile() as f:
+        async for chunk in request.stream():
+            f.write(chunk)
+        f.seek(0)
+        lines = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+        try:
+            inserted, updated = await import_knowledge(request.state.db, knowledge_base_id, lines, knowledge_format)
+        except (KnowledgeImportError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=422, detail=e.errors if isinstance(e, KnowledgeImportError) else str(e))
+    LOGGER.info(f'Imported knowledge into knowledge base #{knowledge_base_id}: inserted={inserted}, updated={updated}')
+    return KnowledgeImportResult(inserted=inserted, updated=updated)
+
+
+@router.get('/{knowledge_base_id}/knowledge/export', responses={404: {'model': Message}})
+async def export(request: Request, knowledge_base_id: int,
+                 knowledge_format: str = Query('csv', alias='format', regex=FORMAT_REGEX)):
+    """
+    Export knowledge as a stream, in CSV (with the header) or NDJSON
+    """
+    await _check_knowledge_base(request, knowledge_base_id)
+    # the connection of the request is released when the response starts, before the body is streamed
+    pool = request.state.db.pool
+
+    async def iter_lines():
+        async with pool.acquire(acquire_timeout=3, release_timeout=3) as db:
+            async for line in iter_knowledge_lines(db, knowledge_base_id, knowledge_format):
+                yield line.encode('UTF-8')
+
+    return StreamingResponse(iter_lines(), media_type=MEDIA_TYPES[knowledge_format], headers={
+        'Content-Disposition': f'attachment; filename="knowledge-{knowledge_base_id}.{knowledge_format}"'})
+
+
+async def _check_knowledge_base(request: Request, knowledge_base_id: int) -> None:
+    organization_id = await get_knowledge_base_organization_id(request.state.db, knowledge_base_id)
+    if organization_id is None or organization_id != request.state.operator.organization_id:
+        raise HTTPException(status_code=404, detail=f'Knowledge base #{knowledge_base_id} not found')
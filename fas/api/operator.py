@@ -1,14 +1,20 @@
 import logging
-from typing import Optional
+import math
+from typing import Optional, List
 
-from fastapi import APIRouter, HTTPException, Depends, params
+from fastapi import APIRouter, HTTPException, Depends, params, Query
 from pydantic import BaseModel, Schema
 from starlette.requests import Request
 from starlette.responses import Response
 
-from fas.model.operator import get_operator_by_mobile, Operator, get_operator_by_id
-from fas.util.model import Message
-from fas.util.web import get_secure_cookie, set_secure_cookie, delete_cookie, verify_password
+from fas.environment import get_settings
+from fas.model.operator import get_operator_by_mobile, Operator, get_operator_by_id, list_operators_page, \
+    update_operator_password_hash, OPERATOR_CHANGED_CHANNEL
+from fas.util.cache import TTLCache
+from fas.util.database import InvalidCursorError, DBPool
+from fas.util.model import Message, NEXT_CURSOR_HEADER, PAGE_HEADERS
+from fas.util.web import get_secure_cookie, set_secure_cookie, delete_cookie, verify_password_async, \
+    password_needs_rehash, hash_password_async, create_throttle
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,26 +22,51 @@ router = APIRouter()
 
 OPERATOR_COOKIE_NAME = 'op'
 
+# every login attempt costs an argon2 verification, floods are rejected before that
+LOGIN_BY_ACCOUNT_THROTTLE = create_throttle('login_by_account', backend=get_settings().throttle_backend,
+                                            rate=1 / 60, burst=5)
+LOGIN_BY_CLIENT_THROTTLE = create_throttle('login_by_client', backend=get_settings().throttle_backend,
+                                           rate=1, burst=30)
+
+# the operators of authenticated requests, invalidated by the notifications of operator changes,
+# and stale for at most operator_cache_ttl seconds when the notifications are missed
+OPERATOR_CACHE = TTLCache(max_size=get_settings().operator_cache_size, ttl=get_settings().operator_cache_ttl)
+
 
 class OperatorLogin(BaseModel):
     mobile: str = Schema(..., regex=r'^1\d{10}$')
     password: str = Schema(..., min_length=8)
 
 
-@router.post('/login', status_code=204, responses={422: {'model': Message}})
+@router.post('/login', status_code=204, responses={422: {'model': Message}, 429: {'model': Message}})
 async def login(request: Request, response: Response, organization_id: int, ol: OperatorLogin):
+    await _throttle_login(request, organization_id, ol.mobile)
     operator = await get_operator_by_mobile(request.state.db, organization_id, ol.mobile)
     err_reason = None
-    if not operator or not verify_password(operator.password_hash, ol.password):
+    if not operator or not await verify_password_async(operator.password_hash, ol.password):
         err_reason = '手机号或密码不对'
     elif not operator.active:
         err_reason = '账号被禁用'
     if err_reason:
         raise HTTPException(status_code=422, detail=err_reason)
+    if password_needs_rehash(operator.password_hash):
+        # the hashing parameters have changed since the password was hashed, the plain password is only known now
+        await update_operator_password_hash(request.state.db, operator.id, await hash_password_async(ol.password))
+        LOGGER.info(f'Rehashed the password of operator {ol.mobile}@{organization_id}')
     LOGGER.info(f'Operator {ol.mobile}@{organization_id} logged in')
     set_secure_cookie(response, OPERATOR_COOKIE_NAME, str(operator.id), path='/', expires_days=None)
 
 
+async def _throttle_login(request: Request, organization_id: int, mobile: str) -> None:
+    retry_after = await LOGIN_BY_CLIENT_THROTTLE.consume(request.client.host, db=request.state.db)
+    if not retry_after:
+        retry_after = await LOGIN_BY_ACCOUNT_THROTTLE.consume(f'{organization_id}:{mobile}', db=request.state.db)
+    if retry_after:
+        LOGGER.warning(f'Throttled login of operator {mobile}@{organization_id} from {request.client.host}')
+        raise HTTPException(status_code=429, detail='登录尝试过于频繁，请稍后再试',
+                            headers={'Retry-After': str(math.ceil(retry_after))})
+
+
 @router.post('/logout', status_code=204)
 def logout(response: Response):
     delete_cookie(response, OPERATOR_COOKIE_NAME)
@@ -58,7 +89,22 @@ async def get_current_operator(request: Request) -> Optional[Operator]:
     operator_id = get_current_operator_id(request)
     if not operator_id:
         return None
-    return await get_operator_by_id(request.state.db, operator_id)
+    operator = OPERATOR_CACHE.get(operator_id)
+    if operator is None:
+        generation = OPERATOR_CACHE.generation
+        operator = await get_operator_by_id(request.state.db, operator_id)
+        if operator:
+            OPERATOR_CACHE.set(operator_id, operator, generation=generation)
+    return operator
+
+
+async def listen_to_operator_changes(pool: DBPool) -> None:
+    OPERATOR_CACHE.clear()  # changes may have been missed before listening
+
+    def on_operator_changed(payload: str) -> None:
+        OPERATOR_CACHE.delete(int(payload))
+
+    await pool.add_listener(OPERATOR_CHANGED_CHANNEL, on_operator_changed)
 
 
 def require_auth(*, is_admin: bool = False) -> params.Depends:
@@ -79,3 +125,18 @@ class AuthRequiredValidator:
                                 headers={'WWW-Authenticate': '/operators/login'})
         if self.is_admin and not request.state.operator.is_admin:
             raise HTTPException(status_code=403, detail='Permission denied: admin operator required')
+
+
+@router.get('/', response_model=List[Operator], response_model_exclude={'password_hash'},
+            responses={200: {'headers': PAGE_HEADERS}, 422: {'model': Message}},
+            dependencies=[require_auth(is_admin=True)])
+async def list(request: Request, response: Response, limit: int = Query(100, ge=1, le=1000), cursor: str = None):
+    try:
+        operators, next_cursor = await list_operators_page(request.state.db, request.state.operator.organization_id,
+                                                           limit, cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=422, detail=f'Invalid cursor: {cursor}')
+    await request.state.db.release_early()  # up to 1000 operators to serialize
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return operators
@@ -1,21 +1,39 @@
 import logging
 from typing import List
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query
 from starlette.requests import Request
 
 from fas.model.organization import *
-from fas.util.database import UniqueViolationError
-from fas.util.model import ResourceID, Message
+from fas.util.database import UniqueViolationError, InvalidCursorError
+from fas.util.model import ResourceID, Message, NEXT_CURSOR_HEADER, PAGE_HEADERS
+from fas.util.web import entity_response, EntityJSONResponse, make_etag, etag_matches, set_etag, not_modified_response
 
 LOGGER = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get('/', response_model=List[Organization])
-async def list(request: Request):
-    return await list_organizations(request.state.db)
+@router.get('/', response_model=List[Organization],
+            responses={200: {'headers': PAGE_HEADERS}, 304: {'description': 'Not Modified'}, 422: {'model': Message}})
+@entity_response
+async def list(request: Request, limit: int = Query(100, ge=1, le=1000), cursor: str = None):
+    if_none_match = request.headers.get('If-None-Match')
+    try:
+        if if_none_match:
+            # only the ids and the versions of the page are listed to tell whether it is modified
+            etag = make_etag('organizations', await get_organizations_page_version(request.state.db, limit, cursor))
+            if etag_matches(if_none_match, etag):
+                return not_modified_response(etag)
+        organizations, next_cursor, version = await list_versioned_organizations_page(
+            request.state.db, limit, cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=422, detail=f'Invalid cursor: {cursor}')
+    await request.state.db.release_early()  # up to 1000 organizations to serialize
+    response = set_etag(EntityJSONResponse(organizations), make_etag('organizations', version))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
 
 
 @router.post('/', response_model=ResourceID, status_code=201, responses={409: {'model': Message}})
@@ -29,12 +47,20 @@ async def create(request: Request, name: str = Body(..., min_length=2, max_lengt
         raise HTTPException(status_code=409, detail=err_msg)
 
 
-@router.get('/{id}', response_model=Organization, responses={404: {'model': Message}})
+@router.get('/{id}', response_model=Organization,
+            responses={304: {'description': 'Not Modified'}, 404: {'model': Message}})
+@entity_response
 async def get(request: Request, id: int):
-    org = await get_organization(request.state.db, id)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        version = await get_organization_version(request.state.db, id)
+        etag = make_etag('organization', id, version)
+        if version is not None and etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    org, version = await get_versioned_organization(request.state.db, id)
     if not org:
         raise HTTPException(status_code=404, detail=f'Organization #{id} not found')
-    return org
+    return set_etag(EntityJSONResponse(org), make_etag('organization', id, version))
 
 
 @router.put('/{id}', status_code=204, responses={409: {'model': Message}, 404: {'model': Message}})
@@ -1,16 +1,18 @@
 import asyncio
+import json
+import time
+from pathlib import Path
 
 from blessings import Terminal
-from dynaconf import settings
 from invoke import Collection, task
 
-from fas.model.organization import add_organization
+from fas.environment import settings
 from fas.util.console import confirm
-from fas.util.database import DBPool
-from fas.util.web import generate_password
 
 t = Terminal()
 
+# the models, the database client and the app are imported by the tasks using them, not by listing the tasks
+
 
 @task
 def add_org(c, name, admin_name, admin_mobile):
@@ -24,6 +26,8 @@ def add_org(c, name, admin_name, admin_mobile):
                    assume_yes=False):
         print(t.yellow(f'Aborted adding organization {name}'))
         return
+    from fas.util.web import generate_password
+
     admin_password = generate_password(size=8)
     org, admin = asyncio.run(_add_org(name, admin_name, admin_mobile, admin_password))
     print(t.green(f'Added organization: id={org.id}, name={org.name}, admin={admin.name}'))
@@ -31,9 +35,88 @@ def add_org(c, name, admin_name, admin_mobile):
 
 
 async def _add_org(name: str, admin_name: str, admin_mobile: str, admin_password: str):
+    from fas.model.organization import add_organization
+    from fas.util.database import DBPool
+
     async with DBPool(**settings.DB) as pool:
         async with pool.acquire() as db:
             return await add_organization(db, name, admin_name, admin_mobile, admin_password)
 
 
+@task(name='import')
+def import_knowledge_(c, knowledge_base_id, from_file, file_format=None):
+    """
+    Import knowledge into the knowledge base, insert new questions and update the existing ones
+    :param knowledge_base_id: id of the knowledge base
+    :param from_file: CSV (with the header: question,answer_type,answer_content,keywords) or NDJSON file
+    :param file_format: csv or ndjson, defaults to the suffix of the file
+    """
+    from fas.model.knowledge import KnowledgeImportError
+
+    from_file = Path(from_file)
+    file_format = file_format or from_file.suffix.lstrip('.')
+    started_at = time.monotonic()
+    try:
+        inserted, updated = asyncio.run(_import_knowledge(int(knowledge_base_id), from_file, file_format))
+    except KnowledgeImportError as e:
+        for error in e.errors:
+            print(t.red(error))
+        print(t.yellow(f'Did not import knowledge from {from_file}: {len(e.errors)} invalid knowledge'))
+        return
+    print(t.green(f'Imported knowledge into knowledge base #{knowledge_base_id} from {from_file}: '
+                  f'inserted {inserted}, updated {updated} in {time.monotonic() - started_at:.1f} seconds'))
+
+
+async def _import_knowledge(knowledge_base_id: int, from_file: Path, file_format: str):
+    from fas.model.knowledge import import_knowledge
+    from fas.util.database import DBPool
+
+    async with DBPool(**settings.DB) as pool:
+        async with pool.acquire() as db:
+            with from_file.open(encoding='utf-8-sig', newline='') as f:
+                return await import_knowledge(db, knowledge_base_id, f, file_format)
+
+
+@task(name='export')
+def export_knowledge(c, knowledge_base_id, to_file, file_format=None):
+    """
+    Export knowledge of the knowledge base, which can be imported again
+    :param knowledge_base_id: id of the knowledge base
+    :param to_file: CSV or NDJSON file
+    :param file_format: csv or ndjson, defaults to the suffix of the file
+    """
+    to_file = Path(to_file)
+    file_format = file_format or to_file.suffix.lstrip('.')
+    started_at = time.monotonic()
+    asyncio.run(_export_knowledge(int(knowledge_base_id), to_file, file_format))
+    print(t.green(f'Exported knowledge of knowledge base #{knowledge_base_id} to {to_file} '
+                  f'in {time.monotonic() - started_at:.1f} seconds'))
+
+
+async def _export_knowledge(knowledge_base_id: int, to_file: Path, file_format: str):
+    from fas.model.knowledge import iter_knowledge_lines
+    from fas.util.database import DBPool
+
+    async with DBPool(**settings.DB) as pool:
+        async with pool.acquire() as db:
+            with to_file.open('w', encoding='UTF-8', newline='') as f:
+                async for line in iter_knowledge_lines(db, knowledge_base_id, file_format):
+                    f.write(line)
+
+
+@task(name='openapi')
+def generate_openapi_schema(c):
+    """
+    Generate the OpenAPI schema into fas/api/openapi.json at build time, which the API serves outside dev and test,
+    instead of building it from the routes at runtime
+    """
+    from .application import OPENAPI_SCHEMA_PATH, build_openapi_schema
+
+    schema = build_openapi_schema()
+    OPENAPI_SCHEMA_PATH.write_text(json.dumps(schema, ensure_ascii=False, separators=(',', ':')), encoding='UTF-8')
+    print(t.green(f'Generated OpenAPI schema {OPENAPI_SCHEMA_PATH}: {len(schema["paths"])} paths'))
+
+
 op_tasks = Collection('op', add_org)
+kb_tasks = Collection('kb', import_knowledge_, export_knowledge)
+api_tasks = Collection('api', generate_openapi_schema)
@@ -1,14 +1,29 @@
+import logging
 import os
 import pathlib
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
 
-import dynaconf
+from dynaconf import LazySettings
+
+# the settings are in TOML only, otherwise dynaconf looks for ~20 files of every format when loading the settings,
+# inspecting the call stack for every file, which is slow once many modules are imported.
+# Imported instead of `dynaconf.settings`, which still looks for all of them
+settings = LazySettings(SETTINGS_FILE_FOR_DYNACONF='settings.toml,.secrets.toml')
 
 
 class Environment:
-    def __init__(self, name: str, root_dir: pathlib.Path = None) -> None:
-        self.name = name.lower()
+    def __init__(self, name: str = None, root_dir: pathlib.Path = None) -> None:
+        self._name = name.lower() if name else None
         self.root_dir = root_dir or pathlib.Path(os.path.abspath(__file__)).parents[1]
 
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            # the settings are loaded by the first use of the name, not by importing this module
+            self._name = settings.ENV_FOR_DYNACONF.lower()
+        return self._name
+
     @property
     def is_dev(self):
         return self.name in {'dev', 'development'}
@@ -34,4 +49,70 @@ class Environment:
         return hash(self.name)
 
 
-ENV = Environment(dynaconf.settings.ENV_FOR_DYNACONF)
+ENV = Environment()
+
+
+class Settings:
+    """
+    Immutable snapshot of the settings, read by hot code instead of `settings`,
+    whose every attribute access is lazy loaded, merged and validated.
+    Built once by `get_settings`, and rebuilt only by `reload_settings`.
+    """
+    __slots__ = ('env', 'debug', 'db', 'cookie_secrets', 'throttle_backend', 'operator_cache_size',
+                 'operator_cache_ttl', 'expose_metrics', 'forwarded_allow_ips')
+
+    def __init__(self, *, env: Environment, debug: bool, db: Mapping[str, Any], cookie_secrets: Tuple[str, ...],
+                 throttle_backend: str, operator_cache_size: int, operator_cache_ttl: float,
+                 expose_metrics: bool, forwarded_allow_ips: Tuple[str, ...]) -> None:
+        set_ = super().__setattr__
+        set_('env', env)
+        set_('debug', debug)
+        set_('db', MappingProxyType(dict(db)))  # options of DBPool
+        set_('cookie_secrets', cookie_secrets)  # newest first
+        set_('throttle_backend', throttle_backend)
+        set_('operator_cache_size', operator_cache_size)
+        set_('operator_cache_ttl', operator_cache_ttl)
+        set_('expose_metrics', expose_metrics)  # whether /metrics responds, without auth
+        set_('forwarded_allow_ips', forwarded_allow_ips)  # of the proxies whose X-Forwarded-For is trusted
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f'Cannot set {name}: settings are immutable, call reload_settings to reload them')
+
+    @classmethod
+    def from_dynaconf(cls, source: Any = None) -> 'Settings':
+        source = source or settings
+        cookie_secret = source.get('COOKIE_SECRET') or ()
+        forwarded_allow_ips = source.get('FORWARDED_ALLOW_IPS') or ()
+        return cls(env=Environment(source.ENV_FOR_DYNACONF), debug=bool(source.get('DEBUG', False)),
+                   db=source.DB,
+                   cookie_secrets=(cookie_secret,) if isinstance(cookie_secret, str) else tuple(cookie_secret),
+                   throttle_backend=source.get('THROTTLE_BACKEND', 'memory'),
+                   operator_cache_size=int(source.get('OPERATOR_CACHE_SIZE', 10000)),
+                   operator_cache_ttl=float(source.get('OPERATOR_CACHE_TTL', 10)),
+                   expose_metrics=bool(source.get('EXPOSE_METRICS', False)),
+                   forwarded_allow_ips=tuple(ip.strip() for ip in forwarded_allow_ips.split(','))
+                   if isinstance(forwarded_allow_ips, str) else tuple(forwarded_allow_ips))
+
+
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_dynaconf()
+        if _settings.debug:
+            logging.getLogger('fas').setLevel(logging.DEBUG)
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """
+    Reload the settings from the configuration files and environment variables.
+    The hot code reading `get_settings` per call, e.g. the cookie secrets, sees the new settings at once,
+    the settings used at startup, e.g. the options of the connection pool of the API, take effect after restart.
+    """
+    global _settings
+    settings.reload()
+    _settings = None
+    return get_settings()
@@ -0,0 +1,219 @@
+import csv
+import io
+import itertools
+import json
+from typing import List, Tuple, Iterable, Iterator, Any, Mapping, AsyncGenerator
+
+from fas.util.database import DBClient, transactional, register_query
+from fas.util.model import Entity
+
+__all__ = ['Knowledge', 'KNOWLEDGE_FORMATS', 'KnowledgeImportError', 'get_knowledge_base_organization_id',
+           'import_knowledge', 'iter_knowledge_lines']
+
+KNOWLEDGE_FORMATS = ('csv', 'ndjson')
+ANSWER_TYPES = (1, 2, 3, 4, 5)  # text, image, news, voice and video
+CSV_COLUMNS = ('question', 'answer_type', 'answer_content', 'keywords')
+CSV_KEYWORDS_SEPARATOR = '|'
+MAX_REPORTED_ERRORS = 100
+
+
+class Knowledge(Entity):
+    id: int = 0
+    knowledge_base_id: int
+    question: str
+    answer_type: int
+    answer_content: dict
+    keywords: List[str] = []
+
+
+class KnowledgeImportError(ValueError):
+    def __init__(self, errors: List[str]) -> None:
+        super().__init__(f'{len(errors)} invalid knowledge: {errors[:3]}')
+        self.errors: List[str] = errors
+
+
+GET_KNOWLEDGE_BASE_ORGANIZATION_ID_SQL = register_query(
+    'get_knowledge_base_organization_id', 'SELECT organization_id FROM knowledge_base WHERE id=:id', id=1)
+
+
+async def get_knowledge_base_organization_id(db: DBClient, knowledge_base_id: int) -> int:
+    return await db.get_scalar(GET_KNOWLEDGE_BASE_ORGANIZATION_ID_SQL, id=knowledge_base_id)
+
+
+MERGE_KNOWLEDGE_SQL = '''
+    WITH staged AS (
+        -- the last one wins when a question is duplicated in the imported knowledge
+        SELECT DISTINCT ON (question) question, answer_type, answer_content, keywords
+        FROM knowledge_staging
+        ORDER BY question, line_no DESC
+    ), updated AS (
+        UPDATE knowledge k SET answer_type=s.answer_type, answer_content=s.answer_content, keywords=s.keywords
+        FROM staged s
+        WHERE k.knowledge_base_id=:knowledge_base_id AND k.question=s.question
+            AND (k.answer_type, k.answer_content, k.keywords) IS DISTINCT FROM (s.answer_type, s.answer_content,
+                                                                                s.keywords)
+        RETURNING k.question
+    ), inserted AS (
+        INSERT INTO knowledge (knowledge_base_id, question, answer_type, answer_content, keywords)
+        SELECT :knowledge_base_id, question, answer_type, answer_content, keywords
+        FROM staged s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM knowledge k WHERE k.knowledge_base_id=:knowledge_base_id AND k.question=s.question)
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM inserted) AS inserted_count,
+        (SELECT COUNT(DISTINCT question) FROM updated) AS updated_count
+    '''
+
+
+@transactional
+async def import_knowledge(db: DBClient, knowledge_base_id: int, lines: Iterable[str], knowledge_format: str, *,
+                           chunk_size: int = 10000) -> Tuple[int, int]:
+    """
+    Import knowledge into the knowledge base: insert new questions and update the existing ones.
+    The lines are validated while being copied into a staging table, which is merged in one statement.
+    Raise `KnowledgeImportError` when any knowledge is invalid, then nothing is imported.
+    Return the number of inserted and updated knowledge.
+    """
+    await db.transaction_lock(f'import-knowledge-{knowledge_base_id}')  # imports of the same base would conflict
+    await db.execute('DROP TABLE IF EXISTS knowledge_staging')  # left by an earlier import in the same transaction
+    await db.execute('''
+        CREATE TEMPORARY TABLE knowledge_staging (
+            line_no INT NOT NULL,
+            question TEXT NOT NULL,
+            answer_type SMALLINT NOT NULL,
+            answer_content JSONB NOT NULL,
+            keywords TEXT[] NOT NULL
+        ) ON COMMIT DROP
+        ''')
+    errors = []
+    records = parse_knowledge(lines, knowledge_format, errors)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            break
+        await db.copy_records('knowledge_staging', chunk, columns=(
+            'line_no', 'question', 'answer_type', 'answer_content', 'keywords'))
+    if errors:
+        raise KnowledgeImportError(errors)
+    counts = await db.get(MERGE_KNOWLEDGE_SQL, knowledge_base_id=knowledge_base_id)
+    return counts['inserted_count'], counts['updated_count']
+
+
+def parse_knowledge(lines: Iterable[str], knowledge_format: str, errors: List[str]) -> Iterator[Tuple]:
+    """
+    Parse and validate the lines one by one, yield (line_no, question, answer_type, answer_content, keywords),
+    and append the error of the invalid knowledge to ``errors``
+    """
+    if knowledge_format not in KNOWLEDGE_FORMATS:
+        raise ValueError(f'Invalid knowledge format: {repr(knowledge_format)}, '
+                         f'should be one of {KNOWLEDGE_FORMATS}')
+    rows = _iter_csv_rows(lines) if knowledge_format == 'csv' else _iter_ndjson_rows(lines)
+    error_count = 0
+    for line_no, row in rows:
+        try:
+            yield (line_no, *_validate_knowledge(row))
+        except (ValueError, TypeError, csv.Error) as e:
+            error_count += 1
+            if error_count <= MAX_REPORTED_ERRORS:
+                errors.append(f'line {line_no}: {e}')
+            elif error_count == MAX_REPORTED_ERRORS + 1:
+                errors.append('and more...')
+
+
+def _iter_csv_rows(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    reader = csv.DictReader(lines)
+    missing_columns = [c for c in CSV_COLUMNS[:3] if c not in (reader.fieldnames or ())]
+    if missing_columns:
+        yield 1, ValueError(f'missing columns: {", ".join(missing_columns)}')
+        return
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, e
+            return
+        row['keywords'] = (row.get('keywords') or '').split(CSV_KEYWORDS_SEPARATOR)
+        content = row.get('answer_content') or ''
+        try:
+            parsed_content = json.loads(content)
+        except ValueError:
+            parsed_content = None
+        # plain text for text answers otherwise, even if it happens to be a JSON scalar, e.g. 123 or true
+        row['answer_content'] = parsed_content if isinstance(parsed_content, dict) else content
+        yield reader.line_num, row
+
+
+def _iter_ndjson_rows(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f'invalid JSON: {e}')
+
+
+def _validate_knowledge(row: Any) -> Tuple[str, int, dict, List[str]]:
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, Mapping):
+        raise ValueError('should be an object')
+    question = row.get('question')
+    if not isinstance(question, str) or not question.strip():
+        raise ValueError('question is required')
+    question = question.strip()
+    if len(question) > 128:
+        raise ValueError('question should be at most 128 characters')
+    try:
+        answer_type = int(row.get('answer_type'))
+    except (TypeError, ValueError):
+        raise ValueError(f'answer_type should be one of {ANSWER_TYPES}')
+    if answer_type not in ANSWER_TYPES:
+        raise ValueError(f'answer_type should be one of {ANSWER_TYPES}')
+    answer_content = row.get('answer_content')
+    if isinstance(answer_content, str) and answer_type == 1 and answer_content.strip():
+        answer_content = {'content': answer_content.strip()}
+    if not isinstance(answer_content, dict) or not answer_content:
+        raise ValueError('answer_content should be a JSON object')
+    keywords = row.get('keywords') or []
+    if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+        raise ValueError('keywords should be a list of strings')
+    if any(CSV_KEYWORDS_SEPARATOR in k for k in keywords):
+        # which separates the keywords in CSV, so that the knowledge exported as CSV is imported again as is
+        raise ValueError(f'keywords should not contain {CSV_KEYWORDS_SEPARATOR}')
+    keywords = list(dict.fromkeys(k.strip() for k in keywords if k.strip()))
+    return question, answer_type, answer_content, keywords
+
+
+LIST_KNOWLEDGE_SQL = register_query('list_knowledge', '''
+    SELECT question, answer_type, answer_content, keywords FROM knowledge
+    WHERE knowledge_base_id=:knowledge_base_id ORDER BY id
+    ''', knowledge_base_id=1)
+
+
+async def iter_knowledge_lines(db: DBClient, knowledge_base_id: int,
+                               knowledge_format: str) -> AsyncGenerator[str, None]:
+    """
+    Export the knowledge of the knowledge base as lines, which can be imported again.
+    The rows are fetched by a cursor and formatted one by one, not materialized.
+    """
+    if knowledge_format not in KNOWLEDGE_FORMATS:
+        raise ValueError(f'Invalid knowledge format: {repr(knowledge_format)}, '
+                         f'should be one of {KNOWLEDGE_FORMATS}')
+    if knowledge_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        yield buffer.getvalue()
+    async for row in db.iter(LIST_KNOWLEDGE_SQL, knowledge_base_id=knowledge_base_id):
+        if knowledge_format == 'csv':
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow((row['question'], row['answer_type'], json.dumps(row['answer_content'], ensure_ascii=False),
+                             CSV_KEYWORDS_SEPARATOR.join(row['keywords'])))
+            yield buffer.getvalue()
+        else:
+            yield json.dumps(dict(row.items()), ensure_ascii=False) + '\n'
@@ -1,7 +1,12 @@
-from fas.util.database import DBClient
+from typing import List, Optional, Tuple
+
+from fas.util.database import DBClient, register_query
 from fas.util.model import Entity
 
-__all__ = ['Operator', 'create_operator', 'get_operator_by_mobile', 'get_operator_by_id']
+__all__ = ['Operator', 'create_operator', 'get_operator_by_mobile', 'get_operator_by_id', 'list_operators_page',
+           'update_operator_password_hash', 'OPERATOR_CHANGED_CHANNEL']
+
+OPERATOR_CHANGED_CHANNEL = 'operator_changed'  # notified with the id when an operator is updated or deleted
 
 
 class Operator(Entity):
@@ -18,11 +23,37 @@ async def create_operator(db: DBClient, operator: Operator) -> Operator:
     return await db.insert('operator', return_record=True, to_cls=Operator, **operator)
 
 
+GET_OPERATOR_BY_MOBILE_SQL = register_query('get_operator_by_mobile', '''
+    SELECT * FROM operator WHERE organization_id=:organization_id AND mobile=:mobile ORDER BY active DESC LIMIT 1
+    ''', organization_id=1, mobile='13800000000')
+
+
 async def get_operator_by_mobile(db: DBClient, organization_id: int, mobile: str) -> Operator:
-    return await db.get('''
-        SELECT * FROM operator WHERE organization_id=:organization_id AND mobile=:mobile ORDER BY active DESC LIMIT 1
-        ''', to_cls=Operator, organization_id=organization_id, mobile=mobile)
+    return await db.get(GET_OPERATOR_BY_MOBILE_SQL, to_cls=Operator, organization_id=organization_id, mobile=mobile)
+
+
+GET_OPERATOR_BY_ID_SQL = register_query('get_operator_by_id', 'SELECT * FROM operator WHERE id=:id', id=1)
 
 
 async def get_operator_by_id(db: DBClient, id: int) -> Operator:
-    return await db.get('SELECT * FROM operator WHERE id=:id', to_cls=Operator, id=id)
+    return await db.get(GET_OPERATOR_BY_ID_SQL, to_cls=Operator, id=id)
+
+
+LIST_OPERATORS_SQL = register_query(
+    'list_operators_page', 'SELECT * FROM operator WHERE organization_id=:organization_id', page_key='id',
+    organization_id=1)
+
+
+async def list_operators_page(db: DBClient, organization_id: int, limit: int, cursor: Optional[str] = None) \
+        -> Tuple[List[Operator], Optional[str]]:
+    return await db.list_page(LIST_OPERATORS_SQL, key='id', limit=limit, cursor=cursor, to_cls=Operator,
+                              organization_id=organization_id)
+
+
+UPDATE_OPERATOR_PASSWORD_HASH_SQL = register_query(
+    'update_operator_password_hash', 'UPDATE operator SET password_hash=:password_hash WHERE id=:id', id=1,
+    password_hash='')
+
+
+async def update_operator_password_hash(db: DBClient, id: int, password_hash: str) -> int:
+    return await db.execute(UPDATE_OPERATOR_PASSWORD_HASH_SQL, id=id, password_hash=password_hash)
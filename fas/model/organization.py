@@ -1,12 +1,13 @@
-from typing import List
+from typing import List, Optional, Tuple
 
-from fas.util.database import DBClient, transactional
+from fas.util.database import DBClient, transactional, register_query
 from fas.util.model import Entity
-from fas.util.web import hash_password
+from fas.util.web import hash_password_async
 from .operator import Operator, create_operator
 
-__all__ = ['Organization', 'list_organizations', 'create_organization', 'get_organization', 'update_organization',
-           'delete_organization', 'add_organization']
+__all__ = ['Organization', 'list_organizations', 'list_organizations_page', 'list_versioned_organizations_page',
+           'get_organizations_page_version', 'create_organization', 'get_organization', 'get_versioned_organization',
+           'get_organization_version', 'update_organization', 'delete_organization', 'add_organization']
 
 
 class Organization(Entity):
@@ -14,30 +15,93 @@ class Organization(Entity):
     name: str
 
 
+LIST_ORGANIZATIONS_SQL = register_query('list_organizations', 'SELECT * FROM organization')
+LIST_ORGANIZATIONS_PAGE_SQL = register_query('list_organizations_page', 'SELECT * FROM organization', page_key='id')
+
+
 async def list_organizations(db: DBClient) -> List[Organization]:
-    return await db.list('SELECT * FROM organization', to_cls=Organization)
+    return await db.list(LIST_ORGANIZATIONS_SQL, to_cls=Organization)
+
+
+async def list_organizations_page(db: DBClient, limit: int, cursor: Optional[str] = None) \
+        -> Tuple[List[Organization], Optional[str]]:
+    return await db.list_page(LIST_ORGANIZATIONS_PAGE_SQL, key='id', limit=limit, cursor=cursor, to_cls=Organization)
+
+
+# the version of a row is its xmin, i.e. the id of the transaction which inserted or last updated it
+LIST_VERSIONED_ORGANIZATIONS_PAGE_SQL = register_query(
+    'list_versioned_organizations_page', 'SELECT *, xmin::TEXT AS version FROM organization', page_key='id')
+LIST_ORGANIZATION_VERSIONS_PAGE_SQL = register_query(
+    'list_organization_versions_page', 'SELECT id, xmin::TEXT AS version FROM organization', page_key='id')
+
+
+async def list_versioned_organizations_page(db: DBClient, limit: int, cursor: Optional[str] = None) \
+        -> Tuple[List[Organization], Optional[str], str]:
+    """
+    List a page of organizations, with the next cursor and the version of the page
+    """
+    rows, next_cursor = await db.list_page(LIST_VERSIONED_ORGANIZATIONS_PAGE_SQL, key='id', limit=limit, cursor=cursor)
+    return [Organization(**row) for row in rows], next_cursor, _get_page_version(rows, next_cursor)
+
+
+async def get_organizations_page_version(db: DBClient, limit: int, cursor: Optional[str] = None) -> str:
+    """
+    Get the version of a page of organizations, by listing only the ids and the versions of its rows
+    """
+    rows, next_cursor = await db.list_page(LIST_ORGANIZATION_VERSIONS_PAGE_SQL, key='id', limit=limit, cursor=cursor)
+    return _get_page_version(rows, next_cursor)
+
+
+def _get_page_version(rows: List, next_cursor: Optional[str]) -> str:
+    # changed by any row inserted into, updated in or deleted from the page, or appended after the last page
+    return ','.join(f'{row["id"]}:{row["version"]}' for row in rows) + f'/{next_cursor or ""}'
 
 
 async def create_organization(db: DBClient, name: str) -> Organization:
     return await db.insert('organization', return_record=True, to_cls=Organization, name=name)
 
 
+GET_ORGANIZATION_SQL = register_query('get_organization', 'SELECT * FROM organization WHERE id=:id', id=1)
+
+
 async def get_organization(db: DBClient, id: int) -> Organization:
-    return await db.get('SELECT * FROM organization WHERE id=:id', to_cls=Organization, id=id)
+    return await db.get(GET_ORGANIZATION_SQL, to_cls=Organization, id=id)
+
+
+GET_VERSIONED_ORGANIZATION_SQL = register_query(
+    'get_versioned_organization', 'SELECT *, xmin::TEXT AS version FROM organization WHERE id=:id', id=1)
+GET_ORGANIZATION_VERSION_SQL = register_query(
+    'get_organization_version', 'SELECT xmin::TEXT FROM organization WHERE id=:id', id=1)
+
+
+async def get_versioned_organization(db: DBClient, id: int) -> Tuple[Optional[Organization], Optional[str]]:
+    row = await db.get(GET_VERSIONED_ORGANIZATION_SQL, id=id)
+    return (Organization(**row), row['version']) if row else (None, None)
+
+
+async def get_organization_version(db: DBClient, id: int) -> Optional[str]:
+    return await db.get_scalar(GET_ORGANIZATION_VERSION_SQL, id=id)
+
+
+UPDATE_ORGANIZATION_SQL = register_query('update_organization', 'UPDATE organization SET name=:name WHERE id=:id',
+                                         id=1, name='name')
 
 
 async def update_organization(db: DBClient, id: int, name: str) -> int:
-    return await db.execute('UPDATE organization SET name=:name WHERE id=:id', id=id, name=name)
+    return await db.execute(UPDATE_ORGANIZATION_SQL, id=id, name=name)
+
+
+DELETE_ORGANIZATION_SQL = register_query('delete_organization', 'DELETE FROM organization WHERE id=:id', id=1)
 
 
 async def delete_organization(db: DBClient, id: int) -> int:
-    return await db.execute('DELETE FROM organization WHERE id=:id', id=id)
+    return await db.execute(DELETE_ORGANIZATION_SQL, id=id)
 
 
 @transactional
 async def add_organization(db: DBClient, name: str, admin_name: str, admin_mobile: str, admin_password: str):
     org = await create_organization(db, name)
-    password_hash = hash_password(admin_password)
+    password_hash = await hash_password_async(admin_password)
     admin = Operator(organization_id=org.id, name=admin_name, mobile=admin_mobile, password_hash=password_hash,
                      is_admin=True, active=True)
     admin = await create_operator(db, admin)
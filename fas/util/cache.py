@@ -0,0 +1,67 @@
+"""
+Bounded in-process caches with expiry.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class TTLCache:
+    """
+    At most ``max_size`` entries are kept, the least recently used is evicted, and an entry expires ``ttl``
+    seconds after it is set, which bounds how stale it can be when an invalidation is missed.
+
+    ``generation`` changes whenever entries are deleted, read it before loading a value and pass it to `set`,
+    so that a value loaded before an invalidation is not cached after it:
+
+    .. code-block:: python
+
+        generation = cache.generation
+        operator = await get_operator_by_id(db, id)
+        cache.set(id, operator, generation=generation)
+    """
+    __slots__ = ('max_size', 'ttl', 'clock', 'generation', 'hits', 'misses', '_entries')
+
+    def __init__(self, *, max_size: int = 10000, ttl: float = 60, clock: Callable[[], float] = time.monotonic) -> None:
+        if max_size < 1 or ttl <= 0:
+            raise Exception(f'Invalid cache: max_size={max_size}, ttl={ttl}')
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.clock: Callable[[], float] = clock
+        self.generation: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: Dict[Hashable, Tuple[Any, float]] = OrderedDict()  # key -> (value, expires_at)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, *, generation: int = None) -> None:
+        if generation is not None and generation != self.generation:
+            return  # deleted while the value was being loaded, which may be stale then
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self.generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -3,7 +3,14 @@ from .client import DBClient
 
 from .transaction import transactional
 
+from .lock import advisory_lock_key
+from .lock import single_flight
+
+from .audit import register_query
+
 from .exceptions import UniqueViolationError
+from .exceptions import LockNotAvailableError
+from .exceptions import InvalidCursorError
 
 __all__ = [
     DBPool.__name__,
@@ -11,5 +18,12 @@ __all__ = [
 
     transactional.__name__,
 
+    advisory_lock_key.__name__,
+    single_flight.__name__,
+
+    register_query.__name__,
+
     UniqueViolationError.__name__,
+    LockNotAvailableError.__name__,
+    InvalidCursorError.__name__,
 ]
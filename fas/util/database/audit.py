@@ -0,0 +1,147 @@
+import importlib
+import json
+import pkgutil
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .interface import DBInterface, render_page_sql
+
+
+class RegisteredQuery:
+    __slots__ = ('name', 'sql', 'page_key', 'sample_args')
+
+    def __init__(self, name: str, sql: str, page_key: Optional[Tuple[str, ...]], sample_args: Dict[str, Any]) -> None:
+        self.name: str = name
+        self.sql: str = sql
+        self.page_key: Optional[Tuple[str, ...]] = page_key
+        self.sample_args: Dict[str, Any] = sample_args
+
+    @property
+    def explained_sql(self) -> str:
+        if self.page_key:
+            return render_page_sql(self.sql, self.page_key)
+        return self.sql
+
+    @property
+    def explained_args(self) -> Dict[str, Any]:
+        if self.page_key:
+            return {'page_limit': 101, **self.sample_args}
+        return self.sample_args
+
+
+REGISTERED_QUERIES: Dict[str, RegisteredQuery] = {}
+
+
+def register_query(name: str, sql: str, /, *, page_key: Union[str, Tuple[str, ...]] = None,
+                   **sample_args: Any) -> str:
+    """
+    Register the query to be audited by ``invoke db.audit-plans``, with sample arguments to explain it.
+    Pass ``page_key`` if the query is listed by ``list_page``, then its page query is explained instead.
+    Return the sql as is, so that model modules can keep their queries as constants:
+
+    .. code-block:: python
+
+        GET_OPERATOR_BY_ID_SQL = register_query('get_operator_by_id', 'SELECT * FROM operator WHERE id=:id', id=1)
+    """
+    if name in REGISTERED_QUERIES and REGISTERED_QUERIES[name].sql != sql:
+        raise Exception(f'Query {name} already registered with different sql')
+    page_key = (page_key,) if isinstance(page_key, str) else page_key
+    REGISTERED_QUERIES[name] = RegisteredQuery(name, sql, page_key, sample_args)
+    return sql
+
+
+def import_query_modules(package: str) -> List[str]:
+    """
+    Import the package and all of its submodules, so that the queries registered by them when imported are audited,
+    return the names of the imported modules
+    """
+    module = importlib.import_module(package)
+    names = [package]
+    for module_info in pkgutil.walk_packages(getattr(module, '__path__', ()), prefix=f'{package}.'):
+        importlib.import_module(module_info.name)
+        names.append(module_info.name)
+    return names
+
+
+class PlanProblem:
+    __slots__ = ('node', 'message')
+
+    def __init__(self, node: str, message: str) -> None:
+        self.node: str = node  # the node line, recorded in the snapshot, without row estimates which vary
+        self.message: str = message
+
+    def __str__(self) -> str:
+        return self.message
+
+
+class PlanAudit:
+    __slots__ = ('name', 'plan', 'problems')
+
+    def __init__(self, name: str, plan: List[str], problems: List[PlanProblem]) -> None:
+        self.name: str = name
+        self.plan: List[str] = plan  # node lines without costs, compared with the snapshot
+        self.problems: List[PlanProblem] = problems
+
+    def to_snapshot(self) -> Dict[str, List[str]]:
+        """
+        The plan and the nodes flagged, so that a new problem is found even if the plan stays the same,
+        e.g. when a table grows over the threshold
+        """
+        return {'plan': self.plan, 'problems': [problem.node for problem in self.problems]}
+
+
+async def audit_plans(db: DBInterface, *, threshold: int = 1000) -> List[PlanAudit]:
+    """
+    Explain every registered query, flag sequential scans and sorts over at least ``threshold`` rows
+    """
+    relation_rows = {r['relname']: r['reltuples'] for r in await db.list(
+        "SELECT relname, reltuples FROM pg_class WHERE relnamespace='public'::REGNAMESPACE")}
+    audits = []
+    for name in sorted(REGISTERED_QUERIES):
+        query = REGISTERED_QUERIES[name]
+        explained = await db.get_scalar(f'EXPLAIN (FORMAT JSON) {query.explained_sql}', **query.explained_args)
+        root = (json.loads(explained) if isinstance(explained, str) else explained)[0]['Plan']
+        audits.append(PlanAudit(name, format_plan(root), find_plan_problems(root, relation_rows, threshold)))
+    return audits
+
+
+def format_plan(node: Dict[str, Any], depth: int = 0) -> List[str]:
+    """
+    Format the plan as indented node lines, without costs or row estimates which vary with the data
+    """
+    lines = [f'{"  " * depth}{_format_node(node)}']
+    for child in node.get('Plans', ()):
+        lines.extend(format_plan(child, depth + 1))
+    return lines
+
+
+def _format_node(node: Dict[str, Any]) -> str:
+    line = node['Node Type']
+    if node.get('Index Name'):
+        line += f' using {node["Index Name"]}'
+    if node.get('Relation Name'):
+        line += f' on {node["Relation Name"]}'
+    if node.get('Sort Key'):
+        line += f' by {", ".join(node["Sort Key"])}'
+    return line
+
+
+def find_plan_problems(node: Dict[str, Any], relation_rows: Dict[str, float], threshold: int) -> List[PlanProblem]:
+    problems = []
+    if node['Node Type'] == 'Seq Scan':
+        rows = max(relation_rows.get(node['Relation Name'], 0), node['Plan Rows'])
+        if rows >= threshold:
+            if node.get('Filter'):
+                message = (f'Seq Scan on {node["Relation Name"]} (~{rows:.0f} rows) filtering {node["Filter"]}: '
+                           f'missing index?')
+            else:
+                message = f'Seq Scan on {node["Relation Name"]} (~{rows:.0f} rows)'
+            problems.append(PlanProblem(_format_node(node), message))
+    elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+        rows = max([child['Plan Rows'] for child in node.get('Plans', ())] or [node['Plan Rows']])
+        if rows >= threshold:
+            problems.append(PlanProblem(_format_node(node), f'Sort of ~{rows:.0f} rows by '
+                                                            f'{", ".join(node.get("Sort Key", ()))}: '
+                                                            f'missing index for the order?'))
+    for child in node.get('Plans', ()):
+        problems.extend(find_plan_problems(child, relation_rows, threshold))
+    return problems
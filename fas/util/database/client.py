@@ -4,7 +4,7 @@ import asyncio
 import json
 import logging
 from types import TracebackType
-from typing import Any, Dict, Type, Optional
+from typing import Any, Dict, Type, Optional, Callable, Awaitable, List, Tuple
 
 import asyncpg
 
@@ -14,28 +14,76 @@ LOGGER = logging.getLogger(__name__)
 
 
 async def _set_automatic_json_conversion(conn: asyncpg.Connection):
-    await conn.set_type_codec('json', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
-    await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+    # binary format, which binary COPY requires, i.e. copy_records of the knowledge import and the seeder, and which
+    # costs no more than the text format: it is the JSON text, after the version number for jsonb
+    await conn.set_type_codec('json', encoder=_encode_json, decoder=json.loads, schema='pg_catalog', format='binary')
+    await conn.set_type_codec('jsonb', encoder=_encode_jsonb, decoder=_decode_jsonb, schema='pg_catalog',
+                              format='binary')
+
+
+def _encode_json(value: Any) -> bytes:
+    return json.dumps(value).encode('UTF-8')
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return b'\x01' + json.dumps(value).encode('UTF-8')  # jsonb binary format starts with the version number 1
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    return json.loads(data[1:])
+
+
+POOL_MODES = ('session', 'transaction')
 
 
 class DBPool:
-    __slots__ = ('_options', '_close_timeout', '_pool')
+    """Pool of database connections.
+
+    ``mode`` tells how the connections are used by clients acquired from the pool:
+
+    * ``session``: a client keeps its connection until it is released;
+    * ``transaction``: a client gives its connection back to the pool after every statement
+      run outside of a transaction, and prepared statements are not cached. Use this mode
+      when connecting through a transaction pooler like PgBouncer (``pool_mode = transaction``).
+      Session level state, e.g. ``SET`` or session level advisory locks, does not survive between statements.
+
+    ``fan_out_size`` is the maximum number of connections all `gather` calls can use at the same time,
+    which defaults to half of ``max_size``, so the other requests always have connections to use.
+    """
+    __slots__ = ('_options', '_close_timeout', '_mode', '_fan_out_size', '_fan_out_semaphore', '_pool',
+                 '_listener_conn', '_listeners')
 
     def __init__(self, dsn: str = None, *, close_timeout: float = None, min_size: int = 10, max_size: int = 10,
-                 setup: Any = None, init: Any = None, **connect_kwargs: Any) -> None:
+                 setup: Any = None, init: Any = None, mode: str = 'session', fan_out_size: int = None,
+                 **connect_kwargs: Any) -> None:
+        if mode not in POOL_MODES:
+            raise ValueError(f'Invalid pool mode: {repr(mode)}, should be one of {POOL_MODES}')
+        if mode == 'transaction':
+            # prepared statements live in server connections, which are shared by the clients of a transaction pooler
+            connect_kwargs.setdefault('statement_cache_size', 0)
         self._options: Dict = dict(dsn=dsn, min_size=min_size, max_size=max_size, setup=setup,
                                    init=init or _set_automatic_json_conversion, **connect_kwargs)
         self._close_timeout: float = close_timeout
+        self._mode: str = mode
+        self._fan_out_size: int = fan_out_size or max(1, max_size // 2)
+        self._fan_out_semaphore: Optional[asyncio.Semaphore] = None
         self._pool: Optional[asyncpg.pool.Pool] = None
+        self._listener_conn: Optional[asyncpg.Connection] = None
+        self._listeners: List[Tuple[str, Callable]] = []
 
     @property
     def is_open(self) -> bool:
         return self._pool is not None
 
+    @property
+    def mode(self) -> str:
+        return self._mode
+
     async def open(self) -> None:
         assert self._pool is None, 'Connection pool is already opened'
         try:
             self._pool = await asyncpg.create_pool(**self._options)
+            self._fan_out_semaphore = asyncio.Semaphore(self._fan_out_size)
         except Exception:
             LOGGER.critical(f'Cannot open connection pool: options={self._options}', exc_info=True)
             raise
@@ -45,6 +93,12 @@ class DBPool:
     async def close(self) -> None:
         assert self._pool is not None, 'Connection pool is not opened'
         try:
+            if self._listener_conn is not None:
+                listener_conn, self._listener_conn = self._listener_conn, None
+                for channel, on_notification in self._listeners:
+                    await listener_conn.remove_listener(channel, on_notification)
+                self._listeners.clear()
+                await self._pool.release(listener_conn, timeout=self._close_timeout)
             if self._close_timeout:
                 await asyncio.wait_for(self._pool.close(), timeout=self._close_timeout)
             else:
@@ -92,6 +146,63 @@ class DBPool:
         """
         return DBClient(self, acquire_timeout=acquire_timeout, release_timeout=release_timeout)
 
+    async def gather(self, *queries: Callable[[DBClient], Awaitable[Any]], max_connections: int = 2,
+                     acquire_timeout: float = None, release_timeout: float = None) -> List[Any]:
+        """Run independent queries at the same time, each on a connection of its own.
+
+        :param queries: Callables taking a :class:`~DBClient` and returning an awaitable, e.g. a query function.
+        :param int max_connections: The maximum number of connections used by this call at the same time.
+        :param float acquire_timeout: A timeout for acquiring a Connection.
+        :param float release_timeout: A timeout for releasing a Connection.
+        :return: The results of the queries, in the same order as the queries.
+
+        The connections used by all the calls at the same time are limited by ``fan_out_size`` of the pool.
+        When a query fails, the others are cancelled and the exception is raised.
+
+        .. code-block:: python
+
+            organization_count, operator_count = await pool.gather(
+                lambda db: db.get_scalar('SELECT COUNT(*) FROM organization'),
+                lambda db: db.get_scalar('SELECT COUNT(*) FROM operator'))
+        """
+        assert self._pool is not None, 'Connection pool is not opened'
+        semaphore = asyncio.Semaphore(max_connections)
+
+        async def run(query: Callable[[DBClient], Awaitable[Any]]) -> Any:
+            async with semaphore, self._fan_out_semaphore:
+                async with self.acquire(acquire_timeout=acquire_timeout, release_timeout=release_timeout) as db:
+                    return await query(db)
+
+        tasks = [asyncio.ensure_future(run(query)) for query in queries]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def add_listener(self, channel: str, callback: Callable[[str], Any]) -> None:
+        """Call ``callback`` with the payload of every notification on the channel, until the pool is closed.
+
+        All the channels are listened on one connection held from the pool. Notifications sent while
+        the connection is broken are missed, so the callers should not depend on them alone, e.g. caches
+        should expire their entries as well.
+        """
+        assert self._pool is not None, 'Connection pool is not opened'
+        if self._mode == 'transaction':
+            raise Exception('Cannot listen to notifications in transaction mode, which is for transaction poolers')
+        if self._listener_conn is None:
+            self._listener_conn = await self._acquire()
+
+        def on_notification(conn: asyncpg.Connection, pid: int, channel_: str, payload: str) -> None:
+            try:
+                callback(payload)
+            except Exception:
+                LOGGER.exception(f'Cannot handle notification: channel={channel_}, payload={payload}')
+
+        await self._listener_conn.add_listener(channel, on_notification)
+        self._listeners.append((channel, on_notification))
+
     async def _acquire(self, *, timeout: float = None) -> asyncpg.Connection:
         assert self._pool is not None, 'Connection pool is not opened'
         try:
@@ -131,6 +242,13 @@ class DBClient(DBInterface):
     def is_connected(self) -> bool:
         return self._conn is not None
 
+    @property
+    def pool(self) -> DBPool:
+        """
+        The pool of the connection, e.g. to acquire another connection living longer than this one
+        """
+        return self._pool
+
     async def acquire(self) -> DBClient:
         assert self._conn is None, 'Connection is already acquired'
         self._conn = await self._pool._acquire(timeout=self._acquire_timeout)
@@ -143,6 +261,30 @@ class DBClient(DBInterface):
         finally:
             self._conn = None
 
+    async def release_early(self) -> None:
+        """
+        Give the connection back to the pool if not in a transaction, e.g. once the last query of a request is done,
+        before the response is serialized and sent. A later query acquires a connection again, which may be another
+        one, so session level state, e.g. ``SET`` or session level advisory locks, does not survive.
+        """
+        if self.is_connected and not self.is_in_transaction:
+            await self.release()
+
+    async def gather(self, *queries: Callable[[DBClient], Awaitable[Any]], max_connections: int = 2,
+                     acquire_timeout: float = None, release_timeout: float = None) -> List[Any]:
+        """Run independent queries at the same time on other connections of the pool, check `DBPool.gather`"""
+        return await self._pool.gather(*queries, max_connections=max_connections,
+                                       acquire_timeout=acquire_timeout or self._acquire_timeout,
+                                       release_timeout=release_timeout or self._release_timeout)
+
+    @property
+    def is_session_kept(self) -> bool:
+        return self._pool.mode == 'session'
+
+    async def _release_if_necessary(self) -> None:
+        if self._pool.mode == 'transaction' and self.is_connected and not self.is_in_transaction:
+            await self.release()
+
     async def __aenter__(self) -> DBClient:
         """
         Called when entering `async with db_pool.acquire()`
@@ -1,3 +1,8 @@
 from asyncpg import exceptions
 
 UniqueViolationError = exceptions.UniqueViolationError
+LockNotAvailableError = exceptions.LockNotAvailableError
+
+
+class InvalidCursorError(ValueError):
+    pass
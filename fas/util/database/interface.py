@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import abc
+import base64
+import datetime as dt
+import decimal
 import inspect
+import json
 import logging
-from typing import Any, Optional, Tuple, Union, Sequence, Callable, List, AsyncGenerator, Mapping
+import uuid
+from typing import Any, Optional, Tuple, Union, Sequence, Callable, List, AsyncGenerator, Mapping, Iterable
 
 import asyncpg
 import asyncpg.transaction
 
-from fas.util.model import Entity
+from fas.util.model import Entity, ReadModel
+from .exceptions import LockNotAvailableError, InvalidCursorError
+from .lock import advisory_lock_key
 from .parameter import render
 
 LOGGER = logging.getLogger(__name__)
@@ -39,6 +46,11 @@ class DBInterface(abc.ABC):
         if not self.is_connected:
             await self.acquire()
 
+    async def _release_if_necessary(self) -> None:
+        """
+        Called after running statements, subclasses can give the connection back early, e.g. for transaction pooling
+        """
+
     @property
     def is_in_transaction(self):
         return self.is_connected and self.conn.is_in_transaction()
@@ -48,14 +60,79 @@ class DBInterface(abc.ABC):
         await self._acquire_if_necessary()
         return self.conn.transaction(isolation=isolation, readonly=readonly, deferrable=deferrable)
 
-    async def try_transaction_lock(self, key: int, *, exclusive: bool = True, timeout: float = None) -> bool:
+    @property
+    def is_session_kept(self) -> bool:
+        """
+        Whether the connection is kept between statements, which session level state, e.g. advisory locks, relies on
+        """
+        return True
+
+    async def session_lock(self, key: Union[int, str], *, exclusive: bool = True, timeout: float = None) -> bool:
+        """
+        Obtain session level advisory lock, wait at most ``timeout`` seconds if given and return False when timed out
+        """
+        if not self.is_session_kept:
+            raise Exception('Failed obtaining session level advisory lock: session is not kept between statements')
+        func = 'PG_ADVISORY_LOCK' if exclusive else 'PG_ADVISORY_LOCK_SHARED'
+        return await self._lock(func, key, timeout=timeout)
+
+    async def try_session_lock(self, key: Union[int, str], *, exclusive: bool = True, timeout: float = None) -> bool:
+        if not self.is_session_kept:
+            raise Exception(
+                'Failed trying to obtain session level advisory lock: session is not kept between statements')
+        if exclusive:
+            sql = 'SELECT PG_TRY_ADVISORY_LOCK(:key)'
+        else:
+            sql = 'SELECT PG_TRY_ADVISORY_LOCK_SHARED(:key)'
+        return await self.get_scalar(sql, timeout=timeout, key=advisory_lock_key(key))
+
+    async def session_unlock(self, key: Union[int, str], *, exclusive: bool = True, timeout: float = None) -> bool:
+        if exclusive:
+            sql = 'SELECT PG_ADVISORY_UNLOCK(:key)'
+        else:
+            sql = 'SELECT PG_ADVISORY_UNLOCK_SHARED(:key)'
+        return await self.get_scalar(sql, timeout=timeout, key=advisory_lock_key(key))
+
+    async def transaction_lock(self, key: Union[int, str], *, exclusive: bool = True, timeout: float = None) -> bool:
+        """
+        Obtain transaction level advisory lock, wait at most ``timeout`` seconds if given, return False when timed out
+        """
+        if not self.is_in_transaction:
+            raise Exception('Failed obtaining transaction level advisory lock: not within a transaction')
+        func = 'PG_ADVISORY_XACT_LOCK' if exclusive else 'PG_ADVISORY_XACT_LOCK_SHARED'
+        return await self._lock(func, key, timeout=timeout)
+
+    async def try_transaction_lock(self, key: Union[int, str], *, exclusive: bool = True,
+                                   timeout: float = None) -> bool:
         if not self.is_in_transaction:
             raise Exception('Failed trying to obtain transaction level advisory lock: not within a transaction')
         if exclusive:
-            sql = f'SELECT PG_TRY_ADVISORY_XACT_LOCK(:key)'
+            sql = 'SELECT PG_TRY_ADVISORY_XACT_LOCK(:key)'
         else:
-            sql = f'SELECT PG_TRY_ADVISORY_XACT_LOCK_SHARED(:key)'
-        return await self.get_scalar(sql, timeout=timeout, key=key)
+            sql = 'SELECT PG_TRY_ADVISORY_XACT_LOCK_SHARED(:key)'
+        return await self.get_scalar(sql, timeout=timeout, key=advisory_lock_key(key))
+
+    async def _lock(self, func: str, key: Union[int, str], *, timeout: float = None) -> bool:
+        key = advisory_lock_key(key)
+        if timeout is None:
+            await self.execute(f'SELECT {func}(:key)', key=key)
+            return True
+        await self._acquire_if_necessary()
+        try:
+            # within a savepoint if already in a transaction, so that the transaction is still usable after timed out
+            async with self.conn.transaction():
+                previous_lock_timeout = await self.get_scalar("SELECT CURRENT_SETTING('lock_timeout')")
+                await self.execute("SELECT SET_CONFIG('lock_timeout', :lock_timeout, TRUE)",
+                                   lock_timeout=f'{max(1, int(timeout * 1000))}ms')
+                await self.execute(f'SELECT {func}(:key)', key=key)
+                await self.execute("SELECT SET_CONFIG('lock_timeout', :lock_timeout, TRUE)",
+                                   lock_timeout=previous_lock_timeout)
+        except LockNotAvailableError:
+            LOGGER.debug(f'Timed out obtaining advisory lock: key={key}, timeout={timeout}')
+            return False
+        finally:
+            await self._release_if_necessary()
+        return True
 
     async def execute(self, sql: str, *, timeout: float = None, **kwargs: Any) -> int:
         return await self._execute(sql, timeout=timeout, **kwargs)
@@ -68,6 +145,21 @@ class DBInterface(abc.ABC):
             return
         await self._executemany(sql, args, timeout=timeout)
 
+    async def copy_records(self, table: str, records: Iterable[Sequence[Any]], *, columns: Sequence[str],
+                           timeout: float = None) -> int:
+        """
+        Bulk load the records (tuples of the column values) into the table with binary COPY, much faster than insert.
+        Return the number of records copied.
+        """
+        await self._acquire_if_necessary()
+        LOGGER.debug(f'copy records: table={table}, columns={columns}')
+        try:
+            last_sql_status = await self.conn.copy_records_to_table(table, records=records, columns=columns,
+                                                                    timeout=timeout)
+        finally:
+            await self._release_if_necessary()
+        return int(last_sql_status.split()[-1])
+
     async def exists(self, sql: str, *, timeout: float = None, **kwargs: Any) -> bool:
         return await self.get_scalar('SELECT EXISTS ({})'.format(sql), timeout=timeout, **kwargs)
 
@@ -76,6 +168,40 @@ class DBInterface(abc.ABC):
         rows = await self._query(sql, timeout=timeout, **kwargs)
         return [to_cls(**row) for row in rows] if to_cls else rows
 
+    async def list_page(self, sql: str, *, key: Union[str, Tuple[str, ...]], limit: int, cursor: Optional[str] = None,
+                        descending: bool = False, to_cls: Optional[Callable[[Any], Any]] = None,
+                        timeout: float = None, **kwargs: Any) -> Tuple[List, Optional[str]]:
+        """
+        List a page of rows using keyset (seek) pagination, so the cost does not grow with the page depth.
+
+        The rows of ``sql`` are ordered by ``key``, which should be unique, e.g. the primary key,
+        and ``sql`` itself should not have ``ORDER BY``, ``LIMIT`` or ``OFFSET``.
+        Pass the returned opaque cursor to get the next page, which is None when there is no next page.
+        Raise `InvalidCursorError` when the cursor cannot be decoded, or its values do not fit the types of the key.
+
+        .. code-block:: python
+
+            rows, cursor = await db.list_page('SELECT * FROM organization', key='id', limit=100)
+            rows, cursor = await db.list_page('SELECT * FROM organization', key='id', limit=100, cursor=cursor)
+        """
+        key_names = (key,) if isinstance(key, str) else tuple(key)
+        if cursor is not None:
+            key_values = _decode_cursor(cursor, len(key_names))
+            kwargs.update({f'page_cursor_{i}': v for i, v in enumerate(key_values)})
+        page_sql = render_page_sql(sql, key_names, descending=descending, has_cursor=cursor is not None)
+        try:
+            rows = await self._query(page_sql, timeout=timeout, page_limit=limit + 1, **kwargs)
+        except asyncpg.DataError as e:
+            if cursor is None:
+                raise
+            # e.g. a hand-made cursor of a string for an integer key
+            raise InvalidCursorError(f'Invalid cursor: {repr(cursor)}') from e
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor([rows[-1][k] for k in key_names])
+        return [to_cls(**row) for row in rows] if to_cls else rows, next_cursor
+
     async def list_scalar(self, sql: str, *, to_cls: Optional[Callable[[Any], Any]] = None, timeout: float = None,
                           **kwargs: Any) -> List:
         rows = await self._query(sql, timeout=timeout, **kwargs)
@@ -136,7 +262,7 @@ class DBInterface(abc.ABC):
                 columns += tuple(a for a in include_attrs if a not in exclude_attrs and a not in columns)
             elif include_attrs is None:
                 some_object = next(iter(objects))
-                if isinstance(some_object, Entity):
+                if isinstance(some_object, (Entity, ReadModel)):
                     some_object = some_object.__fields__
                 if isinstance(some_object, dict):
                     columns += tuple(k for k in some_object if k not in exclude_attrs and k not in columns)
@@ -230,13 +356,19 @@ class DBInterface(abc.ABC):
         query, args = render(sql, **kwargs)
         await self._acquire_if_necessary()
         LOGGER.debug(f'query: {query} \nargs: {args}')
-        return await self.conn.fetch(query, *args, timeout=timeout)
+        try:
+            return await self.conn.fetch(query, *args, timeout=timeout)
+        finally:
+            await self._release_if_necessary()
 
     async def _execute(self, sql: str, *, timeout: float = None, **kwargs: Any) -> int:
         query, args = render(sql, **kwargs)
         await self._acquire_if_necessary()
         LOGGER.debug(f'query: {query} \nargs: {args}')
-        last_sql_status = await self.conn.execute(query, *args, timeout=timeout)
+        try:
+            last_sql_status = await self.conn.execute(query, *args, timeout=timeout)
+        finally:
+            await self._release_if_necessary()
         try:
             return int(last_sql_status.split()[-1])
         except (ValueError, AttributeError, IndexError):
@@ -246,7 +378,10 @@ class DBInterface(abc.ABC):
         query, args = render(sql, args)
         await self._acquire_if_necessary()
         LOGGER.debug(f'query: {query} \nargs: {args}')
-        await self.conn.executemany(query, args, timeout=timeout)
+        try:
+            await self.conn.executemany(query, args, timeout=timeout)
+        finally:
+            await self._release_if_necessary()
 
     async def _iter(self, sql: str, *, to_cls: Optional[Callable[[Any], Any]] = None, return_scalar: bool = False,
                     timeout: float = None, **kwargs: Any) -> AsyncGenerator:
@@ -268,10 +403,65 @@ class DBInterface(abc.ABC):
         except Exception:
             if tr:
                 await tr.rollback()
+                await self._release_if_necessary()
             raise
         else:
             if tr:
                 await tr.commit()
+                await self._release_if_necessary()
+
+
+def render_page_sql(sql: str, key_names: Tuple[str, ...], *, descending: bool = False, has_cursor: bool = False) -> str:
+    ordering = ', '.join(f'{k} DESC' if descending else k for k in key_names)
+    fragments = [f'SELECT * FROM ({sql}) AS P']
+    if has_cursor:
+        placeholders = ', '.join(f':page_cursor_{i}' for i in range(len(key_names)))
+        fragments.append(f' WHERE ({", ".join(key_names)}) {"<" if descending else ">"} ({placeholders})')
+    fragments.append(f' ORDER BY {ordering} LIMIT :page_limit')
+    return ''.join(fragments)
+
+
+# key values of the types not in JSON are encoded as {type name: string}, the subclasses before their base classes
+CURSOR_VALUE_TYPES = {'datetime': (dt.datetime, dt.datetime.isoformat, dt.datetime.fromisoformat),
+                      'date': (dt.date, dt.date.isoformat, dt.date.fromisoformat),
+                      'time': (dt.time, dt.time.isoformat, dt.time.fromisoformat),
+                      'decimal': (decimal.Decimal, str, decimal.Decimal),
+                      'uuid': (uuid.UUID, str, uuid.UUID)}
+
+
+def _encode_cursor(key_values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key_values, separators=(',', ':'), default=_encode_cursor_value)
+                                    .encode('UTF-8')).decode('ascii')
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    for type_name, (cls, encode, _) in CURSOR_VALUE_TYPES.items():
+        if isinstance(value, cls):
+            return {type_name: encode(value)}
+    raise TypeError(f'Page key of type {type(value).__name__} not supported by cursors')
+
+
+def _decode_cursor(cursor: str, key_count: int) -> List[Any]:
+    try:
+        key_values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f'Invalid cursor: {repr(cursor)}') from e
+    if not isinstance(key_values, list) or len(key_values) != key_count:
+        raise InvalidCursorError(f'Invalid cursor: {repr(cursor)}')
+    return [_decode_cursor_value(cursor, v) for v in key_values]
+
+
+def _decode_cursor_value(cursor: str, value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, dict) and len(value) == 1:
+        type_name, encoded = next(iter(value.items()))
+        if type_name in CURSOR_VALUE_TYPES and isinstance(encoded, str):
+            try:
+                return CURSOR_VALUE_TYPES[type_name][2](encoded)
+            except (ValueError, decimal.InvalidOperation) as e:
+                raise InvalidCursorError(f'Invalid cursor: {repr(cursor)}') from e
+    raise InvalidCursorError(f'Invalid cursor: {repr(cursor)}')
 
 
 class FunctionValueProvider:
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import Union, AsyncIterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .interface import DBInterface
+
+LOGGER = logging.getLogger(__name__)
+
+
+def advisory_lock_key(name: Union[int, str]) -> int:
+    """Returns the advisory lock key of the given name.
+
+    Unlike ``hash(name)``, the key is a stable 64-bit digest, which does not
+    depend on ``PYTHONHASHSEED``, so all processes get the same key of a name.
+    An integer is used as the key as is.
+    """
+    if isinstance(name, int):
+        return name
+    digest = hashlib.blake2b(name.encode('UTF-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+@asynccontextmanager
+async def single_flight(db: DBInterface, key: Union[int, str], *, wait: bool = False,
+                        timeout: float = None) -> AsyncIterator[bool]:
+    """Runs a cluster-wide job at most once at a time, across all processes sharing the database.
+
+    Yields True when holding the lock, i.e. the job should be run. Otherwise,
+    another process is running the job: yields False at once, or if ``wait``
+    is True, after the other process finished the job (or ``timeout`` seconds passed).
+
+    .. code-block:: python
+
+        async with single_flight(db, 'rebuild-knowledge-cache', wait=True) as leader:
+            if leader:
+                await rebuild_knowledge_cache(db)
+
+    The lock is a session level advisory lock, so the job can run multiple transactions.
+    """
+    if await db.try_session_lock(key):
+        try:
+            yield True
+        finally:
+            await db.session_unlock(key)
+        return
+    if wait:
+        # shared lock can only be obtained after the leader released its exclusive lock
+        if await db.session_lock(key, exclusive=False, timeout=timeout):
+            await db.session_unlock(key, exclusive=False)
+        else:
+            LOGGER.warning(f'Stopped waiting for single flight {repr(key)}: timeout={timeout}')
+    yield False
@@ -1,6 +1,8 @@
 import hashlib
+import json
+import re
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from fas.environment import ENV
 
@@ -76,3 +78,230 @@ def calculate_md5_hash(path: Path) -> str:
     m = hashlib.md5()
     m.update(path.read_bytes())
     return m.hexdigest()
+
+
+def calculate_scripts_checksum() -> str:
+    """
+    Checksum of all the migration scripts (and baseline snapshots), which changes when any is added, changed or removed
+    """
+    m = hashlib.md5()
+    for path in sorted([*SCRIPT_DIR.rglob('*.sql'), *SCRIPT_DIR.rglob('*.snapshot')], key=lambda p: p.name):
+        m.update(f'{path.relative_to(SCRIPT_DIR)}:{calculate_md5_hash(path)}\n'.encode('UTF-8'))
+    return m.hexdigest()
+
+
+def check_scripts_locked(*, to_version: int):
+    versions = load_versions()
+    if to_version not in versions:
+        raise Exception(f'Found no migration script of version {to_version}')
+    for version in range(1, to_version + 1):
+        if not versions[version].with_suffix('.locked').exists():
+            raise Exception(f'Found not-locked migration script {versions[version].relative_to(SCRIPT_DIR)}')
+
+
+def save_snapshot(to_version: int, sql: str) -> Path:
+    """
+    Save the baseline snapshot, i.e. the schema (and data) migrated by the scripts up to the version,
+    with the checksums of the scripts it was built from. The older snapshots are removed.
+    """
+    for path in [*SCRIPT_DIR.glob('baseline-*.snapshot'), *SCRIPT_DIR.glob('baseline-*.json')]:
+        path.unlink()
+    snapshot_path = SCRIPT_DIR / f'baseline-{to_version:04}.snapshot'
+    snapshot_path.write_text(sql, encoding='UTF-8')
+    versions = load_versions()
+    metadata = {
+        'to_version': to_version,
+        'snapshot_md5': calculate_md5_hash(snapshot_path),
+        'scripts': {str(versions[version].relative_to(SCRIPT_DIR)): calculate_md5_hash(versions[version])
+                    for version in range(1, to_version + 1)},
+    }
+    snapshot_path.with_suffix('.json').write_text(json.dumps(metadata, indent=2) + '\n')
+    return snapshot_path
+
+
+def load_snapshot(*, to_version: Optional[int] = None) -> Optional[Tuple[int, str]]:
+    """
+    Load the latest baseline snapshot (not after the version if given), return its version and sql.
+    The snapshot is used only when the scripts it was built from are all locked and not changed since.
+    """
+    snapshot_paths = sorted(SCRIPT_DIR.glob('baseline-*.snapshot'), key=lambda p: p.stem, reverse=True)
+    for snapshot_path in snapshot_paths:
+        relative_path = snapshot_path.relative_to(SCRIPT_DIR)
+        metadata_path = snapshot_path.with_suffix('.json')
+        if not metadata_path.exists():
+            raise Exception(f'Found no metadata of baseline snapshot {relative_path}')
+        metadata = json.loads(metadata_path.read_text())
+        if to_version is not None and metadata['to_version'] > to_version:
+            continue
+        if calculate_md5_hash(snapshot_path) != metadata['snapshot_md5']:
+            raise Exception(f'Found changed baseline snapshot {relative_path}')
+        versions = load_versions()
+        expected_scripts = {str(versions[version].relative_to(SCRIPT_DIR))
+                            for version in range(1, metadata['to_version'] + 1) if version in versions}
+        if len(expected_scripts) != metadata['to_version'] or expected_scripts != set(metadata['scripts']):
+            raise Exception(f'Found baseline snapshot {relative_path} not built from the current scripts')
+        for script, expected_md5 in metadata['scripts'].items():
+            lock_path = (SCRIPT_DIR / script).with_suffix('.locked')
+            if not lock_path.exists() or lock_path.read_text() != expected_md5:
+                raise Exception(f'Found baseline snapshot {relative_path} built from not-locked script {script}')
+            if calculate_md5_hash(SCRIPT_DIR / script) != expected_md5:
+                raise Exception(f'Found baseline snapshot {relative_path} built from changed script {script}')
+        return metadata['to_version'], snapshot_path.read_text(encoding='UTF-8')
+    return None
+
+
+class ScriptDirectives:
+    """
+    Directives of a migration script, given as comments at the head of the script, e.g.
+
+    .. code-block:: sql
+
+        -- fas:transactional=false
+        -- fas:lock_timeout=2s
+        -- fas:retries=5
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS knowledge_question_idx ON knowledge (question);
+
+    transactional: whether the statements are run within one transaction, should be false to run statements like
+    ``CREATE INDEX CONCURRENTLY``, then the statements are run one by one and should be safe to re-run
+    lock_timeout: at most how long a statement waits for a lock, so that a statement waiting for a lock held by a long
+    running query does not block all the other queries waiting behind it
+    retries: how many times the script (or the statement if not transactional) is retried after lock timed out
+    statement_timeout: at most how long a statement runs, 0 means no limit
+    """
+    __slots__ = ('transactional', 'lock_timeout', 'retries', 'statement_timeout')
+
+    def __init__(self, *, transactional: bool = True, lock_timeout: str = '5s', retries: int = 3,
+                 statement_timeout: str = '0') -> None:
+        self.transactional: bool = transactional
+        self.lock_timeout: str = lock_timeout
+        self.retries: int = retries
+        self.statement_timeout: str = statement_timeout
+
+    def __repr__(self) -> str:
+        attrs = ', '.join(f'{name}={repr(getattr(self, name))}' for name in self.__slots__)
+        return f'{type(self).__name__}({attrs})'
+
+
+DIRECTIVE_PREFIX_PATTERN = re.compile(r'--\s*fas:')
+DIRECTIVE_PATTERN = re.compile(r'--\s*fas:(\w+)\s*=\s*(\S+)\s*')
+DURATION_PATTERN = re.compile(r'\d+\s*(us|ms|s|min|h|d)?')
+
+
+def parse_directives(sql: str) -> ScriptDirectives:
+    directives = {}
+    for line in sql.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith('--'):
+            break
+        if not DIRECTIVE_PREFIX_PATTERN.match(line):
+            continue
+        match = DIRECTIVE_PATTERN.fullmatch(line)
+        if not match:
+            raise Exception(f'Invalid migration script directive: {line}')
+        name, value = match.groups()
+        if name in directives:
+            raise Exception(f'Duplicated migration script directive: {name}')
+        if name == 'transactional':
+            if value.lower() not in ('true', 'false'):
+                raise Exception(f'Invalid migration script directive: {line}')
+            directives[name] = value.lower() == 'true'
+        elif name == 'retries':
+            if not value.isdigit():
+                raise Exception(f'Invalid migration script directive: {line}')
+            directives[name] = int(value)
+        elif name in ('lock_timeout', 'statement_timeout'):
+            if not DURATION_PATTERN.fullmatch(value):
+                raise Exception(f'Invalid migration script directive: {line}')
+            directives[name] = value
+        else:
+            raise Exception(f'Unknown migration script directive: {line}')
+    return ScriptDirectives(**directives)
+
+
+DOLLAR_QUOTE_PATTERN = re.compile(r'\$([A-Za-z_][A-Za-z0-9_]*)?\$')
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split the script into statements by semicolons, which are not in quotes, dollar quotes or comments.
+    Backslashes escape only in escape strings, e.g. E'it\\'s', as standard_conforming_strings is on by default
+    """
+    statements = []
+    start = 0
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if char == '\'' and _is_escape_string_prefix(sql, i):
+            i = _find_escape_string_end(sql, i) + 1
+        elif char in ('\'', '"'):
+            end = sql.find(char, i + 1)
+            while end != -1 and sql.startswith(char, end + 1):  # escaped by doubling the quote
+                end = sql.find(char, end + 2)
+            if end == -1:
+                raise Exception(f'Found unterminated quote {char} at {i}')
+            i = end + 1
+        elif char == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = length if end == -1 else end + 1
+        elif char == '/' and sql.startswith('/*', i):
+            depth = 1
+            i += 2
+            while depth > 0:
+                if i >= length:
+                    raise Exception('Found unterminated comment')
+                if sql.startswith('/*', i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith('*/', i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+        elif char == '$' and (i == 0 or not (sql[i - 1].isalnum() or sql[i - 1] == '_')):
+            match = DOLLAR_QUOTE_PATTERN.match(sql, i)
+            if match:
+                end = sql.find(match.group(), match.end())
+                if end == -1:
+                    raise Exception(f'Found unterminated dollar quote {match.group()} at {i}')
+                i = end + len(match.group())
+            else:
+                i += 1
+        elif char == ';':
+            statements.append(sql[start:i + 1])
+            start = i + 1
+            i += 1
+        else:
+            i += 1
+    statements.append(sql[start:])
+    return [statement.strip() for statement in statements if not _is_blank(statement)]
+
+
+def _is_escape_string_prefix(sql: str, quote_index: int) -> bool:
+    # E or e right before the quote, which does not end an identifier, e.g. the type of date'2020-02-29'
+    return quote_index > 0 and sql[quote_index - 1] in 'Ee' and \
+        (quote_index == 1 or not (sql[quote_index - 2].isalnum() or sql[quote_index - 2] in '_$'))
+
+
+def _find_escape_string_end(sql: str, start: int) -> int:
+    i = start + 1
+    while i < len(sql):
+        if sql[i] == '\\':
+            i += 2
+        elif sql[i] == '\'':
+            if not sql.startswith('\'', i + 1):
+                return i
+            i += 2  # escaped by doubling the quote
+        else:
+            i += 1
+    raise Exception(f'Found unterminated quote \' at {start}')
+
+
+def _is_blank(statement: str) -> bool:
+    statement = statement.strip()
+    if not statement or statement == ';':
+        return True
+    return all(not line.strip() or line.strip().startswith('--') for line in statement.splitlines()) and \
+        '/*' not in statement
@@ -1,16 +1,27 @@
 import asyncio
+import contextlib
 import datetime as dt
+import functools
+import hashlib
+import json
 import os
+import re
+import threading
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Callable
 
 from blessings import Terminal
-from dynaconf import settings
 from invoke import task, Collection
 
-from fas.environment import ENV
+from fas.environment import ENV, settings
+from .audit import REGISTERED_QUERIES, audit_plans, import_query_modules
 from .client import DBClient, DBPool
-from .migration import load_versions, lock_scripts, check_no_scripts_not_locked, check_no_locked_scripts_changed
+from .exceptions import LockNotAvailableError
+from .lock import advisory_lock_key
+from .migration import load_versions, lock_scripts, check_no_scripts_not_locked, check_no_locked_scripts_changed, \
+    calculate_scripts_checksum, parse_directives, split_statements, ScriptDirectives, check_scripts_locked, \
+    save_snapshot, load_snapshot
 from .transaction import transactional
 
 t = Terminal()
@@ -26,10 +37,7 @@ def create_database_if_not_exist(c):
     if is_database_existed(c, env):
         print(t.yellow(f'Cannot create database {c.db.database}: already exist'))
         return
-    c.run(f'''
-        createdb -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {c.db.database} \
-        -T template0 -E UTF-8 --locale=C.UTF-8
-        ''', env=env)
+    _create_database(c, env, c.db.database)
     print(t.green(f'Created database {c.db.database}'))
 
 
@@ -50,17 +58,71 @@ def drop_database(c):
 
 
 @task(name='migrate')
-def migrate_database(c):
+def migrate_database(c, dry_run=False):
     """
-    Migrate database
+    Migrate database, each script is applied and recorded in its own transaction (or without transaction)
+    :param dry_run: run the scripts within a transaction rolled back at last, and report the locks each statement takes
     """
+    if dry_run:
+        check_no_locked_scripts_changed()
+        asyncio.run(_migrate_database(c.db.database, dry_run=True))
+        return
     if not (ENV.is_dev or ENV.is_test):
         check_no_scripts_not_locked()
         check_no_locked_scripts_changed()
-    create_database_if_not_exist(c)
+        create_database_if_not_exist(c)
+    else:
+        clone_database_if_not_exist(c)
     asyncio.run(_migrate_database(c.db.database))
 
 
+def clone_database_if_not_exist(c):
+    """
+    Keep the template database migrated with the current scripts, and create database by cloning the template,
+    which is much faster than replaying all the scripts
+    """
+    env = os.environ.copy()
+    env['PGPASSWORD'] = c.db.owner.password
+    template = _build_template_database_if_outdated(c, env)
+    if is_database_existed(c, env):
+        return
+    _create_database(c, env, c.db.database, template=template)
+    print(t.green(f'Cloned database {c.db.database} from {template}'))
+
+
+@task(name='clone')
+def clone_database(c, to_database):
+    """
+    Clone database from the template database, e.g. to create a database for each parallel test worker
+    :param to_database: name of the database to (re)create, dropped first if already exists
+    """
+    if not (ENV.is_dev or ENV.is_test):
+        raise Exception('Cannot clone database under environments other than dev or test')
+    env = os.environ.copy()
+    env['PGPASSWORD'] = c.db.owner.password
+    template = _build_template_database_if_outdated(c, env)
+    if is_database_existed(c, env, to_database):
+        c.run(f'dropdb -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {to_database}', env=env)
+    _create_database(c, env, to_database, template=template)
+    print(t.green(f'Cloned database {to_database} from {template}'))
+
+
+def _build_template_database_if_outdated(c, env):
+    """
+    The template database is rebuilt only when any migration script is added, changed or removed
+    """
+    template = f'{c.db.database}-template'
+    checksum = calculate_scripts_checksum()
+    if _get_database_comment(c, env, template) != f'{TEMPLATE_COMMENT_PREFIX}{checksum}':
+        if is_database_existed(c, env, template):
+            c.run(f'dropdb -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {template}', env=env)
+        _create_database(c, env, template)
+        asyncio.run(_migrate_database(template))
+        _set_database_comment(c, env, template, f'{TEMPLATE_COMMENT_PREFIX}{checksum}')
+        print(t.green(f'Built template database {template}'))
+    return template
+
+
 @task(name='reset')
 def reset_database(c):
     """
@@ -71,6 +133,56 @@ def reset_database(c):
     print(t.green(f'Reset database {c.db.database}'))
 
 
+@task(name='squash')
+def squash_migration_scripts(c, to_version):
+    """
+    Squash the locked migration scripts up to the version into a baseline snapshot, which a fresh database is
+    brought up from, instead of replaying all the scripts. Existing databases still apply the scripts.
+    :param to_version: the last version of the scripts squashed
+    """
+    to_version = int(to_version)
+    check_no_locked_scripts_changed()
+    check_scripts_locked(to_version=to_version)
+    env = os.environ.copy()
+    env['PGPASSWORD'] = c.db.owner.password
+    build_database = f'{c.db.database}-squash'
+    verify_database = f'{c.db.database}-squash-verify'
+    try:
+        for database in (build_database, verify_database):
+            if is_database_existed(c, env, database):
+                c.run(f'dropdb -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {database}', env=env)
+            _create_database(c, env, database)
+        asyncio.run(_migrate_database(build_database, to_version=to_version, use_snapshot=False))
+        snapshot_sql = _dump_snapshot(c, env, build_database)
+        # verified by restoring the snapshot into another database, which should be dumped as the same snapshot
+        asyncio.run(_restore_snapshot(verify_database, snapshot_sql))
+        if _dump_snapshot(c, env, verify_database) != snapshot_sql:
+            raise Exception('Failed squashing migration scripts: the baseline snapshot cannot be restored as is')
+    finally:
+        for database in (build_database, verify_database):
+            if is_database_existed(c, env, database):
+                c.run(f'dropdb -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {database}', env=env)
+    snapshot_path = save_snapshot(to_version, snapshot_sql)
+    print(t.green(f'Squashed migration scripts up to version {to_version} into {snapshot_path.name}'))
+
+
+def _dump_snapshot(c, env, database):
+    # INSERT instead of COPY, so that the snapshot can be executed within the migration transaction
+    r = c.run(f'''
+        pg_dump -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -d {database} \
+        --no-owner --no-privileges --inserts --rows-per-insert=1000 -T {MIGRATION_TABLE}
+        ''', hide='out', env=env)
+    # psql meta-commands, e.g. \restrict of newer pg_dump versions, cannot be executed by the server
+    return ''.join(line for line in r.stdout.splitlines(keepends=True) if not line.startswith('\\'))
+
+
+async def _restore_snapshot(db_name: str, sql: str):
+    async with DBPool(**{**settings.DB, 'database': db_name, 'mode': 'session'}) as pool:
+        async with pool.acquire() as db:
+            async with await db.transaction():
+                await db.conn.execute(sql)
+
+
 @task(name='lock-scripts')
 def lock_migration_scripts(c):
     """
@@ -83,84 +195,467 @@ def lock_migration_scripts(c):
         print(t.green(f'Locked {locked_count} migration scripts for database {c.db.database}'))
 
 
-@task(name='backup')
-def create_backup(c, to_file=None):
+@task(name='backup', iterable=['table', 'exclude_table_data'])
+def create_backup(c, to_dir=None, jobs=4, compress=6, table=None, exclude_table_data=None, verify=True,
+                  progress_interval=10.0):
     """
-    Create database backup
+    Create database backup in directory format, with tables dumped in parallel, reporting the tables started
+    (by pg_dump -v) and the size written so far
+    :param to_dir: backup directory, defaults to <database>.dump
+    :param jobs: number of tables dumped at the same time
+    :param compress: compression level, from 0 (no compression) to 9
+    :param table: back up only this table, can be given multiple times, e.g. to back up channel_event separately
+    :param exclude_table_data: back up the definition but not the data of this table, can be given multiple times
+    :param verify: verify the backup after created
+    :param progress_interval: seconds between the reports of the size written so far, 0 for no reports
     """
     env = os.environ.copy()
     env['PGPASSWORD'] = c.db.owner.password
-    to_file = to_file or f'{c.db.database}.dump'
-    print(f'Be about to back up {c.db.database} to {to_file}')
-    c.run(f'pg_dump -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -d {c.db.database} -v -b -Fc -f "{to_file}"',
-          env=env)
-    print(t.green(f'Backed up {c.db.database} to {to_file}'))
+    to_dir = Path(to_dir or f'{c.db.database}.dump')
+    if to_dir.exists():
+        raise Exception(f'Cannot back up {c.db.database} to {to_dir}: already exist')
+    options = [f'-j {jobs}', f'-Z {compress}']
+    options.extend(f'-t "{table_name}"' for table_name in table or ())
+    options.extend(f'--exclude-table-data="{table_name}"' for table_name in exclude_table_data or ())
+    print(f'Be about to back up {c.db.database} to {to_dir}')
+    started_at = time.monotonic()
+    with _report_backup_size(to_dir, interval=progress_interval):
+        c.run(f'pg_dump -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -d {c.db.database} -v -b -Fd '
+              f'{" ".join(options)} -f "{to_dir}"', env=env)
+    _write_backup_checksums(to_dir)
+    print(t.green(f'Backed up {c.db.database} to {to_dir}: {_get_backup_size(to_dir) / 1024 ** 2:.1f} MiB '
+                  f'in {time.monotonic() - started_at:.1f} seconds'))
+    if verify:
+        verify_backup(c, to_dir)
+
+
+@task(name='verify-backup')
+def verify_backup(c, from_dir=None):
+    """
+    Verify database backup: check the checksums of the backup files and the table of contents
+    :param from_dir: backup directory, defaults to <database>.dump
+    """
+    from_dir = Path(from_dir or f'{c.db.database}.dump')
+    _verify_backup_checksums(from_dir)
+    c.run(f'pg_restore -l -Fd "{from_dir}"', hide='out')
+    print(t.green(f'Verified backup {from_dir}'))
 
 
-@task(name='restore')
-def restore_backup(c, from_file=None):
+@task(name='restore', iterable=['table'])
+def restore_backup(c, from_path=None, jobs=4, table=None):
     """
-    Restore database backup
+    Restore database backup, with tables restored in parallel
+    :param from_path: backup directory (or file of the custom format), defaults to <database>.dump
+    :param jobs: number of tables restored at the same time
+    :param table: restore only the data of this table into the existing database, can be given multiple times,
+    e.g. to restore channel_event backed up separately
     """
     env = os.environ.copy()
     env['PGPASSWORD'] = c.db.owner.password
-    from_file = from_file or f'{c.db.database}.dump'
-    print(f'Be about to restore {c.db.database} from {from_file}')
-    c.run(
-        f'pg_restore -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -d postgres -v -C -c -e -O -Fc "{from_file}"',
-        env=env)
-    print(t.green(f'Restored {c.db.database} from {from_file}'))
+    from_path = Path(from_path or f'{c.db.database}.dump')
+    if from_path.is_dir():
+        _verify_backup_checksums(from_path)
+        backup_format = 'd'
+    else:
+        backup_format = 'c'
+    if table:
+        target = ' '.join([f'-d {c.db.database} -a', *(f'-t "{table_name}"' for table_name in table)])
+    else:
+        target = '-d postgres -C -c'
+    print(f'Be about to restore {c.db.database} from {from_path}')
+    started_at = time.monotonic()
+    c.run(f'pg_restore -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {target} -v -e -O -j {jobs} '
+          f'-F{backup_format} "{from_path}"', env=env)
+    print(t.green(f'Restored {c.db.database} from {from_path} in {time.monotonic() - started_at:.1f} seconds'))
+
+
+BACKUP_CHECKSUMS_FILE = 'SHA256SUMS'
+
+
+def _write_backup_checksums(backup_dir: Path):
+    lines = [f'{_calculate_sha256_hash(path)}  {path.name}' for path in sorted(backup_dir.iterdir())]
+    (backup_dir / BACKUP_CHECKSUMS_FILE).write_text('\n'.join(lines) + '\n')
+
+
+def _verify_backup_checksums(backup_dir: Path):
+    checksums_path = backup_dir / BACKUP_CHECKSUMS_FILE
+    if not checksums_path.exists():
+        raise Exception(f'Found no checksums of backup {backup_dir}')
+    expected_checksums = {}
+    for line in checksums_path.read_text().splitlines():
+        checksum, name = line.split('  ', maxsplit=1)
+        expected_checksums[name] = checksum
+    actual_names = {path.name for path in backup_dir.iterdir() if path.name != BACKUP_CHECKSUMS_FILE}
+    if actual_names != set(expected_checksums):
+        raise Exception(f'Found missing or unexpected files in backup {backup_dir}: '
+                        f'{sorted(actual_names.symmetric_difference(expected_checksums))}')
+    for name, expected_checksum in expected_checksums.items():
+        if _calculate_sha256_hash(backup_dir / name) != expected_checksum:
+            raise Exception(f'Found corrupted file in backup {backup_dir}: {name}')
+
+
+def _calculate_sha256_hash(path: Path) -> str:
+    m = hashlib.sha256()
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            m.update(chunk)
+    return m.hexdigest()
+
+
+def _get_backup_size(backup_dir: Path) -> int:
+    return sum(path.stat().st_size for path in backup_dir.iterdir())
+
+
+@contextlib.contextmanager
+def _report_backup_size(backup_dir: Path, *, interval: float):
+    """
+    Report the size of the backup written so far every ``interval`` seconds, while the tables are being dumped
+    """
+    if not interval:
+        yield
+        return
+    stopped = threading.Event()
+
+    def report():
+        started_at = time.monotonic()
+        while not stopped.wait(interval):
+            if backup_dir.exists():
+                size, elapsed = _get_backup_size(backup_dir) / 1024 ** 2, time.monotonic() - started_at
+                print(f'Written {size:.1f} MiB of backup {backup_dir} in {elapsed:.0f} seconds: '
+                      f'{size / elapsed:.1f} MiB/s', flush=True)
+
+    thread = threading.Thread(target=report, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+PLANS_SNAPSHOT_PATH = ENV.root_dir / 'db' / 'plans.json'
+
+
+@task(name='audit-plans')
+def audit_query_plans(c, module='fas.model', threshold=1000, analyze=True, update=False):
+    """
+    Explain the registered queries against the (seeded) database, flag sequential scans and sorts over many rows,
+    and fail when any plan, or any problem flagged, differs from the plan snapshot
+    :param module: the package whose modules register the queries when imported
+    :param threshold: at least how many rows scanned or sorted are flagged
+    :param analyze: analyze the database first, so that the planner knows the seeded data
+    :param update: update the plan snapshot instead of comparing with it
+    """
+    import_query_modules(module)
+    if not REGISTERED_QUERIES:
+        raise Exception(f'No queries registered by importing {module}, nothing to audit')
+    audits = asyncio.run(_audit_query_plans(c.db.database, threshold=int(threshold), analyze=analyze))
+    snapshot = json.loads(PLANS_SNAPSHOT_PATH.read_text()) if PLANS_SNAPSHOT_PATH.exists() else {}
+    changed_names = []
+    for audit in audits:
+        expected = snapshot.get(audit.name)
+        if expected == audit.to_snapshot():
+            print(f'{audit.name}')
+            for line in audit.plan:
+                print(f'  {line}')
+        else:
+            changed_names.append(audit.name)
+            if expected is None:
+                print(t.yellow(f'{audit.name}: new plan'))
+            elif expected['plan'] != audit.plan:
+                print(t.yellow(f'{audit.name}: plan changed'))
+            else:
+                print(t.yellow(f'{audit.name}: problems changed'))
+            for line in (expected or {}).get('plan', ()):
+                print(t.red(f'  - {line}'))
+            for line in audit.plan:
+                print(f'  + {line}')
+        expected_problems = (expected or {}).get('problems', ())
+        for problem in audit.problems:
+            print(t.yellow(f'  ! {problem}') if problem.node in expected_problems else t.red(f'  ! new: {problem}'))
+    removed_names = sorted(set(snapshot) - {audit.name for audit in audits})
+    for name in removed_names:
+        print(t.yellow(f'{name}: not registered any more'))
+    if update:
+        snapshot = {audit.name: audit.to_snapshot() for audit in audits}
+        PLANS_SNAPSHOT_PATH.write_text(json.dumps(snapshot, indent=2, ensure_ascii=False) + '\n')
+        print(t.green(f'Updated plan snapshot of {len(audits)} queries'))
+    elif changed_names or removed_names:
+        raise Exception(f'Found query plans or problems differing from the snapshot: '
+                        f'{", ".join(changed_names + removed_names)}, run with --update after reviewing them')
+    else:
+        print(t.green(f'Audited plans of {len(audits)} queries: '
+                      f'{sum(len(a.problems) for a in audits)} problems, as in the snapshot'))
+
+
+async def _audit_query_plans(db_name: str, *, threshold: int, analyze: bool):
+    async with DBPool(**{**settings.DB, 'database': db_name}) as pool:
+        async with pool.acquire() as db:
+            if analyze:
+                await db.execute('ANALYZE')
+            return await audit_plans(db, threshold=threshold)
 
 
-def is_database_existed(c, env):
+def is_database_existed(c, env, database=None):
     r = c.run(f'''
         psql -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -lqt | cut -d \\| -f 1 | awk '{{$1=$1}};1' | \
-        grep -x {c.db.database} | wc -l
+        grep -x {database or c.db.database} | wc -l
         ''', hide='out', env=env)
     return 1 == int(r.stdout)
 
 
+def _create_database(c, env, database, *, template='template0'):
+    c.run(f'''
+        createdb -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} {database} \
+        -T {template} -E UTF-8 --locale=C.UTF-8
+        ''', env=env)
+
+
+TEMPLATE_COMMENT_PREFIX = 'migrated scripts checksum: '
+
+
+def _get_database_comment(c, env, database):
+    r = c.run(f'''
+        psql -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -d postgres -Atc \
+        "SELECT SHOBJ_DESCRIPTION(oid, 'pg_database') FROM pg_database WHERE datname='{database}'"
+        ''', hide='out', env=env)
+    return r.stdout.strip()
+
+
+def _set_database_comment(c, env, database, comment):
+    c.run(f'''
+        psql -h {c.db.host} -p {c.db.port} -U {c.db.owner.name} -d postgres -qc \
+        "COMMENT ON DATABASE \\"{database}\\" IS '{comment}'"
+        ''', env=env)
+
+
 MIGRATION_TABLE = 'database_migration'
-MIGRATION_LOCK_KEY = hash(f'i48gEtCCfX1lxPpWgVyBYH1z4VQpFNz7+{MIGRATION_TABLE}')
+MIGRATION_LOCK_KEY = advisory_lock_key(f'i48gEtCCfX1lxPpWgVyBYH1z4VQpFNz7+{MIGRATION_TABLE}')
 
 
-async def _migrate_database(db_name: str):
-    async with DBPool(**settings.DB) as pool:
+async def _migrate_database(db_name: str, *, dry_run: bool = False, to_version: int = None,
+                            use_snapshot: bool = True):
+    # session mode, as the migration lock and timeouts of non-transactional scripts are kept in the session
+    async with DBPool(**{**settings.DB, 'database': db_name, 'mode': 'session'}) as pool:
         async with pool.acquire() as db:
-            await _migrate(db, db_name)
+            await _migrate(db, db_name, dry_run=dry_run, to_version=to_version, use_snapshot=use_snapshot)
 
 
-@transactional
-async def _migrate(db: DBClient, db_name: str):
-    locked = await db.try_transaction_lock(MIGRATION_LOCK_KEY)
+async def _migrate(db: DBClient, db_name: str, *, dry_run: bool = False, to_version: int = None,
+                   use_snapshot: bool = True):
+    # session level lock, as every script is applied in its own transaction, or even without transaction
+    locked = await db.try_session_lock(MIGRATION_LOCK_KEY)
     if not locked:
         print(t.yellow(f'Did not migrate database {db_name}: cannot run migration in parallel'))
         return
-
+    try:
+        if dry_run:
+            try:
+                async with await db.transaction():
+                    await _migrate_versions(db, db_name, dry_run=True, to_version=to_version,
+                                            use_snapshot=use_snapshot)
+                    raise _DryRunRollback()
+            except _DryRunRollback:
+                pass
+        else:
+            await _migrate_versions(db, db_name, to_version=to_version, use_snapshot=use_snapshot)
+    finally:
+        await db.session_unlock(MIGRATION_LOCK_KEY)
+
+
+class _DryRunRollback(Exception):
+    pass
+
+
+async def _migrate_versions(db: DBClient, db_name: str, *, dry_run: bool = False, to_version: int = None,
+                            use_snapshot: bool = True):
     await create_database_migration_table_if_not_exist(db)
     current_version = await db.get_scalar(
         'SELECT to_version FROM database_migration ORDER BY id DESC LIMIT 1') or 0
 
     new_versions = load_versions(after=current_version)
+    if to_version is not None:
+        new_versions = {version: sql_path for version, sql_path in new_versions.items() if version <= to_version}
     if not new_versions:
         print(t.yellow(f'Did not migrate database {db_name}: no scripts after version {current_version}'))
         return
 
     to_version = max(new_versions)
-    print(f'Be about to migrate {db_name} from {current_version} to {to_version}')
-    await execute_migration_scripts(db, current_version, to_version, new_versions)
-    print(t.green(f'Migrated {db_name} from {current_version} to {to_version}'))
+    print(f'Be about to {"dry run migrating" if dry_run else "migrate"} {db_name} '
+          f'from {current_version} to {to_version}')
+    started_at = time.monotonic()
+    from_version = current_version
+    # only a fresh database is brought up from the baseline snapshot, others keep applying the scripts
+    snapshot = load_snapshot(to_version=to_version) if use_snapshot and current_version == 0 else None
+    if snapshot:
+        from_version, snapshot_sql = snapshot
+        await apply_baseline_snapshot(db, from_version, snapshot_sql)
+    for version in range(from_version + 1, to_version + 1):
+        if dry_run:
+            await dry_run_migration_script(db, version, new_versions[version])
+        else:
+            await execute_migration_script(db, version, new_versions[version])
+    if dry_run:
+        print(t.green(f'Dry run migrating {db_name} from {current_version} to {to_version}: rolled back'))
+    else:
+        print(t.green(f'Migrated {db_name} from {current_version} to {to_version} '
+                      f'in {time.monotonic() - started_at:.3f} seconds'))
 
 
 @transactional
-async def execute_migration_scripts(db: DBClient, from_version: int, to_version: int, versions: Dict[int, Path]):
-    for version in range(from_version + 1, to_version + 1):
-        print(f'Applying version: {version}')
-        await db.execute(versions[version].read_text(encoding='UTF-8'))
-    await db.insert('database_migration', from_version=from_version, to_version=to_version,
+async def apply_baseline_snapshot(db: DBClient, to_version: int, sql: str):
+    print(f'Applying baseline snapshot up to version: {to_version}')
+    started_at = time.monotonic()
+    await db.conn.execute(sql)
+    await db.conn.execute('RESET ALL')  # the snapshot changes settings of the session, e.g. search_path
+    await db.insert('database_migration', from_version=0, to_version=to_version,
+                    migrated_at=dt.datetime.now(dt.timezone.utc))
+    print(f'  {time.monotonic() - started_at:8.3f}s  baseline-{to_version:04}.snapshot')
+
+
+MIGRATION_RETRY_BACKOFF = 1  # seconds before the first retry, doubled for each retry after
+MIGRATION_MAX_RETRY_BACKOFF = 30
+
+
+async def execute_migration_script(db: DBClient, version: int, sql_path: Path):
+    """
+    Apply and record one script, retry after backoff when lock timed out
+    """
+    sql = sql_path.read_text(encoding='UTF-8')
+    directives = parse_directives(sql)
+    statements = split_statements(sql)
+    print(f'Applying version: {version} {directives}')
+    if directives.transactional:
+        await _retry_if_lock_timed_out(
+            directives, f'version {version}',
+            functools.partial(_execute_statements_transactionally, db, version, directives, statements))
+    else:
+        await _set_timeouts(db, directives, is_local=False)
+        try:
+            for statement in statements:
+                await _retry_if_lock_timed_out(directives, _describe_statement(statement),
+                                               functools.partial(_execute_statement_non_transactionally, db, statement))
+        finally:
+            await db.execute('RESET lock_timeout')
+            await db.execute('RESET statement_timeout')
+        await _record_migration(db, version)
+
+
+@transactional
+async def _execute_statements_transactionally(db: DBClient, version: int, directives: ScriptDirectives,
+                                              statements: List[str]):
+    await _set_timeouts(db, directives, is_local=True)
+    for statement in statements:
+        await _execute_statement(db, statement)
+    await _record_migration(db, version)
+
+
+async def _retry_if_lock_timed_out(directives: ScriptDirectives, description: str, func: Callable):
+    for retry_count in range(directives.retries + 1):
+        try:
+            return await func()
+        except LockNotAvailableError:
+            if retry_count == directives.retries:
+                raise
+            backoff = min(MIGRATION_RETRY_BACKOFF * 2 ** retry_count, MIGRATION_MAX_RETRY_BACKOFF)
+            print(t.yellow(f'Lock timed out ({directives.lock_timeout}) applying {description}, '
+                           f'retry {retry_count + 1}/{directives.retries} after {backoff} seconds'))
+            await asyncio.sleep(backoff)
+
+
+async def _set_timeouts(db: DBClient, directives: ScriptDirectives, *, is_local: bool):
+    await db.execute("SELECT SET_CONFIG('lock_timeout', :lock_timeout, :is_local)",
+                     lock_timeout=directives.lock_timeout, is_local=is_local)
+    await db.execute("SELECT SET_CONFIG('statement_timeout', :statement_timeout, :is_local)",
+                     statement_timeout=directives.statement_timeout, is_local=is_local)
+
+
+async def _execute_statement(db: DBClient, statement: str):
+    started_at = time.monotonic()
+    await db.conn.execute(statement)  # not rendered, colons in scripts are not parameters
+    print(f'  {time.monotonic() - started_at:8.3f}s  {_describe_statement(statement)}')
+
+
+async def _execute_statement_non_transactionally(db: DBClient, statement: str):
+    invalid_indexes = set(await db.list_scalar(INVALID_INDEXES_SQL))
+    try:
+        await _execute_statement(db, statement)
+    except LockNotAvailableError:
+        # e.g. CREATE INDEX CONCURRENTLY leaves an invalid index behind, which IF NOT EXISTS skips when retried
+        for index in await db.list_scalar(INVALID_INDEXES_SQL):
+            if index not in invalid_indexes:
+                print(t.yellow(f'Dropping invalid index {index} left by the timed out statement'))
+                await db.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+        raise
+
+
+INVALID_INDEXES_SQL = 'SELECT indexrelid::REGCLASS::TEXT FROM pg_index WHERE NOT indisvalid'
+
+
+async def _record_migration(db: DBClient, version: int):
+    await db.insert('database_migration', from_version=version - 1, to_version=version,
                     migrated_at=dt.datetime.now(dt.timezone.utc))
 
 
+async def dry_run_migration_script(db: DBClient, version: int, sql_path: Path):
+    """
+    Run the statements of one script within the outer transaction rolled back at last, and report the locks each
+    statement newly took, i.e. what queries it would block. Statements of non-transactional scripts cannot run within
+    a transaction, so they are not run and their locks are guessed from the statements.
+    """
+    sql = sql_path.read_text(encoding='UTF-8')
+    directives = parse_directives(sql)
+    print(f'Dry running version: {version} {directives}')
+    if directives.transactional:
+        await _set_timeouts(db, directives, is_local=True)
+    for statement in split_statements(sql):
+        if directives.transactional:
+            locks_before = set(await db.list(LOCKS_SQL))
+            await _execute_statement(db, statement)
+            locks = [lock for lock in await db.list(LOCKS_SQL) if lock not in locks_before]
+        else:
+            print(f'  {"not run":>9}  {_describe_statement(statement)}')
+            locks = guess_locks(statement)
+        for lock in locks:
+            print(f'{"":13}{lock["mode"]:<26}{lock["relation"]}')
+    await _record_migration(db, version)
+
+
+LOCKS_SQL = '''
+    SELECT relation::REGCLASS::TEXT AS relation, mode
+    FROM pg_locks
+    WHERE pid=PG_BACKEND_PID() AND locktype='relation' AND relation<>'pg_locks'::REGCLASS AND granted
+    ORDER BY relation::REGCLASS::TEXT, mode
+    '''
+CONCURRENTLY_PATTERN = re.compile(
+    r'(?:CREATE\s+(?:UNIQUE\s+)?INDEX|DROP\s+INDEX|REINDEX\s+\w+)\s+CONCURRENTLY\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?'
+    r'("[^"]+"|[\w.]+)(?:\s+ON\s+(?:ONLY\s+)?("[^"]+"|[\w.]+))?', re.IGNORECASE)
+MAINTENANCE_PATTERN = re.compile(r'(?:VACUUM|ANALYZE)\b(?:\s*\([^)]*\))?(?:\s+(?:VERBOSE|FULL|FREEZE|ANALYZE))*'
+                                 r'\s*("[^"]+"|[\w.]+)?', re.IGNORECASE)
+
+
+def guess_locks(statement: str) -> List[Dict[str, str]]:
+    """
+    Guess the locks of statements which can only run outside transactions
+    """
+    statement = ' '.join(line for line in statement.splitlines() if not line.strip().startswith('--')).strip()
+    match = CONCURRENTLY_PATTERN.match(statement)
+    if match:
+        return [{'mode': 'ShareUpdateExclusiveLock', 'relation': match.group(2) or match.group(1)}]
+    match = MAINTENANCE_PATTERN.match(statement)
+    if match:
+        mode = 'AccessExclusiveLock' if re.search(r'\bFULL\b', statement, re.IGNORECASE) else \
+            'ShareUpdateExclusiveLock'
+        return [{'mode': mode, 'relation': match.group(1) or '(all tables)'}]
+    return [{'mode': '(unknown)', 'relation': '(unknown)'}]
+
+
+def _describe_statement(statement: str, max_length: int = 80) -> str:
+    lines = [line.strip() for line in statement.splitlines() if line.strip() and not line.strip().startswith('--')]
+    description = ' '.join(lines)
+    return description if len(description) <= max_length else f'{description[:max_length - 3]}...'
+
+
 async def create_database_migration_table_if_not_exist(db: DBClient):
     await db.execute(f'''
         CREATE TABLE IF NOT EXISTS {MIGRATION_TABLE} (
@@ -176,5 +671,6 @@ async def create_database_migration_table_if_not_exist(db: DBClient):
 
 
 db_tasks = Collection('db', create_database_if_not_exist, drop_database, reset_database, migrate_database,
-                      lock_migration_scripts, create_backup, restore_backup)
+                      clone_database, lock_migration_scripts, squash_migration_scripts, create_backup, verify_backup,
+                      restore_backup, audit_query_plans)
 db_tasks.configure({'db': {**settings.DB, 'owner': settings.DB_OWNER}})
@@ -30,8 +30,11 @@ class TransactionDecorator:
             if db.is_in_transaction:
                 return await func(db, *args, **kwargs)
             else:
-                async with await db.transaction(isolation=self.isolation, readonly=self.readonly,
-                                                deferrable=self.deferrable):
-                    return await func(db, *args, **kwargs)
+                try:
+                    async with await db.transaction(isolation=self.isolation, readonly=self.readonly,
+                                                    deferrable=self.deferrable):
+                        return await func(db, *args, **kwargs)
+                finally:
+                    await db._release_if_necessary()
 
         return wrapper
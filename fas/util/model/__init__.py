@@ -1,11 +1,19 @@
 from .entity import Entity
+from .entity import ReadModel
+from .entity import read_model
 
 from .misc import ResourceID
 from .misc import Message
+from .misc import NEXT_CURSOR_HEADER
+from .misc import PAGE_HEADERS
 
 __all__ = [
     Entity.__name__,
+    ReadModel.__name__,
+    read_model.__name__,
 
     ResourceID.__name__,
     Message.__name__,
+    'NEXT_CURSOR_HEADER',
+    'PAGE_HEADERS',
 ]
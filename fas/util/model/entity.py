@@ -1,5 +1,4 @@
-from functools import lru_cache
-from typing import Tuple, Any
+from typing import Tuple, Any, Dict, Type
 
 from pydantic import BaseModel
 
@@ -31,8 +30,93 @@ class Entity(BaseModel):
     def __hash__(self) -> int:
         if not self.identifiable:
             return super().__hash__()
-        return self.__hash_entity__()
-
-    @lru_cache(maxsize=8192)
-    def __hash_entity__(self) -> int:
         return hash(tuple(getattr(self, attr_name) for attr_name in self.primary_key))
+
+
+_REQUIRED = object()
+
+
+class ReadModel:
+    """Read-only, compact representation of an entity, e.g. a query result kept in memory.
+
+    Attributes live in ``__slots__`` and the hash is computed once and cached,
+    so a read model takes a fraction of the memory of its pydantic entity.
+    Do not subclass it directly, use `read_model` to get the read model of an entity class.
+    """
+    __slots__ = ('_hash',)
+    __fields__: Dict[str, Any] = {}  # field name => default value
+    entity_cls: Type[Entity] = None
+    primary_key: Tuple[str] = ('id',)
+
+    def __init__(self, **kwargs: Any) -> None:
+        for name, default in self.__fields__.items():
+            value = kwargs.get(name, default)
+            if value is _REQUIRED:
+                raise TypeError(f'{type(self).__name__} missing required field: {repr(name)}')
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_hash', None)
+
+    @property
+    def identifiable(self) -> bool:
+        return self.id > 0
+
+    def keys(self):
+        fields_keys = self.__fields__.keys()
+        return fields_keys if self.identifiable else (k for k in fields_keys if k not in self.primary_key)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__fields__}
+
+    def to_entity(self) -> Entity:
+        return self.entity_cls(**self.dict())
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, type(self)):
+            return False
+        attr_names = self.primary_key if self.identifiable else self.__fields__
+        return all(getattr(self, attr_name) == getattr(other, attr_name) for attr_name in attr_names)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            attr_names = self.primary_key if self.identifiable else self.__fields__
+            object.__setattr__(self, '_hash', hash(tuple(getattr(self, attr_name) for attr_name in attr_names)))
+        return self._hash
+
+    def __repr__(self) -> str:
+        attrs = ', '.join(f'{name}={repr(getattr(self, name))}' for name in self.__fields__)
+        return f'{type(self).__name__}({attrs})'
+
+
+_READ_MODELS: Dict[Type[Entity], Type[ReadModel]] = {}
+
+
+def read_model(entity_cls: Type[Entity]) -> Type[ReadModel]:
+    """Returns the read model class of the given entity class, which can be used as ``to_cls`` of queries
+
+    .. code-block:: python
+
+        await db.list('SELECT * FROM organization', to_cls=read_model(Organization))
+    """
+    try:
+        return _READ_MODELS[entity_cls]
+    except KeyError:
+        pass
+    fields = {name: _REQUIRED if field.required else field.default for name, field in entity_cls.__fields__.items()}
+    cls = type(f'{entity_cls.__name__}ReadModel', (ReadModel,), {
+        '__slots__': tuple(fields),
+        '__fields__': fields,
+        '__module__': entity_cls.__module__,
+        '__qualname__': f'{entity_cls.__qualname__}ReadModel',
+        'entity_cls': entity_cls,
+    })
+    _READ_MODELS[entity_cls] = cls
+    return cls
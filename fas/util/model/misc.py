@@ -7,3 +7,13 @@ class ResourceID(BaseModel):
 
 class Message(BaseModel):
     detail: str
+
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+PAGE_HEADERS = {
+    NEXT_CURSOR_HEADER: {
+        'description': 'Cursor of the next page, pass it as `cursor` to get the next page. Absent on the last page',
+        'schema': {'type': 'string'},
+    },
+}
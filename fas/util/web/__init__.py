@@ -1,5 +1,8 @@
 from .hash import hash_password
 from .hash import verify_password
+from .hash import password_needs_rehash
+from .hash import hash_password_async
+from .hash import verify_password_async
 from .hash import generate_password
 from .hash import create_signed_value
 from .hash import decode_signed_value
@@ -11,9 +14,28 @@ from .cookie import set_secure_cookie
 from .cookie import delete_cookie
 from .cookie import delete_all_cookies
 
+from .throttle import create_throttle
+from .throttle import format_throttle_metrics
+
+from .middleware import DBMiddleware
+from .middleware import HeadersMiddleware
+
+from .compression import CompressionMiddleware
+
+from .etag import make_etag
+from .etag import etag_matches
+from .etag import set_etag
+from .etag import not_modified_response
+
+from .response import EntityJSONResponse
+from .response import entity_response
+
 __all__ = [
     hash_password.__name__,
     verify_password.__name__,
+    password_needs_rehash.__name__,
+    hash_password_async.__name__,
+    verify_password_async.__name__,
     generate_password.__name__,
     create_signed_value.__name__,
     decode_signed_value.__name__,
@@ -24,4 +46,20 @@ __all__ = [
     set_secure_cookie.__name__,
     delete_cookie.__name__,
     delete_all_cookies.__name__,
+
+    create_throttle.__name__,
+    format_throttle_metrics.__name__,
+
+    DBMiddleware.__name__,
+    HeadersMiddleware.__name__,
+
+    CompressionMiddleware.__name__,
+
+    make_etag.__name__,
+    etag_matches.__name__,
+    set_etag.__name__,
+    not_modified_response.__name__,
+
+    EntityJSONResponse.__name__,
+    entity_response.__name__,
 ]
@@ -0,0 +1,222 @@
+"""
+Pure ASGI response compression, negotiating gzip, and brotli or zstd when their packages are installed.
+"""
+import functools
+import zlib
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from fas.util.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_CONTENT_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                              'application/xml', 'image/svg+xml')  # the types ending with / are prefixes
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # the default 11 is for static files, too slow for responses
+ZSTD_LEVEL = 3
+
+
+class _GzipCompressor:
+    __slots__ = ('_compressobj',)
+
+    def __init__(self) -> None:
+        self._compressobj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()
+
+
+class _BrotliCompressor:
+    __slots__ = ('_compressor',)
+
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    __slots__ = ('_compressobj',)
+
+    def __init__(self) -> None:
+        self._compressobj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()
+
+
+# in the order of preference when the client accepts more than one of them equally
+COMPRESSORS: Dict[str, Callable] = {
+    **({'br': _BrotliCompressor} if brotli else {}),
+    **({'zstd': _ZstdCompressor} if zstandard else {}),
+    'gzip': _GzipCompressor,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def negotiate_encoding(accept_encoding: str, encodings: Tuple[str, ...] = tuple(COMPRESSORS)) -> Optional[str]:
+    """
+    Choose the encoding of the highest quality value in the Accept-Encoding header, or None if none is acceptable
+    """
+    qualities = {}
+    for item in accept_encoding.lower().split(','):
+        coding, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip()] = quality
+    wildcard_quality = qualities.get('*', 0.0)
+    best_encoding, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard_quality)
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+class CompressionMiddleware:
+    """
+    Compress the responses of the allowed content types, if the client accepts any of the supported encodings.
+    A body sent at once is compressed if it has at least ``minimum_size`` bytes, a streamed one is compressed
+    chunk by chunk as it is streamed.
+
+    The compressed bodies of GET responses with a strong ETag are cached by the path, the query, the ETag and
+    the encoding, so that the same payload is not compressed again on every request.
+    The ETag of a compressed response becomes weak, as the compressed body is not the same byte by byte,
+    which still matches ``If-None-Match`` by the weak comparison.
+    """
+    __slots__ = ('app', 'minimum_size', 'content_types', 'cache', 'max_cached_size')
+
+    def __init__(self, app: ASGIApp, *, minimum_size: int = 1024,
+                 content_types: Sequence[str] = COMPRESSIBLE_CONTENT_TYPES, cache_size: int = 128,
+                 cache_ttl: float = 300, max_cached_size: int = 256 * 1024) -> None:
+        self.app: ASGIApp = app
+        self.minimum_size: int = minimum_size
+        self.content_types: Tuple[str, ...] = tuple(content_types)
+        self.cache: TTLCache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.max_cached_size: int = max_cached_size  # bytes of a compressed body to cache at most
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next((value for name, value in scope['headers'] if name == b'accept-encoding'), b'')
+        encoding = negotiate_encoding(accept_encoding.decode('latin-1')) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        cache_key = (scope['path'], scope['query_string']) if scope['method'] == 'GET' else None
+        await self.app(scope, receive, _CompressionResponder(self, encoding, cache_key, send).send)
+
+    def is_compressible(self, status: int, headers: MutableHeaders) -> bool:
+        if status < 200 or status in (204, 304) or 'content-encoding' in headers:
+            return False
+        if 'no-transform' in headers.get('cache-control', ''):
+            return False
+        content_type = headers.get('content-type', '').partition(';')[0].strip().lower()
+        return any(content_type.startswith(t) if t.endswith('/') else content_type == t for t in self.content_types)
+
+
+class _CompressionResponder:
+    __slots__ = ('middleware', 'encoding', 'cache_key', 'send_', 'start', 'compressor')
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, cache_key: Optional[Tuple],
+                 send: Send) -> None:
+        self.middleware: CompressionMiddleware = middleware
+        self.encoding: str = encoding
+        self.cache_key: Optional[Tuple] = cache_key
+        self.send_: Send = send
+        self.start: Optional[Message] = None  # held until the first body tells whether and how to compress
+        self.compressor = None  # of the streamed body
+
+    async def send(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            headers = MutableHeaders(raw=list(message.get('headers', ())))
+            if self.middleware.is_compressible(message['status'], headers):
+                self.start = message
+            else:
+                await self.send_(message)
+        elif message['type'] == 'http.response.body' and self.start is not None:
+            start, self.start = self.start, None
+            if message.get('more_body', False):
+                await self._start_streaming(start, message)
+            else:
+                await self._send_whole(start, message)
+        elif message['type'] == 'http.response.body' and self.compressor is not None:
+            more_body = message.get('more_body', False)
+            body = self.compressor.compress(message.get('body', b''))
+            if not more_body:
+                body += self.compressor.finish()
+                self.compressor = None
+            if body or not more_body:
+                await self.send_({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+        else:
+            await self.send_(message)
+
+    async def _send_whole(self, start: Message, message: Message) -> None:
+        body = message.get('body', b'')
+        if len(body) < self.middleware.minimum_size:
+            await self.send_(start)
+            await self.send_(message)
+            return
+        headers = MutableHeaders(raw=list(start.get('headers', ())))
+        etag = headers.get('etag', '')
+        cache_key = None
+        if self.cache_key and start['status'] == 200 and etag.startswith('"'):
+            cache_key = (*self.cache_key, etag, self.encoding)
+        compressed = self.middleware.cache.get(cache_key) if cache_key else None
+        if compressed is None:
+            compressor = COMPRESSORS[self.encoding]()
+            compressed = compressor.compress(body) + compressor.finish()
+            if cache_key and len(compressed) <= self.middleware.max_cached_size:
+                self.middleware.cache.set(cache_key, compressed)
+        self._set_encoding_headers(headers)
+        headers['content-length'] = str(len(compressed))
+        await self.send_({**start, 'headers': headers.raw})
+        await self.send_({'type': 'http.response.body', 'body': compressed, 'more_body': False})
+
+    async def _start_streaming(self, start: Message, message: Message) -> None:
+        headers = MutableHeaders(raw=list(start.get('headers', ())))
+        self._set_encoding_headers(headers)
+        if 'content-length' in headers:
+            del headers['content-length']
+        await self.send_({**start, 'headers': headers.raw})
+        self.compressor = COMPRESSORS[self.encoding]()
+        body = self.compressor.compress(message.get('body', b''))
+        if body:
+            await self.send_({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+    def _set_encoding_headers(self, headers: MutableHeaders) -> None:
+        headers['content-encoding'] = self.encoding
+        vary = headers.get('vary')
+        if not vary:
+            headers['vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            headers['vary'] = f'{vary}, Accept-Encoding'
+        etag = headers.get('etag', '')
+        if etag.startswith('"'):
+            headers['etag'] = f'W/{etag}'
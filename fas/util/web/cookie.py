@@ -1,16 +1,19 @@
 import calendar
-import email.utils
+import functools
 import http.cookies
+import math
+import re
+import string
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Union, Optional, Tuple
 
-from dynaconf import settings
 from starlette.requests import Request
 from starlette.responses import Response
 
+from fas.environment import get_settings
 from .escape import utf8, unicode
-from .hash import create_signed_value, decode_signed_value
+from .hash import create_signed_value, decode_signed_value, Secrets
 
 
 def get_cookie(request: Request, name: str, *, default: Optional[str] = None) -> Optional[str]:
@@ -41,35 +44,62 @@ def set_cookie(response: Response, name: str, value: Union[str, bytes], *, domai
     if not name.isidentifier():
         # Don't let us accidentally inject bad stuff
         raise ValueError(f'Invalid cookie name: {repr(name)}')
+    if name.lower() in RESERVED_COOKIE_NAMES:
+        raise http.cookies.CookieError(f'Attempt to set a reserved key {repr(name)}')
+    if not _is_legal_key(name):
+        raise http.cookies.CookieError(f'Illegal key {repr(name)}')
     if value is None:
         raise ValueError(f'Invalid cookie value: {repr(value)}')
-    value = unicode(value)
-    cookie = http.cookies.SimpleCookie()
-    cookie[name] = value
-    morsel = cookie[name]
-    if domain:
-        morsel['domain'] = domain
-    if path:
-        morsel['path'] = path
+    # the same header as http.cookies.SimpleCookie outputs, without building the cookie and its morsel
+    domain_attribute, path_attribute, flag_attributes = _get_cookie_attributes(domain, path, secure, httponly,
+                                                                               samesite)
+    cookie_val = f'{name}={_quote(unicode(value))}{domain_attribute}'
     if expires_days is not None and not expires:
-        expires = datetime.utcnow() + timedelta(days=expires_days)
-    if expires:
-        morsel['expires'] = format_http_timestamp(expires)
+        cookie_val += f'; expires={_format_http_seconds(time.time_ns() // 1000000000 + expires_days * 86400)}'
+    elif expires:
+        cookie_val += f'; expires={format_http_timestamp(expires)}'
     if max_age is not None:
-        morsel['max-age'] = max_age
-    parts = [cookie.output(header='').strip()]
+        cookie_val += f'; Max-Age={max_age:d}' if isinstance(max_age, int) else f'; Max-Age={max_age}'
+    cookie_val = f'{cookie_val}{path_attribute}'.rstrip() + flag_attributes
+    response.raw_headers.append((b'set-cookie', cookie_val.encode('latin-1')))
+
+
+RESERVED_COOKIE_NAMES = ('expires', 'path', 'comment', 'domain', 'max-age', 'secure', 'httponly', 'version',
+                         'samesite')
+_LEGAL_KEY_CHARS = string.ascii_letters + string.digits + "!#$%&'*+-.^_`|~:"
+_UNESCAPED_CHARS = _LEGAL_KEY_CHARS + ' ()/<=>?@[]{}'
+_is_legal_key = re.compile(f'[{re.escape(_LEGAL_KEY_CHARS)}]+').fullmatch
+_QUOTE_TRANSLATION = {n: f'\\{n:03o}' for n in set(range(256)) - set(map(ord, _UNESCAPED_CHARS))}
+_QUOTE_TRANSLATION.update({ord('"'): '\\"', ord('\\'): '\\\\'})
+
+
+def _quote(value: str) -> str:
+    """
+    Quote the cookie value as `http.cookies.SimpleCookie` does
+    """
+    if _is_legal_key(value):
+        return value
+    return f'"{value.translate(_QUOTE_TRANSLATION)}"'
+
+
+@functools.lru_cache(maxsize=64)
+def _get_cookie_attributes(domain: Optional[str], path: Optional[str], secure: bool, httponly: bool,
+                           samesite: Optional[str]) -> Tuple[str, str, str]:
+    """
+    The attributes around expires and max-age, which are the same for the same cookie of every response
+    """
+    flags = []
     if secure:
-        parts.append('Secure')
+        flags.append('; Secure')
     if httponly:
-        parts.append('HttpOnly')
+        flags.append('; HttpOnly')
     if samesite:
-        parts.append(f'SameSite={http.cookies._quote(samesite)}')
-    cookie_val = '; '.join(parts)
-    response.raw_headers.append((b'set-cookie', cookie_val.encode('latin-1')))
+        flags.append(f'; SameSite={_quote(samesite)}')
+    return f'; Domain={domain}' if domain else '', f'; Path={path}' if path else '', ''.join(flags)
 
 
 def get_secure_cookie(request: Request, name: str, *, max_age_days: Optional[int] = 31,
-                      secret: Optional[Union[str, bytes]] = None) -> Optional[str]:
+                      secret: Optional[Secrets] = None) -> Optional[str]:
     """Returns the given signed cookie if it validates, or None.
 
     Note that the ``max_age_days`` parameter
@@ -82,7 +112,7 @@ def get_secure_cookie(request: Request, name: str, *, max_age_days: Optional[int
     `set_secure_cookie` in this handler.
     """
     if secret is None:
-        secret = settings.COOKIE_SECRET
+        secret = get_settings().cookie_secrets
     signed_value = get_cookie(request, name)
     signed_value = decode_signed_value(secret, signed_value, max_age_days=max_age_days)
     if signed_value is None:
@@ -99,7 +129,7 @@ def get_secure_cookie(request: Request, name: str, *, max_age_days: Optional[int
 def set_secure_cookie(response: Response, name: str, value: Union[str, bytes], *, domain: Optional[str] = None,
                       path: str = '/', expires: Optional[Union[float, Tuple, datetime]] = None,
                       expires_days: Optional[int] = 30, max_age: Optional[int] = None, secure=False, httponly=True,
-                      samesite: Optional[str] = 'Lax', secret: Optional[Union[str, bytes]] = None) -> None:
+                      samesite: Optional[str] = 'Lax', secret: Optional[Secrets] = None) -> None:
     """Signs and timestamps a cookie so it cannot be forged.
 
     Note that the ``expires_days`` parameter sets the lifetime of the
@@ -110,7 +140,9 @@ def set_secure_cookie(response: Response, name: str, value: Union[str, bytes], *
     If ``secret`` is None, it is set to the ``cookie_secret`` setting
     in your configuration file ``.secrets.toml``. It should be a long
     random sequence of bytes to be used as the HMAC secret for the
-    signature.
+    signature. To rotate the secret, set a list of secrets with the
+    new one first: cookies are signed with the new one, and the ones
+    signed with the old ones still validate until the old ones are removed.
 
     Secure cookies may contain arbitrary byte values, not just unicode
     strings (unlike regular cookies)
@@ -119,7 +151,7 @@ def set_secure_cookie(response: Response, name: str, value: Union[str, bytes], *
     seen until the following request.
     """
     if secret is None:
-        secret = settings.COOKIE_SECRET
+        secret = get_settings().cookie_secrets
     if not name.isidentifier():
         # Don't let us accidentally inject bad stuff
         raise ValueError(f'Invalid cookie name: {repr(name)}')
@@ -144,8 +176,7 @@ def delete_cookie(response: Response, name: str, *, domain: Optional[str] = None
     Similar to `set_cookie`, the effect of this method will not be
     seen until the following request.
     """
-    expires = datetime.utcnow() - timedelta(days=365)
-    set_cookie(response, name, value='', domain=domain, path=path, expires=expires, max_age=0)
+    set_cookie(response, name, value='', domain=domain, path=path, expires_days=-365, max_age=0)
 
 
 def delete_all_cookies(request: Request, response: Response, *, domain: Optional[str] = None, path: str = '/') -> None:
@@ -177,4 +208,19 @@ def format_http_timestamp(ts: Union[int, float, tuple, time.struct_time, datetim
         time_num = calendar.timegm(ts.utctimetuple())
     else:
         raise TypeError(f'unknown timestamp type: {repr(ts)}')
-    return email.utils.formatdate(time_num, usegmt=True)
+    return _format_http_seconds(math.floor(time_num))
+
+
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+@functools.lru_cache(maxsize=16)
+def _format_http_seconds(seconds: int) -> str:
+    """
+    Format as `email.utils.formatdate` with ``usegmt=True`` does, cached as the same seconds are formatted
+    for every response within the same second
+    """
+    t = time.gmtime(seconds)
+    return (f'{WEEKDAY_NAMES[t.tm_wday]}, {t.tm_mday:02d} {MONTH_NAMES[t.tm_mon - 1]} {t.tm_year:04d} '
+            f'{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d} GMT')
@@ -0,0 +1,48 @@
+"""
+ETags and conditional GET: a client sending back the ETag in ``If-None-Match`` gets 304 without the body,
+if the resource has not changed since.
+"""
+import functools
+import hashlib
+from typing import Any, FrozenSet
+
+from starlette.responses import Response
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Make a strong ETag by hashing the parts, e.g. the id and the row version (``xmin``) of a row
+    """
+    digest = hashlib.blake2b('\0'.join(str(p) for p in parts).encode('UTF-8'), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_if_none_match(if_none_match: str) -> FrozenSet[str]:
+    # the weak comparison: W/"x" matches "x", as the compressed response of "x" has the ETag W/"x"
+    tags = (tag.strip() for tag in if_none_match.split(','))
+    return frozenset(tag[2:] if tag.startswith('W/') else tag for tag in tags if tag)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Tell whether the ``If-None-Match`` header (of one or more ETags, or *) matches the ETag by the weak comparison
+    """
+    if not if_none_match:
+        return False
+    tags = _parse_if_none_match(if_none_match)
+    return '*' in tags or (etag[2:] if etag.startswith('W/') else etag) in tags
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    """
+    Set the ETag of the response, which is revalidated by the client on every use (``no-cache``)
+    and not stored by shared caches (``private``), as the responses depend on the operator logged on
+    """
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(etag: str) -> Response:
+    return set_etag(Response(status_code=304), etag)
@@ -1,32 +1,72 @@
+import asyncio
 import base64
+import functools
 import hashlib
 import hmac
 import random
 import string
 import time
-from typing import Union, Optional
-
-from argon2 import PasswordHasher
-from argon2.exceptions import Argon2Error, InvalidHash
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Optional, Sequence, Tuple
 
+from fas.util.cache import TTLCache
 from .escape import utf8
 
-_PH = PasswordHasher()
+_password_hasher = None  # argon2 is imported by the first use, which the most processes and requests never make
+# argon2 takes tens of milliseconds and ~100MiB memory per hash by design, the async variants run it in threads
+# (argon2-cffi releases the GIL), at most PASSWORD_HASHING_CONCURRENCY at the same time, the others wait in a queue
+PASSWORD_HASHING_CONCURRENCY = 4
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_password_hasher():
+    global _password_hasher
+    if _password_hasher is None:
+        from argon2 import PasswordHasher
+        _password_hasher = PasswordHasher()
+    return _password_hasher
 
 
 def hash_password(plain_password: Union[str, bytes]) -> str:
-    return _PH.hash(plain_password)
+    return _get_password_hasher().hash(plain_password)
 
 
 def verify_password(password_hash: Union[str, bytes], plain_password: Union[str, bytes]) -> bool:
+    from argon2.exceptions import Argon2Error, InvalidHash
     try:
-        _PH.verify(password_hash, plain_password)
+        _get_password_hasher().verify(password_hash, plain_password)
     except (Argon2Error, InvalidHash):
         return False
     else:
         return True
 
 
+def password_needs_rehash(password_hash: Union[str, bytes]) -> bool:
+    """
+    Whether the hash was created with other parameters than the current ones, then it should be rehashed
+    """
+    from argon2.exceptions import Argon2Error, InvalidHash
+    try:
+        return _get_password_hasher().check_needs_rehash(password_hash)
+    except (Argon2Error, InvalidHash, ValueError):
+        return True
+
+
+async def hash_password_async(plain_password: Union[str, bytes]) -> str:
+    return await _run_in_executor(hash_password, plain_password)
+
+
+async def verify_password_async(password_hash: Union[str, bytes], plain_password: Union[str, bytes]) -> bool:
+    return await _run_in_executor(verify_password, password_hash, plain_password)
+
+
+def _run_in_executor(func, *args) -> asyncio.Future:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASHING_CONCURRENCY, thread_name_prefix='argon2')
+    return asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
 READABLE_ALPHANUMERIC = (string.ascii_letters + string.digits).translate(str.maketrans('', '', '0oO1l'))
 
 
@@ -34,11 +74,23 @@ def generate_password(*, size: int = 8, charset: str = READABLE_ALPHANUMERIC) ->
     return ''.join(random.choices(charset, k=size))
 
 
-def create_signed_value(secret: Union[str, bytes], value: Union[str, bytes], *, with_timestamp: bool = False) -> bytes:
+Secret = Union[str, bytes]
+# a list of secrets (newest first) signs with the newest and verifies with any, so that secrets can be rotated
+Secrets = Union[Secret, Sequence[Secret]]
+
+# recently verified signed values, so that the same cookie sent by every request of a session is verified once
+VERIFIED_VALUE_CACHE_SIZE = 10000
+VERIFIED_VALUE_CACHE_TTL = 60
+_verified_values = TTLCache(max_size=VERIFIED_VALUE_CACHE_SIZE, ttl=VERIFIED_VALUE_CACHE_TTL)
+
+
+def create_signed_value(secret: Secrets, value: Union[str, bytes], *, with_timestamp: bool = False) -> bytes:
     """Signs a value so it cannot be forged.
 
     If ``with_timestamp`` is True, signs with the timestamp. It is
-    used to check if the signature is expired in `decode_signed_value`
+    used to check if the signature is expired in `decode_signed_value`.
+
+    If ``secret`` is a list of secrets, signs with the first (newest) one.
     """
     value = base64.b64encode(utf8(value))
     parts = [value, b'', b'']
@@ -47,42 +99,76 @@ def create_signed_value(secret: Union[str, bytes], value: Union[str, bytes], *,
         parts[1] = timestamp
     to_sign = b'|'.join(parts)
 
-    signature = _create_signature(secret, to_sign)
+    signature = _create_signature(_as_secrets(secret)[0], to_sign)
     return to_sign + signature
 
 
-def decode_signed_value(secret: Union[str, bytes], value: Union[None, str, bytes], *,
+def decode_signed_value(secret: Secrets, value: Union[None, str, bytes], *,
                         max_age_days: Optional[int] = None) -> Optional[bytes]:
     """Decode the given signed value if it validates, or None.
 
     If ``max_age_days`` is not None, check against the timestamp added
-    in `create_signed_value` to see if the signature is expired
+    in `create_signed_value` to see if the signature is expired.
+
+    If ``secret`` is a list of secrets, the value signed with any of them validates.
     """
     if value is None:
         return None
     value = utf8(value)
+    secrets = _as_secrets(secret)
+    verified = _verified_values.get((secrets, value))
+    if verified is None:
+        verified = _verify_signed_value(secrets, value)
+        if verified is None:
+            return None
+        _verified_values.set((secrets, value), verified)
+    decoded, timestamp = verified
+    if max_age_days is not None:
+        if timestamp is None:
+            return None
+        if timestamp < time.time() - max_age_days * 86400:
+            # The signature has expired.
+            return None
+    return decoded
+
+
+def _verify_signed_value(secrets: Tuple[Secret, ...], value: bytes) -> Optional[Tuple[bytes, Optional[int]]]:
     try:
         value_field, timestamp, passed_sig = value.split(b'|', maxsplit=2)
     except ValueError:
         return None
 
     signed = value[: -len(passed_sig)]
-    expected_sig = _create_signature(secret, signed)
-    if not hmac.compare_digest(passed_sig, expected_sig):
+    if not any(hmac.compare_digest(passed_sig, _create_signature(secret, signed)) for secret in secrets):
         return None
-    if max_age_days is not None:
-        try:
-            timestamp = int(timestamp)
-        except ValueError:
-            return None
-        if timestamp < time.time() - max_age_days * 86400:
-            # The signature has expired.
-            return None
     try:
-        return base64.b64decode(value_field)
+        timestamp = int(timestamp)
+    except ValueError:
+        timestamp = None
+    try:
+        return base64.b64decode(value_field), timestamp
     except Exception:
         return None
 
 
-def _create_signature(secret: Union[str, bytes], value: bytes) -> bytes:
-    return utf8(hmac.new(utf8(secret), value, digestmod=hashlib.sha256).hexdigest())
+def _as_secrets(secret: Secrets) -> Tuple[Secret, ...]:
+    if isinstance(secret, (str, bytes)):
+        return secret,
+    secrets = tuple(secret)
+    if not secrets:
+        raise ValueError('At least one secret required')
+    return secrets
+
+
+def _create_signature(secret: Secret, value: bytes) -> bytes:
+    keyed_hmac = _get_keyed_hmac(secret).copy()
+    keyed_hmac.update(value)
+    return utf8(keyed_hmac.hexdigest())
+
+
+@functools.lru_cache(maxsize=32)
+def _get_keyed_hmac(secret: Secret) -> hmac.HMAC:
+    """
+    The HMAC keyed with the secret, whose copy is updated with the value to sign, without hashing the key again
+    """
+    return hmac.new(utf8(secret), digestmod=hashlib.sha256)
@@ -0,0 +1,76 @@
+"""
+Pure ASGI middleware, which wraps the ``send`` callable instead of the response like `BaseHTTPMiddleware` does,
+so that no task or queue is added to every request and streaming responses are streamed as is.
+"""
+from typing import Mapping, List, Set, Tuple
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from fas.util.database import DBPool
+
+
+class DBMiddleware:
+    """
+    Put a client of the pool into ``request.state.db``, whose connection is acquired lazily by the first query,
+    and released when the response starts (unless in a transaction), so that it is not held while the body is sent
+    or streamed, or else after the response is sent, or the request fails.
+    Call `DBClient.release_early` to release it even earlier, e.g. before serializing a large response.
+    """
+    __slots__ = ('app', 'pool', 'acquire_timeout', 'release_timeout')
+
+    def __init__(self, app: ASGIApp, *, pool: DBPool, acquire_timeout: float = None,
+                 release_timeout: float = None) -> None:
+        self.app: ASGIApp = app
+        self.pool: DBPool = pool
+        self.acquire_timeout: float = acquire_timeout
+        self.release_timeout: float = release_timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        db = self.pool.acquire(acquire_timeout=self.acquire_timeout, release_timeout=self.release_timeout)
+        scope.setdefault('state', {})['db'] = db
+
+        async def send_releasing_db(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                try:
+                    await db.release_early()
+                except Exception:
+                    pass  # logged by the pool, and the connection is closed by the pool
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_releasing_db)
+        finally:
+            if db.is_connected:
+                try:
+                    await db.release()
+                except Exception:
+                    pass  # logged by the pool, and the response is sent already
+
+
+class HeadersMiddleware:
+    """
+    Set the headers of every HTTP response when it starts, replacing the ones of the same names
+    """
+    __slots__ = ('app', 'headers', '_names')
+
+    def __init__(self, app: ASGIApp, *, headers: Mapping[str, str]) -> None:
+        self.app: ASGIApp = app
+        self.headers: List[Tuple[bytes, bytes]] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                                   for name, value in headers.items()]
+        self._names: Set[bytes] = {name for name, _ in self.headers}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*(h for h in message.get('headers', ()) if h[0].lower() not in self._names),
+                                      *self.headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
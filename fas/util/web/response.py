@@ -0,0 +1,73 @@
+import asyncio
+import datetime as dt
+import decimal
+import functools
+import json
+import uuid
+from typing import Any, Callable
+
+import asyncpg
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from fas.util.model import Entity, ReadModel
+
+
+class EntityJSONResponse(JSONResponse):
+    """JSON response rendering already validated entities (or asyncpg records) directly to bytes.
+
+    Unlike returning entities with ``response_model``, the content is not
+    validated nor converted by ``jsonable_encoder`` again.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':'),
+                          default=_to_json_compatible).encode('UTF-8')
+
+
+def _to_json_compatible(o: Any) -> Any:
+    if isinstance(o, Entity):
+        return o.__dict__
+    if isinstance(o, ReadModel):
+        return o.dict()
+    if isinstance(o, asyncpg.Record):
+        return dict(o.items())
+    if isinstance(o, (dt.datetime, dt.date, dt.time)):
+        return o.isoformat()
+    if isinstance(o, dt.timedelta):
+        return o.total_seconds()
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def entity_response(endpoint: Callable) -> Callable:
+    """Renders the return value of the endpoint with `EntityJSONResponse`.
+
+    ``response_model`` of the route is still used to generate the OpenAPI schema,
+    but the returned entities are not validated nor serialized again by FastAPI.
+    A `Response` returned by the endpoint is passed through as is.
+
+    .. code-block:: python
+
+        @router.get('/', response_model=List[Organization])
+        @entity_response
+        async def list(request: Request):
+            return await list_organizations(request.state.db)
+    """
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Response:
+        if asyncio.iscoroutinefunction(endpoint):
+            content = await endpoint(*args, **kwargs)
+        else:
+            content = await run_in_threadpool(endpoint, *args, **kwargs)
+        if isinstance(content, Response):
+            return content
+        return EntityJSONResponse(content)
+
+    return wrapper
@@ -0,0 +1,132 @@
+"""
+Token-bucket throttles: every key has a bucket of ``burst`` tokens refilled at ``rate`` tokens per second.
+An attempt takes a token, or is rejected when the bucket is empty.
+"""
+import abc
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fas.util.database import DBClient
+
+THROTTLE_BACKENDS = ('memory', 'database')
+THROTTLES: Dict[str, 'Throttle'] = {}
+
+
+class Throttle(abc.ABC):
+    __slots__ = ('name', 'rate', 'burst', 'allowed_count', 'rejected_count')
+
+    def __init__(self, name: str, *, rate: float, burst: int) -> None:
+        if rate <= 0 or burst < 1:
+            raise Exception(f'Invalid throttle {name}: rate={rate}, burst={burst}')
+        self.name: str = name
+        self.rate: float = rate  # tokens refilled per second
+        self.burst: int = burst  # size of the bucket
+        self.allowed_count: int = 0
+        self.rejected_count: int = 0
+        THROTTLES[name] = self
+
+    async def consume(self, key: str, *, db: Optional[DBClient] = None) -> float:
+        """
+        Take a token from the bucket of the key.
+        Return 0 if taken, or the seconds to wait until a token is refilled if rejected.
+        """
+        retry_after = await self._consume(key, db)
+        if retry_after:
+            self.rejected_count += 1
+        else:
+            self.allowed_count += 1
+        return retry_after
+
+    @abc.abstractmethod
+    async def _consume(self, key: str, db: Optional[DBClient]) -> float:
+        raise NotImplementedError('This is an abstract method, should not come here')
+
+
+class MemoryThrottle(Throttle):
+    """
+    Buckets are kept in the process, so every worker process allows its own ``burst`` and ``rate``.
+    At most ``max_keys`` buckets are kept, the least recently used is dropped (which is then full again).
+    """
+    __slots__ = ('max_keys', 'clock', '_buckets')
+
+    def __init__(self, name: str, *, rate: float, burst: int, max_keys: int = 100000,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(name, rate=rate, burst=burst)
+        self.max_keys: int = max_keys
+        self.clock: Callable[[], float] = clock
+        self._buckets: Dict[str, Tuple[float, float]] = OrderedDict()  # key -> (tokens, updated_at)
+
+    async def _consume(self, key: str, db: Optional[DBClient]) -> float:
+        now = self.clock()
+        tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        retry_after = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+# the inserted updated_at (i.e. EXCLUDED.updated_at) is the only clock reading of the statement
+REFILLED_TOKENS = 'LEAST(:burst, b.tokens + :rate * EXTRACT(EPOCH FROM EXCLUDED.updated_at - b.updated_at))'
+CONSUME_SQL = f'''
+    INSERT INTO throttle_bucket AS b (throttle, key, tokens, allowed, updated_at)
+    VALUES (:throttle, :key, :burst - 1, TRUE, CLOCK_TIMESTAMP())
+    ON CONFLICT (throttle, key) DO UPDATE SET
+        tokens={REFILLED_TOKENS} - CASE WHEN {REFILLED_TOKENS} >= 1 THEN 1 ELSE 0 END,
+        allowed={REFILLED_TOKENS} >= 1,
+        updated_at=EXCLUDED.updated_at
+    RETURNING tokens, allowed
+    '''
+PURGE_SQL = '''
+    DELETE FROM throttle_bucket
+    WHERE throttle=:throttle AND updated_at < CLOCK_TIMESTAMP() - :seconds * INTERVAL '1 second'
+    '''
+
+
+class DBThrottle(Throttle):
+    """
+    Buckets are shared by all the worker processes in the unlogged table throttle_bucket, a token is taken by one
+    upsert on the given ``db``. Buckets refilled to full are purged every ``purge_interval`` seconds.
+    """
+    __slots__ = ('purge_interval', '_purged_at')
+
+    def __init__(self, name: str, *, rate: float, burst: int, purge_interval: float = 60) -> None:
+        super().__init__(name, rate=rate, burst=burst)
+        self.purge_interval: float = purge_interval
+        self._purged_at: float = time.monotonic()
+
+    async def _consume(self, key: str, db: Optional[DBClient]) -> float:
+        if db is None:
+            raise Exception(f'Database required by throttle {self.name}')
+        if time.monotonic() - self._purged_at >= self.purge_interval:
+            self._purged_at = time.monotonic()
+            await db.execute(PURGE_SQL, throttle=self.name, seconds=self.burst / self.rate)
+        bucket = await db.get(CONSUME_SQL, throttle=self.name, key=key, rate=self.rate, burst=self.burst)
+        return 0 if bucket['allowed'] else (1 - bucket['tokens']) / self.rate
+
+
+def create_throttle(name: str, *, backend: str = 'memory', rate: float, burst: int) -> Throttle:
+    if backend == 'memory':
+        return MemoryThrottle(name, rate=rate, burst=burst)
+    if backend == 'database':
+        return DBThrottle(name, rate=rate, burst=burst)
+    raise Exception(f'Invalid throttle backend: {repr(backend)}, should be one of {THROTTLE_BACKENDS}')
+
+
+def format_throttle_metrics() -> str:
+    """
+    Format the counters of the throttles of this process in the Prometheus text format
+    """
+    lines: List[str] = ['# HELP fas_throttle_attempts_total Attempts allowed or rejected by the throttle',
+                        '# TYPE fas_throttle_attempts_total counter']
+    for name in sorted(THROTTLES):
+        throttle = THROTTLES[name]
+        lines.append(f'fas_throttle_attempts_total{{throttle="{name}",result="allowed"}} {throttle.allowed_count}')
+        lines.append(f'fas_throttle_attempts_total{{throttle="{name}",result="rejected"}} {throttle.rejected_count}')
+    return '\n'.join(lines) + '\n'
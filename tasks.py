@@ -3,10 +3,13 @@ import sys
 
 from invoke import Collection
 
-from fas.api.tasks import op_tasks
+from benchmarks.tasks import bench_tasks
+from fas.environment import get_settings
+from fas.api.tasks import op_tasks, kb_tasks, api_tasks
 from fas.util.database.tasks import db_tasks
-from tests.tasks import test
+from tests.tasks import test, audit_plans, ci
 
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+get_settings()  # the DEBUG log level of the settings applies to the tasks too, as to the API
 
-ns = Collection(op_tasks, db_tasks, test)
+ns = Collection(op_tasks, kb_tasks, api_tasks, db_tasks, bench_tasks, test, audit_plans, ci)
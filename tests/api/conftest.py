@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from fas.model.organization import add_organization
+from fas.util.database import DBClient, transactional
+
+
+class Setup:
+    __slots__ = ('client', 'organization_id', 'other_organization_id')
+
+    def __init__(self, client: TestClient, organization_id: int, other_organization_id: int) -> None:
+        self.client: TestClient = client
+        self.organization_id: int = organization_id  # of the admin logged on
+        self.other_organization_id: int = other_organization_id
+
+
+@pytest.fixture(scope='module')
+def setup(migrate_database) -> Setup:
+    """
+    Log on as the admin of an organization, besides which another organization is added. The data is committed
+    for the app to see, and deleted with the knowledge bases of the organizations after the tests of the module
+    """
+    from fas.api.application import app
+
+    with TestClient(app) as client:
+        org, admin = run(add_organization, 'Org#1', 'Admin', '13800000001', 'password')
+        other_org, _ = run(add_organization, 'Org#2', 'Admin', '13800000002', 'password')
+        try:
+            response = client.post(f'/operators/login?organization_id={org.id}',
+                                   json={'mobile': admin.mobile, 'password': 'password'})
+            assert 204 == response.status_code
+            yield Setup(client, org.id, other_org.id)
+        finally:
+            run(_delete_organizations, (org.id, other_org.id))
+
+
+def run(func, *args):
+    """
+    Run ``func(db, *args)`` with a connection of the app, on the event loop of the test client
+    """
+    from fas.api.application import _pool
+
+    async def run_with_connection():
+        async with _pool.acquire() as db:
+            return await func(db, *args)
+
+    return asyncio.get_event_loop().run_until_complete(run_with_connection())
+
+
+@transactional
+async def _delete_organizations(db: DBClient, organization_ids) -> None:
+    await db.execute('''
+        DELETE FROM knowledge WHERE knowledge_base_id IN (SELECT id FROM knowledge_base WHERE organization_id=ANY(:ids))
+        ''', ids=organization_ids)
+    for table, column in (('knowledge_base', 'organization_id'), ('operator', 'organization_id'),
+                          ('organization', 'id')):
+        await db.execute(f'DELETE FROM {table} WHERE {column}=ANY(:ids)', ids=organization_ids)
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+from invoke import Context
+from starlette.testclient import TestClient
+
+from fas.environment import reload_settings
+
+
+def test_metrics(monkeypatch, restore_settings):
+    from fas.api.application import app
+
+    client = TestClient(app)
+    assert 404 == client.get('/metrics').status_code
+
+    monkeypatch.setenv('DYNACONF_EXPOSE_METRICS', 'true')
+    reload_settings()
+    response = client.get('/metrics')
+    assert 200 == response.status_code
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+
+
+def test_openapi_schema(monkeypatch, tmp_path):
+    from fas.api import application
+    from fas.api.tasks import generate_openapi_schema
+
+    path = tmp_path / 'openapi.json'
+    monkeypatch.setattr(application, 'OPENAPI_SCHEMA_PATH', path)
+    with pytest.raises(Exception, match='not generated'):
+        application.load_openapi_schema()
+
+    # the schema read from the file generated at build time is the one built from the routes at runtime
+    generate_openapi_schema(Context())
+    assert application.app.openapi() == application.load_openapi_schema()
+
+    schema = json.loads(path.read_bytes())
+    del schema['paths']['/operators/login']
+    path.write_text(json.dumps(schema), encoding='UTF-8')
+    with pytest.raises(Exception, match='stale'):
+        application.load_openapi_schema()
@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+from typing import Tuple
+
+import pytest
+
+from fas.environment import ENV, settings
+from fas.util.database import DBClient
+from .conftest import Setup, run
+
+CSV = '''question,answer_type,answer_content,keywords
+How to log on?,1,Use your mobile,log on|mobile
+Logo,2,"{""url"": ""https://example.com/logo.png""}",
+'''
+
+
+@pytest.fixture(scope='module')
+def knowledge_base_ids(setup: Setup) -> Tuple[int, int]:
+    """
+    A knowledge base of the organization logged on, and one of the other organization
+    """
+    return tuple(run(_add_knowledge_base, id) for id in (setup.organization_id, setup.other_organization_id))
+
+
+async def _add_knowledge_base(db: DBClient, organization_id: int) -> int:
+    return await db.get_scalar('''
+        INSERT INTO knowledge_base (organization_id, name, target_audience) VALUES (:organization_id, 'KB', 3)
+        RETURNING id
+        ''', organization_id=organization_id)
+
+
+def test_import_and_export(setup: Setup, knowledge_base_ids: Tuple[int, int]):
+    client, knowledge_base_id = setup.client, knowledge_base_ids[0]
+    response = client.post(f'/knowledge-bases/{knowledge_base_id}/knowledge/import', data=CSV.encode('UTF-8'))
+    assert 200 == response.status_code
+    assert {'inserted': 2, 'updated': 0} == response.json()
+
+    response = client.get(f'/knowledge-bases/{knowledge_base_id}/knowledge/export?format=ndjson')
+    assert 200 == response.status_code
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert f'attachment; filename="knowledge-{knowledge_base_id}.ndjson"' == response.headers['content-disposition']
+    assert ['How to log on?', 'Logo'] == sorted(json.loads(line)['question'] for line in response.text.splitlines())
+
+    # the exported knowledge is imported again as is
+    response = client.get(f'/knowledge-bases/{knowledge_base_id}/knowledge/export')
+    assert response.headers['content-type'].startswith('text/csv')
+    response = client.post(f'/knowledge-bases/{knowledge_base_id}/knowledge/import', data=response.content)
+    assert {'inserted': 0, 'updated': 0} == response.json()
+
+
+def test_import_invalid_knowledge(setup: Setup, knowledge_base_ids: Tuple[int, int]):
+    client, knowledge_base_id = setup.client, knowledge_base_ids[0]
+    response = client.post(f'/knowledge-bases/{knowledge_base_id}/knowledge/import?format=ndjson',
+                           data=b'{"question": "Q", "answer_type": 1}\n')
+    assert 422 == response.status_code
+    assert ['line 1: answer_content should be a JSON object'] == response.json()['detail']
+
+    response = client.post(f'/knowledge-bases/{knowledge_base_id}/knowledge/import', data=b'\xff\xfe')
+    assert 422 == response.status_code
+
+    response = client.post(f'/knowledge-bases/{knowledge_base_id}/knowledge/import?format=xml', data=CSV)
+    assert 422 == response.status_code
+
+
+def test_knowledge_base_not_found(setup: Setup, knowledge_base_ids: Tuple[int, int]):
+    # the knowledge base of another organization is not found either
+    for knowledge_base_id in (0, knowledge_base_ids[1]):
+        response = setup.client.post(f'/knowledge-bases/{knowledge_base_id}/knowledge/import', data=CSV)
+        assert 404 == response.status_code
+        response = setup.client.get(f'/knowledge-bases/{knowledge_base_id}/knowledge/export')
+        assert 404 == response.status_code
+
+
+def test_kb_tasks(knowledge_base_ids: Tuple[int, int], tmp_path):
+    knowledge_base_id = knowledge_base_ids[1]
+    from_file, to_file = tmp_path / 'from.csv', tmp_path / 'to.ndjson'
+    from_file.write_text(CSV, encoding='UTF-8')
+    _invoke('kb.import', knowledge_base_id, from_file)
+    _invoke('kb.export', knowledge_base_id, to_file)
+    lines = to_file.read_text(encoding='UTF-8').splitlines()
+    assert ['How to log on?', 'Logo'] == sorted(json.loads(line)['question'] for line in lines)
+
+    from_file.write_text(CSV + 'Invalid,0,A,\n', encoding='UTF-8')
+    assert 'Did not import knowledge' in _invoke('kb.import', knowledge_base_id, from_file)
+
+
+def _invoke(*args) -> str:
+    # unlike get_invoke_env(), the database of the pytest-xdist worker is kept, which the app of the tests uses
+    env = {**os.environ, 'ENV_FOR_DYNACONF': settings.ENV_FOR_DYNACONF}
+    result = subprocess.run(['invoke', *map(str, args)], cwd=ENV.root_dir, env=env, check=True,
+                            stdout=subprocess.PIPE, text=True)
+    return result.stdout
@@ -0,0 +1,47 @@
+from fas.model.organization import update_organization
+from .conftest import Setup, run
+
+
+def test_get_not_modified(setup: Setup):
+    client, url = setup.client, f'/organizations/{setup.organization_id}'
+    response = client.get(url)
+    assert 200 == response.status_code
+    etag = response.headers['etag']
+    assert 'private, no-cache' == response.headers['cache-control']
+
+    for if_none_match in (etag, f'W/{etag}', f'"x", {etag}'):
+        response = client.get(url, headers={'If-None-Match': if_none_match})
+        assert 304 == response.status_code
+        assert b'' == response.content
+        assert etag == response.headers['etag']
+
+    response = client.put(url, json='Org#1 renamed')
+    assert 204 == response.status_code
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert 200 == response.status_code
+    assert 'Org#1 renamed' == response.json()['name']
+    assert etag != response.headers['etag']
+
+    response = client.get('/organizations/0', headers={'If-None-Match': etag})
+    assert 404 == response.status_code
+
+
+def test_list_not_modified(setup: Setup):
+    client = setup.client
+    response = client.get('/organizations/')
+    assert 200 == response.status_code
+    etag = response.headers['etag']
+    response = client.get('/organizations/', headers={'If-None-Match': etag})
+    assert 304 == response.status_code
+    # the page of another limit is another version
+    response = client.get('/organizations/?limit=1', headers={'If-None-Match': etag})
+    assert 200 == response.status_code
+
+    # the 1st page is not modified by updating an organization after it
+    first_page_etag = response.headers['etag']
+    run(update_organization, max(setup.organization_id, setup.other_organization_id), 'Org#2 renamed')
+    response = client.get('/organizations/?limit=1', headers={'If-None-Match': first_page_etag})
+    assert 304 == response.status_code
+    response = client.get('/organizations/', headers={'If-None-Match': etag})
+    assert 200 == response.status_code
+    assert etag != response.headers['etag']
@@ -1,7 +1,90 @@
+import asyncio
+import os
+import subprocess
+
 import pytest
-from dynaconf import settings
+
+from fas.environment import ENV, reload_settings, settings
+from fas.util.database import DBPool, DBClient
+
+# set by pytest-xdist in each worker process, e.g. gw0
+WORKER = os.environ.get('PYTEST_XDIST_WORKER')
+WORKER_DATABASE_ENV_VAR = 'DYNACONF_DB__database'
+
+
+def pytest_configure(config):
+    if WORKER:
+        # each parallel worker runs with its own database cloned from the template database
+        os.environ[WORKER_DATABASE_ENV_VAR] = f'{settings.DB.database}-{WORKER}'
+        settings.reload()
+    elif getattr(config.option, 'numprocesses', None):
+        # build the template database once, before the workers clone their databases from it
+        subprocess.run(['invoke', 'db.migrate'], cwd=ENV.root_dir, env=get_invoke_env())
+
+
+def get_invoke_env() -> dict:
+    # ENV_FOR_DYNACONF may come from tests/.env, which invoke does not read when run in the root directory
+    env = {k: v for k, v in os.environ.items() if k != WORKER_DATABASE_ENV_VAR}
+    env['ENV_FOR_DYNACONF'] = settings.ENV_FOR_DYNACONF
+    return env
 
 
 @pytest.fixture(scope='session', autouse=True)
 def print_current_env():
     print(f'Current ENV: {settings.ENV_FOR_DYNACONF}')
+
+
+@pytest.fixture(scope='session')
+def event_loop():
+    loop = asyncio.get_event_loop_policy().new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def migrate_database():
+    """
+    Migrate the test database (or clone it from the template database in a parallel worker) once,
+    required by the tests using the database only, so that the other tests run without the database
+    """
+    if WORKER:
+        subprocess.run(['invoke', 'db.clone', settings.DB.database], cwd=ENV.root_dir, env=get_invoke_env())
+    else:
+        subprocess.run(['invoke', 'db.migrate'], cwd=ENV.root_dir, env=get_invoke_env())
+
+
+@pytest.mark.asyncio
+@pytest.fixture(scope='session')
+async def autocommit_db(migrate_database) -> DBClient:
+    """
+    The connection shared by the tests of the session (i.e. of the pytest-xdist worker, with its own database),
+    for the tests out of a transaction only, e.g. of the transactions themselves, which clean up what they commit
+    """
+    async with DBPool(**settings.DB) as pool:
+        async with pool.acquire() as db:
+            yield db
+
+
+@pytest.mark.asyncio
+@pytest.fixture
+async def db(autocommit_db: DBClient) -> DBClient:
+    """
+    Run the test within a transaction rolled back after the test,
+    so that the tests see none of the data of each other, the default for the tests using the database
+    """
+    tr = await autocommit_db.transaction()
+    await tr.start()
+    try:
+        yield autocommit_db
+    finally:
+        await tr.rollback()
+
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    """
+    Reload the settings after the test changing them by the environment variables
+    """
+    yield
+    monkeypatch.undo()
+    reload_settings()
@@ -0,0 +1,109 @@
+import io
+import json
+
+import pytest
+
+from fas.model.knowledge import parse_knowledge, import_knowledge, iter_knowledge_lines, KnowledgeImportError, \
+    MAX_REPORTED_ERRORS
+from fas.util.database import DBClient
+
+CSV = '''question,answer_type,answer_content,keywords
+How to log on?,1,Use your mobile,log on|mobile|log on
+Price?,1,123,price
+Logo,2,"{""url"": ""https://example.com/logo.png""}",
+'''
+
+
+def parse(text: str, knowledge_format: str = 'csv'):
+    errors = []
+    records = list(parse_knowledge(io.StringIO(text, newline=''), knowledge_format, errors))
+    return records, errors
+
+
+def test_parse_csv():
+    records, errors = parse(CSV)
+    assert [] == errors
+    assert [(2, 'How to log on?', 1, {'content': 'Use your mobile'}, ['log on', 'mobile']),
+            (3, 'Price?', 1, {'content': '123'}, ['price']),
+            (4, 'Logo', 2, {'url': 'https://example.com/logo.png'}, [])] == records
+
+
+def test_parse_csv_errors():
+    records, errors = parse('question,answer_type\nQ,1\n')
+    assert [] == records
+    assert ['line 1: missing columns: answer_content'] == errors
+
+    # JSON scalars are plain text, which only text answers accept
+    records, errors = parse('question,answer_type,answer_content\nQ1,1,true\nQ2,2,true\nQ3,2,null\n,1,A\nQ5,6,A\n')
+    assert [(2, 'Q1', 1, {'content': 'true'}, [])] == records
+    assert ['line 3: answer_content should be a JSON object', 'line 4: answer_content should be a JSON object',
+            'line 5: question is required', 'line 6: answer_type should be one of (1, 2, 3, 4, 5)'] == errors
+
+    records, errors = parse('question,answer_type,answer_content\n' + 'Q,0,A\n' * (MAX_REPORTED_ERRORS + 10))
+    assert [] == records
+    assert MAX_REPORTED_ERRORS + 1 == len(errors)
+    assert 'and more...' == errors[-1]
+
+
+def test_parse_ndjson():
+    records, errors = parse('\n'.join([
+        json.dumps({'question': ' Q1 ', 'answer_type': 1, 'answer_content': 'A1', 'keywords': ['k', ' k ', '']}),
+        '',
+        json.dumps({'question': 'Q2', 'answer_type': 3, 'answer_content': {'title': 'T'}}),
+        '{"question": ',
+        json.dumps(['Q4']),
+        json.dumps({'question': 'Q5', 'answer_type': 1, 'answer_content': 'A5', 'keywords': 'k'}),
+        # the separator of the keywords in CSV
+        json.dumps({'question': 'Q6', 'answer_type': 1, 'answer_content': 'A6', 'keywords': ['k1|k2']}),
+    ]), 'ndjson')
+    assert [(1, 'Q1', 1, {'content': 'A1'}, ['k']), (3, 'Q2', 3, {'title': 'T'}, [])] == records
+    assert 4 == len(errors)
+    assert errors[0].startswith('line 4: invalid JSON')
+    assert ['line 5: should be an object', 'line 6: keywords should be a list of strings',
+            'line 7: keywords should not contain |'] == errors[1:]
+
+    with pytest.raises(ValueError):
+        parse('', 'xml')
+
+
+@pytest.mark.asyncio
+@pytest.fixture
+async def knowledge_base_id(db: DBClient) -> int:
+    organization_id = await db.get_scalar("INSERT INTO organization (name) VALUES ('Org#1') RETURNING id")
+    return await db.get_scalar('''
+        INSERT INTO knowledge_base (organization_id, name, target_audience) VALUES (:organization_id, 'KB#1', 3)
+        RETURNING id
+        ''', organization_id=organization_id)
+
+
+@pytest.mark.asyncio
+async def test_import_knowledge(db: DBClient, knowledge_base_id: int):
+    assert (3, 0) == await import_knowledge(db, knowledge_base_id, io.StringIO(CSV, newline=''), 'csv')
+    # unchanged questions are not updated, and the last one wins when a question is duplicated
+    lines = CSV.replace('Price?,1,123', 'Price?,1,100') + 'Price?,1,200,price\nNew?,1,Yes,\n'
+    assert (1, 1) == await import_knowledge(db, knowledge_base_id, io.StringIO(lines, newline=''), 'csv',
+                                            chunk_size=2)
+    answers = {row['question']: row['answer_content'] for row in await db.list(
+        'SELECT * FROM knowledge WHERE knowledge_base_id=:knowledge_base_id', knowledge_base_id=knowledge_base_id)}
+    assert 4 == len(answers)
+    assert {'content': '200'} == answers['Price?']
+
+    # nothing is imported when any knowledge is invalid
+    with pytest.raises(KnowledgeImportError) as e:
+        await import_knowledge(db, knowledge_base_id, io.StringIO(lines + 'Invalid,0,A,\n', newline=''),
+                               'csv')
+    assert ['line 7: answer_type should be one of (1, 2, 3, 4, 5)'] == e.value.errors
+    assert 4 == await db.get_scalar('SELECT COUNT(*) FROM knowledge WHERE knowledge_base_id=:id',
+                                             id=knowledge_base_id)
+
+
+@pytest.mark.asyncio
+async def test_iter_knowledge_lines(db: DBClient, knowledge_base_id: int):
+    await import_knowledge(db, knowledge_base_id, io.StringIO(CSV, newline=''), 'csv')
+    expected_records, _ = parse(CSV)
+    for knowledge_format in ('csv', 'ndjson'):
+        lines = [line async for line in iter_knowledge_lines(db, knowledge_base_id, knowledge_format)]
+        records, errors = parse(''.join(lines), knowledge_format)
+        assert [] == errors
+        # imported again as is
+        assert sorted(r[1:] for r in expected_records) == sorted(r[1:] for r in records)
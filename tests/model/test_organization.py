@@ -0,0 +1,49 @@
+import pytest
+
+from fas.model.organization import *
+from fas.util.database import DBClient
+
+
+@pytest.mark.asyncio
+async def test_versioned_organization(db: DBClient):
+    org = await create_organization(db, 'Org#1')
+    org_, version = await get_versioned_organization(db, org.id)
+    assert org.name == org_.name
+    assert version == await get_organization_version(db, org.id)
+
+    # the version (xmin) is the id of the (sub)transaction updating the row last
+    async with await db.transaction():
+        await update_organization(db, org.id, 'Org#1 renamed')
+    org_, new_version = await get_versioned_organization(db, org.id)
+    assert 'Org#1 renamed' == org_.name
+    assert version != new_version
+    assert new_version == await get_organization_version(db, org.id)
+
+    assert (None, None) == await get_versioned_organization(db, 0)
+    assert await get_organization_version(db, 0) is None
+
+
+@pytest.mark.asyncio
+async def test_organizations_page_version(db: DBClient):
+    ids = [(await create_organization(db, f'Org#{i}')).id for i in range(3)]
+    organizations, next_cursor, version = await list_versioned_organizations_page(db, 2)
+    assert ids[:2] == [org.id for org in organizations]
+    assert next_cursor
+    assert version == await get_organizations_page_version(db, 2)
+
+    # changed by updating a row in the page, but not by updating a row after the page
+    async with await db.transaction():
+        await update_organization(db, ids[2], 'Org#2 renamed')
+    assert version == await get_organizations_page_version(db, 2)
+    async with await db.transaction():
+        await update_organization(db, ids[1], 'Org#1 renamed')
+    new_version = await get_organizations_page_version(db, 2)
+    assert version != new_version
+    assert new_version == (await list_versioned_organizations_page(db, 2))[2]
+
+    # the last page is changed by appending a row, and changed back by deleting it
+    _, _, version = await list_versioned_organizations_page(db, 2, next_cursor)
+    org = await create_organization(db, 'Org#3')
+    assert version != await get_organizations_page_version(db, 2, next_cursor)
+    await delete_organization(db, org.id)
+    assert version == await get_organizations_page_version(db, 2, next_cursor)
@@ -1,8 +1,12 @@
 from invoke import task
 
+# the scale of the synthetic data the plan snapshot (db/plans.json) is recorded at, with the same seed
+AUDIT_SEED_OPTIONS = '--seed 0 --organizations 200 --events 100000 --passwords 4'
+
 
 @task
-def test(c, module_or_dir=None, verbose=True, color=True, capture='sys', k=None, x=False, opts='', pty=True):
+def test(c, module_or_dir=None, verbose=True, color=True, capture='sys', k=None, x=False, n=None, opts='',
+         pty=True):
     """
     Run pytest with given options.
 
@@ -26,6 +30,10 @@ def test(c, module_or_dir=None, verbose=True, color=True, capture='sys', k=None,
     :param bool x:
         Convenience passthrough for ``pytest -x``, i.e. fail-fast. Default:
         ``False``.
+    :param int n:
+        Convenience passthrough for ``pytest -n`` of pytest-xdist, i.e. run
+        tests in ``n`` parallel workers, each with its own database cloned
+        from the template database. Default: ``None``.
     :param str opts:
         Extra runtime options to hand to ``pytest``.
     :param bool pty:
@@ -43,6 +51,39 @@ def test(c, module_or_dir=None, verbose=True, color=True, capture='sys', k=None,
         flags.append(f"-k '{k}'")
     if x and not ('-x' in opts if opts else False):
         flags.append('-x')
+    if n is not None and not ('-n' in opts if opts else False):
+        flags.append(f'-n {n}')
     module_or_dir = '' if module_or_dir is None else f' tests/{module_or_dir}'
 
     c.run(f"pytest {' '.join(flags)}{module_or_dir}", pty=pty)
+
+
+@task(name='audit-plans')
+def audit_plans(c, update=False):
+    """
+    Audit the query plans against a database cloned from the template database and seeded with the synthetic data,
+    failing when any plan, or any problem flagged (e.g. a new sequential scan), differs from the plan snapshot.
+
+    :param bool update:
+        Whether to update the plan snapshot instead of comparing with it,
+        after reviewing the differences. Default: ``False``.
+    """
+    from fas.environment import settings
+
+    database = f'{settings.DB.database}-audit'
+    env = {'DYNACONF_DB__database': database}
+    c.run(f'invoke db.clone {database}')
+    c.run(f'invoke bench.seed {AUDIT_SEED_OPTIONS}', env=env)
+    c.run(f'invoke db.audit-plans{" --update" if update else ""}', env=env)
+
+
+@task
+def ci(c, n=2):
+    """
+    Run the tests and audit the query plans, as the CI does.
+
+    :param int n:
+        Number of the parallel workers running the tests. Default: ``2``.
+    """
+    test(c, n=n)
+    audit_plans(c)
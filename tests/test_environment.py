@@ -0,0 +1,99 @@
+import os
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fas.environment import Settings, get_settings, reload_settings, settings
+from fas.util.web import get_secure_cookie, set_secure_cookie
+
+
+class FakeDynaconfSettings(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+def create_settings(**kwargs) -> Settings:
+    return Settings.from_dynaconf(FakeDynaconfSettings(ENV_FOR_DYNACONF='Testing', DB={'database': 'fas-t'}, **kwargs))
+
+
+def test_settings():
+    s = create_settings()
+    assert s.env.is_test
+    assert not s.debug
+    assert {'database': 'fas-t'} == s.db
+    assert () == s.cookie_secrets
+    assert 'memory' == s.throttle_backend
+    assert (10000, 10) == (s.operator_cache_size, s.operator_cache_ttl)
+    assert not s.expose_metrics
+    assert () == s.forwarded_allow_ips
+
+    s = create_settings(DEBUG=True, THROTTLE_BACKEND='database', OPERATOR_CACHE_SIZE='100', OPERATOR_CACHE_TTL='1.5',
+                        EXPOSE_METRICS=True)
+    assert s.debug
+    assert s.expose_metrics
+    assert 'database' == s.throttle_backend
+    assert (100, 1.5) == (s.operator_cache_size, s.operator_cache_ttl)
+
+
+def test_settings_files():
+    # only the TOML files are looked for, without the environment variable inherited by the subprocesses
+    assert 'settings.toml,.secrets.toml' == settings.SETTINGS_FILE_FOR_DYNACONF
+    assert 'SETTINGS_FILE_FOR_DYNACONF' not in os.environ
+
+
+def test_settings_immutable():
+    s = create_settings()
+    with pytest.raises(AttributeError):
+        s.debug = True
+    with pytest.raises(TypeError):
+        s.db['database'] = 'fas'
+    with pytest.raises(AttributeError):
+        s.unknown = 1
+    assert not s.debug
+
+
+@pytest.mark.parametrize(('cookie_secret', 'cookie_secrets'), [
+    ('secret', ('secret',)),
+    (['new', 'old'], ('new', 'old')),
+    (None, ()),
+])
+def test_cookie_secrets(cookie_secret, cookie_secrets):
+    assert cookie_secrets == create_settings(COOKIE_SECRET=cookie_secret).cookie_secrets
+
+
+@pytest.mark.parametrize(('ips', 'forwarded_allow_ips'), [
+    ('10.0.0.2, 10.0.0.3', ('10.0.0.2', '10.0.0.3')),
+    (['10.0.0.2'], ('10.0.0.2',)),
+    ('*', ('*',)),
+    ([], ()),
+])
+def test_forwarded_allow_ips(ips, forwarded_allow_ips):
+    assert forwarded_allow_ips == create_settings(FORWARDED_ALLOW_IPS=ips).forwarded_allow_ips
+
+
+def test_reload_settings(monkeypatch, restore_settings):
+    s = get_settings()
+    assert s is get_settings()
+    secret = settings.COOKIE_SECRET
+    assert (secret,) == s.cookie_secrets
+
+    # the cookie helpers see the new secrets at once: the new one signs, the old one still validates
+    response = Response()
+    set_secure_cookie(response, 'key', 'value')
+    monkeypatch.setenv('DYNACONF_COOKIE_SECRET', f'["new", "{secret}"]')
+    s = reload_settings()
+    assert s is get_settings()
+    assert ('new', secret) == s.cookie_secrets
+    assert 'value' == get_secure_cookie(_create_request(response), 'key')
+
+    response = Response()
+    set_secure_cookie(response, 'key', 'value')
+    monkeypatch.setenv('DYNACONF_COOKIE_SECRET', 'old')
+    reload_settings()
+    assert get_secure_cookie(_create_request(response), 'key') is None
+
+
+def _create_request(response: Response) -> Request:
+    cookie = response.headers['set-cookie'].split(';', maxsplit=1)[0]
+    return Request({'type': 'http', 'headers': [(b'cookie', cookie.encode('latin-1'))]})
@@ -0,0 +1,18 @@
+import pytest
+
+
+class Clock:
+    """
+    Clock injected into the code reading the time, which is moved by setting ``now`` instead of by sleeping
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
@@ -0,0 +1,68 @@
+import pytest
+
+from fas.util.database import DBClient, register_query
+from fas.util.database.audit import REGISTERED_QUERIES, PlanAudit, audit_plans, format_plan, find_plan_problems, \
+    import_query_modules
+
+plan = {
+    'Node Type': 'Limit', 'Plan Rows': 1,
+    'Plans': [{
+        'Node Type': 'Sort', 'Plan Rows': 5000, 'Sort Key': ['active DESC'],
+        'Plans': [{
+            'Node Type': 'Seq Scan', 'Relation Name': 'operator', 'Plan Rows': 5000,
+            'Filter': '(organization_id = 1)',
+        }],
+    }],
+}
+
+
+def test_format_plan():
+    assert ['Limit', '  Sort by active DESC', '    Seq Scan on operator'] == format_plan(plan)
+
+
+def test_find_plan_problems():
+    problems = find_plan_problems(plan, {'operator': 10000}, 1000)
+    assert 2 == len(problems)
+    assert ['Sort by active DESC', 'Seq Scan on operator'] == [problem.node for problem in problems]
+    assert str(problems[0]).startswith('Sort of ~5000 rows by active DESC')
+    assert str(problems[1]).startswith('Seq Scan on operator (~10000 rows) filtering (organization_id = 1)')
+    assert [] == find_plan_problems(plan, {'operator': 10000}, 100000)
+
+
+def test_to_snapshot():
+    # the row estimates varying with the data are not recorded, unlike the problem nodes
+    for rows in (10000, 20000):
+        audit = PlanAudit('q', format_plan(plan), find_plan_problems(plan, {'operator': rows}, 1000))
+        assert {'plan': ['Limit', '  Sort by active DESC', '    Seq Scan on operator'],
+                'problems': ['Sort by active DESC', 'Seq Scan on operator']} == audit.to_snapshot()
+
+
+def test_import_query_modules():
+    names = import_query_modules('fas.model')
+    assert {'fas.model', 'fas.model.operator', 'fas.model.organization', 'fas.model.knowledge'} <= set(names)
+    assert {'get_operator_by_id', 'get_organization', 'list_knowledge'} <= set(REGISTERED_QUERIES)
+
+
+@pytest.fixture
+def registered_query():
+    name = 'test_audit_list_organizations_by_name_length'
+    sql = register_query(name, 'SELECT * FROM organization WHERE LENGTH(name)=:length', length=1)
+    yield name, sql
+    del REGISTERED_QUERIES[name]
+
+
+def test_register_query(registered_query):
+    name, sql = registered_query
+    assert 'SELECT * FROM organization WHERE LENGTH(name)=:length' == sql
+    assert sql == register_query(name, sql, length=2)
+    with pytest.raises(Exception):
+        register_query(name, 'SELECT * FROM organization')
+
+
+@pytest.mark.asyncio
+async def test_audit_plans(db: DBClient, registered_query):
+    name, _ = registered_query
+    audits = {audit.name: audit for audit in await audit_plans(db, threshold=0)}
+    assert ['Seq Scan on organization'] == audits[name].plan
+    assert 1 == len(audits[name].problems)
+    assert 'filtering (length(name) = 1)' in str(audits[name].problems[0])
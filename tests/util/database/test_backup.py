@@ -0,0 +1,73 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from fas.environment import ENV, settings
+from fas.util.database.tasks import BACKUP_CHECKSUMS_FILE, _write_backup_checksums, _verify_backup_checksums, \
+    _report_backup_size
+
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    backup_dir = tmp_path / 'fas.dump'
+    backup_dir.mkdir()
+    (backup_dir / 'toc.dat').write_bytes(b'toc')
+    (backup_dir / '3001.dat.gz').write_bytes(b'data' * 1000)
+    _write_backup_checksums(backup_dir)
+    return backup_dir
+
+
+def test_backup_checksums(backup_dir):
+    lines = (backup_dir / BACKUP_CHECKSUMS_FILE).read_text().splitlines()
+    assert ['3001.dat.gz', 'toc.dat'] == [line.split('  ')[1] for line in lines]
+    _verify_backup_checksums(backup_dir)
+
+
+def test_tampered_backup(backup_dir):
+    (backup_dir / '3001.dat.gz').write_bytes(b'data' * 999 + b'date')
+    with pytest.raises(Exception, match='corrupted file in backup .*: 3001.dat.gz'):
+        _verify_backup_checksums(backup_dir)
+
+
+@pytest.mark.parametrize('change', ['missing', 'unexpected', 'no checksums'])
+def test_incomplete_backup(backup_dir, change):
+    if change == 'missing':
+        (backup_dir / 'toc.dat').unlink()
+    elif change == 'unexpected':
+        (backup_dir / '3002.dat.gz').write_bytes(b'data')
+    else:
+        (backup_dir / BACKUP_CHECKSUMS_FILE).unlink()
+    with pytest.raises(Exception, match=change):
+        _verify_backup_checksums(backup_dir)
+
+
+def test_report_backup_size(backup_dir, capsys):
+    output = ''
+    with _report_backup_size(backup_dir, interval=0.01):
+        for _ in range(100):
+            time.sleep(0.05)
+            output += capsys.readouterr().out
+            if output:
+                break
+    assert f'Written 0.0 MiB of backup {backup_dir} in ' in output
+
+
+def test_backup_and_verify(migrate_database, tmp_path):
+    backup_dir = tmp_path / 'fas.dump'
+    _invoke('db.backup', '--to-dir', backup_dir, '--progress-interval', 0.01)
+    assert (backup_dir / 'toc.dat').exists()
+    _invoke('db.verify-backup', '--from-dir', backup_dir)
+
+    toc = (backup_dir / 'toc.dat').read_bytes()
+    (backup_dir / 'toc.dat').write_bytes(toc[:-1] + bytes([toc[-1] ^ 1]))
+    with pytest.raises(subprocess.CalledProcessError):
+        _invoke('db.verify-backup', '--from-dir', backup_dir)
+
+
+def _invoke(*args) -> None:
+    # the database of the pytest-xdist worker is kept, as the database backed up
+    env = {**os.environ, 'ENV_FOR_DYNACONF': settings.ENV_FOR_DYNACONF}
+    subprocess.run(['invoke', *map(str, args)], cwd=ENV.root_dir, env=env, check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
@@ -1,7 +1,11 @@
+import asyncio
+from functools import partial
+
 import pytest
-from dynaconf import settings
 
+from fas.environment import settings
 from fas.util.database import DBPool, DBClient
+from fas.util.database.client import POOL_MODES
 
 
 @pytest.mark.asyncio
@@ -37,3 +41,97 @@ async def test_db_constructor():
     async with DBPool(**settings.DB) as pool:
         async with DBClient(pool) as db:
             assert 1 == await db.get_scalar('SELECT 1::INT')
+
+
+@pytest.mark.asyncio
+async def test_transaction_mode():
+    with pytest.raises(ValueError):
+        DBPool(**settings.DB, mode='statement')
+    async with DBPool(**{**settings.DB, 'mode': 'transaction'}) as pool:
+        assert 'transaction' == pool.mode
+        async with pool.acquire() as db:
+            assert 1 == await db.get_scalar('SELECT 1::INT')
+            assert not db.is_connected
+            async with await db.transaction():
+                assert 1 == await db.get_scalar('SELECT 1::INT')
+                assert db.is_connected
+            assert 2 == await db.get_scalar('SELECT 2::INT')
+            assert not db.is_connected
+
+
+@pytest.mark.asyncio
+async def test_gather():
+    async def sleep_and_get(db: DBClient, value: int):
+        # when the statement started and ended on the server, to tell which queries ran at the same time
+        return await db.get('''
+            SELECT :value::INT AS value, PG_BACKEND_PID() AS pid, STATEMENT_TIMESTAMP() AS started_at,
+                CLOCK_TIMESTAMP() AS ended_at
+            FROM PG_SLEEP(0.1)
+            ''', value=value)
+
+    async with DBPool(**{**settings.DB, 'min_size': 4, 'max_size': 4}) as pool:
+        rows = await pool.gather(lambda db: sleep_and_get(db, 1), lambda db: sleep_and_get(db, 2))
+        assert [1, 2] == [row['value'] for row in rows]
+        assert 2 == len({row['pid'] for row in rows})
+        assert 2 == _count_max_overlapping(rows)
+
+        async with pool.acquire() as db:
+            rows = await db.gather(*(partial(sleep_and_get, value=i) for i in (1, 2, 3)), max_connections=3)
+        assert [1, 2, 3] == [row['value'] for row in rows]
+        assert 2 == _count_max_overlapping(rows)  # fan_out_size is 2
+
+        with pytest.raises(ZeroDivisionError):
+            await pool.gather(lambda db: sleep_and_get(db, 1), lambda db: sleep_and_get(db, 1 // 0))
+
+
+def _count_max_overlapping(rows) -> int:
+    """
+    The most queries running on the server at the same time, by the statements started and ended
+    """
+    return max(sum(1 for other in rows if other['started_at'] <= row['started_at'] < other['ended_at'])
+               for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_add_listener():
+    payloads = asyncio.Queue()
+    async with DBPool(**settings.DB) as pool:
+        await pool.add_listener('test_channel', payloads.put_nowait)
+        async with pool.acquire() as db:
+            await db.execute("SELECT PG_NOTIFY('test_channel', '1')")
+        assert '1' == await asyncio.wait_for(payloads.get(), timeout=3)
+    async with DBPool(mode='transaction', **settings.DB) as pool:
+        with pytest.raises(Exception):
+            await pool.add_listener('test_channel', payloads.put_nowait)
+
+
+@pytest.mark.asyncio
+async def test_release_early():
+    async with DBPool(**settings.DB) as pool:
+        async with pool.acquire() as db:
+            async with await db.transaction():
+                await db.get_scalar('SELECT 1::INT')
+                await db.release_early()
+                assert db.is_connected
+            await db.release_early()
+            assert not db.is_connected
+            await db.release_early()
+            assert 1 == await db.get_scalar('SELECT 1::INT')
+            assert db.is_connected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('mode', POOL_MODES)
+async def test_json_codecs(mode: str):
+    data = {'a': 'ab', 'b': [1, None, True], 'c': {'d': 1.5}, 'e': '中文'}
+    async with DBPool(**{**settings.DB, 'mode': mode}) as pool:
+        async with pool.acquire() as db:
+            for type_ in ('JSON', 'JSONB'):
+                assert data == await db.get_scalar(f'SELECT :data::{type_}', data=data)
+                assert [data, {}] == await db.get_scalar(f"SELECT ARRAY[:data::{type_}, '{{}}']", data=data)
+            async with await db.transaction():
+                await db.execute('CREATE TEMPORARY TABLE json_codecs (j JSON, jb JSONB) ON COMMIT DROP')
+                await db.execute('INSERT INTO json_codecs (j, jb) VALUES (:j, :jb)', j=data, jb=data)
+                assert 1 == await db.copy_records('json_codecs', [(data, data)], columns=('j', 'jb'))
+                rows = await db.list("SELECT j, jb, jb->>'e' AS e FROM json_codecs")
+                assert [(data, data, '中文')] * 2 == [tuple(row.values()) for row in rows]
@@ -1,18 +1,12 @@
+import datetime as dt
+import decimal
+import uuid
+
 import pytest
 
 from fas.model.organization import Organization
-from fas.util.database import DBClient
-
-
-@pytest.mark.asyncio
-@pytest.fixture(autouse=True)
-async def rollback_db(db: DBClient):
-    tr = await db.transaction()
-    await tr.start()
-    try:
-        yield
-    finally:
-        await tr.rollback()
+from fas.util.database import DBClient, InvalidCursorError
+from fas.util.database.interface import _encode_cursor, _decode_cursor
 
 
 @pytest.mark.asyncio
@@ -42,6 +36,18 @@ async def test_executemany(db: DBClient):
     assert await db.get_scalar('SELECT name FROM organization WHERE name=:name', name=new_name2)
 
 
+@pytest.mark.asyncio
+async def test_copy_records(db: DBClient):
+    organization_id = await db.get_scalar("SELECT id FROM organization WHERE name='Org#1'")
+    records = [(organization_id, f'KB#{i}', i % 3 + 1) for i in range(1, 4)]
+    assert 3 == await db.copy_records('knowledge_base', records, columns=('organization_id', 'name', 'target_audience'))
+    knowledge_base_id = await db.get_scalar("SELECT id FROM knowledge_base WHERE name='KB#1'")
+    assert 1 == await db.copy_records('knowledge', [(knowledge_base_id, 'Q#1', 1, {'content': 'A#1'}, ['K#1'])],
+                                      columns=('knowledge_base_id', 'question', 'answer_type', 'answer_content',
+                                               'keywords'))
+    assert {'content': 'A#1'} == await db.get_scalar("SELECT answer_content FROM knowledge WHERE question='Q#1'")
+
+
 @pytest.mark.asyncio
 async def test_exists(db: DBClient):
     assert await db.exists('SELECT name FROM organization WHERE name=:name', name='Org#2') is True
@@ -63,6 +69,53 @@ async def test_list(db: DBClient):
     assert [name1, name2] == [org.name for org in organizations]
 
 
+@pytest.mark.asyncio
+async def test_list_page(db: DBClient):
+    await db.list("INSERT INTO organization (name) VALUES ('Org#3'), ('Org#4'), ('Org#5')")
+    sql = 'SELECT * FROM organization WHERE name LIKE :name_pattern'
+    names = []
+    cursor = None
+    while True:
+        organizations, cursor = await db.list_page(sql, key='name', limit=2, cursor=cursor, to_cls=Organization,
+                                                   name_pattern='Org%')
+        names.append([org.name for org in organizations])
+        if not cursor:
+            break
+    assert [['Org#1', 'Org#2'], ['Org#3', 'Org#4'], ['Org#5']] == names
+
+    rows, cursor = await db.list_page(sql, key=('name', 'id'), limit=3, descending=True, name_pattern='Org%')
+    assert ['Org#5', 'Org#4', 'Org#3'] == [row['name'] for row in rows]
+    rows, cursor = await db.list_page(sql, key=('name', 'id'), limit=3, cursor=cursor, descending=True,
+                                      name_pattern='Org%')
+    assert ['Org#2', 'Org#1'] == [row['name'] for row in rows]
+    assert cursor is None
+
+    for invalid_cursor in ('not-a-cursor', 'WzFd', 'MQ=='):
+        with pytest.raises(InvalidCursorError):
+            await db.list_page(sql, key=('name', 'id'), limit=3, cursor=invalid_cursor, name_pattern='Org%')
+    for invalid_cursor in (_encode_cursor(['a']), _encode_cursor([[1]]), _encode_cursor([{'date': 'x'}]),
+                           _encode_cursor([{'unknown': '1'}])):
+        with pytest.raises(InvalidCursorError):
+            await db.list_page('SELECT * FROM organization', key='id', limit=3, cursor=invalid_cursor)
+
+    # keys of the types not in JSON
+    sql = "SELECT id, DATE '2020-01-01' + id AS day, id::NUMERIC / 2 AS half FROM organization"
+    for key in ('day', 'half'):
+        rows, cursor = await db.list_page(sql, key=key, limit=3)
+        rows_, cursor = await db.list_page(sql, key=key, limit=3, cursor=cursor)
+        assert [row['id'] for row in rows] + [row['id'] for row in rows_] == \
+               [row['id'] for row in await db.list(f'{sql} ORDER BY id')]
+        assert cursor is None
+
+
+def test_encode_cursor():
+    key_values = [1, 'a', None, dt.datetime(2020, 1, 2, 3, 4, 5, tzinfo=dt.timezone.utc), dt.date(2020, 1, 2),
+                  decimal.Decimal('1.5'), uuid.UUID(int=1)]
+    assert key_values == _decode_cursor(_encode_cursor(key_values), len(key_values))
+    with pytest.raises(TypeError):
+        _encode_cursor([object()])
+
+
 @pytest.mark.asyncio
 async def test_list_scalar(db: DBClient):
     name = 'Org#2'
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from fas.environment import settings
+from fas.util.database import DBPool, DBClient, advisory_lock_key, single_flight
+
+lock_name = 'test-lock'
+
+
+def test_advisory_lock_key_is_stable():
+    key = advisory_lock_key(lock_name)
+    assert -2 ** 63 <= key < 2 ** 63
+    assert key == advisory_lock_key(lock_name)
+    assert key != advisory_lock_key(f'{lock_name}-another')
+    assert 123 == advisory_lock_key(123)
+    assert 7419601365373727814 == key  # same in every process, no matter what PYTHONHASHSEED is
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('exclusive', [True, False])
+async def test_session_lock(db: DBClient, exclusive: bool):
+    assert await db.session_lock(lock_name, exclusive=exclusive)
+    try:
+        async with DBPool(**settings.DB) as pool:
+            async with pool.acquire() as another_db:
+                assert (await another_db.try_session_lock(lock_name, exclusive=exclusive)) is not exclusive
+                assert (await another_db.session_lock(lock_name, timeout=0.01)) is False
+                if not exclusive:
+                    assert await another_db.session_unlock(lock_name, exclusive=exclusive)
+    finally:
+        assert await db.session_unlock(lock_name, exclusive=exclusive)
+    assert not await db.session_unlock(lock_name, exclusive=exclusive)
+
+
+@pytest.mark.asyncio
+async def test_transaction_lock(autocommit_db: DBClient):
+    with pytest.raises(Exception):
+        await autocommit_db.transaction_lock(lock_name)
+    async with await autocommit_db.transaction():
+        assert await autocommit_db.transaction_lock(lock_name, timeout=0.01)
+        async with DBPool(**settings.DB) as pool:
+            async with pool.acquire() as another_db:
+                async with await another_db.transaction():
+                    assert (await another_db.transaction_lock(lock_name, timeout=0.01)) is False
+                    assert 1 == await another_db.get_scalar('SELECT 1::INT')  # transaction is still usable
+                    assert '0' == await another_db.get_scalar("SELECT CURRENT_SETTING('lock_timeout')")
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    runs = []
+
+    # the connections are opened before the runs are staggered, which opening a pool per run would delay unevenly
+    async with DBPool(**{**settings.DB, 'min_size': 3, 'max_size': 3}) as pool:
+        async def run(wait: bool, delay: float):
+            async with pool.acquire() as db:
+                await db.get_scalar('SELECT 1::INT')
+                await asyncio.sleep(delay)
+                async with single_flight(db, lock_name, wait=wait) as leader:
+                    if leader:
+                        await asyncio.sleep(0.2)
+                        runs.append('leader')
+                    else:
+                        runs.append('follower')
+
+        await asyncio.gather(run(wait=False, delay=0), run(wait=True, delay=0.1), run(wait=False, delay=0.1))
+    assert ['follower', 'leader', 'follower'] == runs
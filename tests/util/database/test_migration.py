@@ -0,0 +1,115 @@
+import pytest
+
+from fas.util.database import migration
+from fas.util.database.migration import parse_directives, split_statements
+from fas.util.database.tasks import guess_locks
+
+
+def test_parse_directives():
+    directives = parse_directives('''
+        -- add index online
+        -- fas:transactional=false
+        -- fas:lock_timeout=2s
+        -- fas:retries=5
+        CREATE INDEX CONCURRENTLY knowledge_question_idx ON knowledge (question);
+        -- fas:statement_timeout=1s
+        ''')
+    assert directives.transactional is False
+    assert '2s' == directives.lock_timeout
+    assert 5 == directives.retries
+    assert '0' == directives.statement_timeout
+
+
+def test_parse_directives_with_defaults():
+    directives = parse_directives('ALTER TABLE organization ADD COLUMN note TEXT;')
+    assert directives.transactional is True
+    assert '5s' == directives.lock_timeout
+    assert 3 == directives.retries
+
+
+@pytest.mark.parametrize('sql', [
+    '-- fas:transactional=no',
+    '-- fas:retries=-1',
+    '-- fas:lock_timeout=2 seconds',
+    '-- fas:unknown=1',
+    '-- fas:retries=1\n-- fas:retries=2',
+])
+def test_parse_invalid_directives(sql):
+    with pytest.raises(Exception):
+        parse_directives(sql)
+
+
+def test_split_statements():
+    statements = split_statements('''
+        -- fas:lock_timeout=2s
+        CREATE TABLE "a;b" (c TEXT DEFAULT 'it''s; fine');
+        /* block comment; /* nested; */ still comment; */
+        CREATE FUNCTION f() RETURNS TEXT AS $body$ SELECT 'x;y'; $body$ LANGUAGE SQL;
+        CREATE FUNCTION g() RETURNS INT AS $$ SELECT 1; $$ LANGUAGE SQL;
+        SELECT 1 -- comment; not split
+        ;
+        SELECT E'it\\'s; fine', e'\\\\', 'a\\', date'2020-02-29', 'e''; fine';
+        -- trailing comment; not a statement
+        ''')
+    assert 5 == len(statements)
+    assert statements[0].endswith('''CREATE TABLE "a;b" (c TEXT DEFAULT 'it''s; fine');''')
+    assert statements[1].endswith("CREATE FUNCTION f() RETURNS TEXT AS $body$ SELECT 'x;y'; $body$ LANGUAGE SQL;")
+    assert 'CREATE FUNCTION g() RETURNS INT AS $$ SELECT 1; $$ LANGUAGE SQL;' == statements[2]
+    assert statements[3].startswith('SELECT 1')
+    assert r"SELECT E'it\'s; fine', e'\\', 'a\', date'2020-02-29', 'e''; fine';" == statements[4]
+
+
+@pytest.mark.parametrize('sql', ["SELECT 'a", 'SELECT $$a', 'SELECT /* a', r"SELECT E'a\'"])
+def test_split_unterminated_statements(sql):
+    with pytest.raises(Exception):
+        split_statements(sql)
+
+
+@pytest.mark.parametrize('statement, mode, relation', [
+    ('CREATE INDEX CONCURRENTLY IF NOT EXISTS a_idx ON knowledge (question);', 'ShareUpdateExclusiveLock',
+     'knowledge'),
+    ('DROP INDEX CONCURRENTLY a_idx;', 'ShareUpdateExclusiveLock', 'a_idx'),
+    ('VACUUM (ANALYZE) channel_event;', 'ShareUpdateExclusiveLock', 'channel_event'),
+    ('VACUUM FULL channel_event;', 'AccessExclusiveLock', 'channel_event'),
+])
+def test_guess_locks(statement, mode, relation):
+    assert [{'mode': mode, 'relation': relation}] == guess_locks(statement)
+
+
+@pytest.fixture
+def script_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(migration, 'SCRIPT_DIR', tmp_path)
+    (tmp_path / '0001-baseline.sql').write_text('CREATE TABLE a (id INT);')
+    (tmp_path / '0002-more.sql').write_text('CREATE TABLE b (id INT);')
+    migration.lock_scripts()
+    (tmp_path / '0003-not-locked.sql').write_text('CREATE TABLE c (id INT);')
+    return tmp_path
+
+
+def test_load_snapshot(script_dir):
+    assert migration.load_snapshot() is None
+    migration.save_snapshot(1, 'CREATE TABLE a (id INT);')
+    migration.save_snapshot(2, 'CREATE TABLE a (id INT); CREATE TABLE b (id INT);')
+    assert not (script_dir / 'baseline-0001.snapshot').exists()
+    assert (2, 'CREATE TABLE a (id INT); CREATE TABLE b (id INT);') == migration.load_snapshot()
+    assert migration.load_snapshot(to_version=1) is None
+
+
+@pytest.mark.parametrize('changed_path, content', [
+    ('baseline-0002.snapshot', 'CREATE TABLE changed (id INT);'),
+    ('0001-baseline.sql', 'CREATE TABLE changed (id INT);'),
+    ('0002-more.locked', 'changed'),
+])
+def test_load_changed_snapshot(script_dir, changed_path, content):
+    migration.save_snapshot(2, 'CREATE TABLE a (id INT); CREATE TABLE b (id INT);')
+    (script_dir / changed_path).write_text(content)
+    with pytest.raises(Exception):
+        migration.load_snapshot()
+
+
+def test_check_scripts_locked(script_dir):
+    migration.check_scripts_locked(to_version=2)
+    with pytest.raises(Exception):
+        migration.check_scripts_locked(to_version=3)
+    with pytest.raises(Exception):
+        migration.check_scripts_locked(to_version=4)
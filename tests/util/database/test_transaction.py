@@ -1,47 +1,47 @@
 from typing import Any
 
 import pytest
-from dynaconf import settings
 
+from fas.environment import settings
 from fas.util.database import DBPool, DBClient, transactional
 
 
 @pytest.mark.asyncio
-async def test_transaction_async_with(db: DBClient):
-    async with await db.transaction():
-        await _func(db)
-    await verify_committed(db)
+async def test_transaction_async_with(autocommit_db: DBClient):
+    async with await autocommit_db.transaction():
+        await _func(autocommit_db)
+    await verify_committed(autocommit_db)
 
     with pytest.raises(Exception):
-        async with await db.transaction():
-            await _func(db, raise_exception=True)
-    await verify_rolled_back(db)
+        async with await autocommit_db.transaction():
+            await _func(autocommit_db, raise_exception=True)
+    await verify_rolled_back(autocommit_db)
 
 
 @pytest.mark.asyncio
-async def test_transaction_await(db: DBClient):
-    tr = await db.transaction()
+async def test_transaction_await(autocommit_db: DBClient):
+    tr = await autocommit_db.transaction()
 
     await tr.start()
     try:
-        await _func(db)
+        await _func(autocommit_db)
     except Exception:
         await tr.rollback()
         raise
     else:
         await tr.commit()
-    await verify_committed(db)
+    await verify_committed(autocommit_db)
 
     with pytest.raises(Exception):
         await tr.start()
         try:
-            await _func(db, raise_exception=True)
+            await _func(autocommit_db, raise_exception=True)
         except Exception:
             await tr.rollback()
             raise
         else:
             await tr.commit()
-    await verify_rolled_back(db)
+    await verify_rolled_back(autocommit_db)
 
 
 @pytest.mark.asyncio
@@ -105,6 +105,6 @@ async def test_try_transaction_lock(db: DBClient, exclusive: bool):
 
 
 @pytest.mark.asyncio
-async def test_try_transaction_lock_raise_exception_while_not_in_transaction(db: DBClient):
+async def test_try_transaction_lock_raise_exception_while_not_in_transaction(autocommit_db: DBClient):
     with pytest.raises(Exception):
-        await db.try_transaction_lock(lock_key)
+        await autocommit_db.try_transaction_lock(lock_key)
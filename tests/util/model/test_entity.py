@@ -0,0 +1,56 @@
+import sys
+
+import pytest
+
+from fas.model.organization import Organization
+from fas.util.model import ReadModel, read_model
+
+OrganizationReadModel = read_model(Organization)
+
+
+def test_read_model_class():
+    assert OrganizationReadModel is read_model(Organization)
+    assert issubclass(OrganizationReadModel, ReadModel)
+    assert ('id', 'name') == OrganizationReadModel.__slots__
+
+
+def test_read_model_attributes():
+    org = OrganizationReadModel(id=1, name='Org#1')
+    assert 1 == org.id
+    assert 'Org#1' == org['name']
+    assert {'id': 1, 'name': 'Org#1'} == dict(org)
+    assert Organization(id=1, name='Org#1') == org.to_entity()
+    assert not hasattr(org, '__dict__')
+    with pytest.raises(AttributeError):
+        org.name = 'Org#2'
+    with pytest.raises(AttributeError):
+        del org.name
+
+
+def test_read_model_defaults():
+    org = OrganizationReadModel(name='Org#1')
+    assert 0 == org.id
+    assert not org.identifiable
+    assert ['name'] == list(org.keys())
+    with pytest.raises(TypeError):
+        OrganizationReadModel(id=1)
+
+
+def test_read_model_eq_and_hash():
+    assert OrganizationReadModel(id=1, name='Org#1') == OrganizationReadModel(id=1, name='Org#2')
+    assert OrganizationReadModel(id=1, name='Org#1') != OrganizationReadModel(id=2, name='Org#1')
+    assert OrganizationReadModel(name='Org#1') == OrganizationReadModel(name='Org#1')
+    assert OrganizationReadModel(name='Org#1') != OrganizationReadModel(name='Org#2')
+    assert 2 == len({OrganizationReadModel(id=1, name='Org#1'), OrganizationReadModel(id=1, name='Org#1'),
+                     OrganizationReadModel(id=2, name='Org#2')})
+
+
+def test_read_model_memory():
+    org = Organization(id=1, name='Org#1')
+    assert sys.getsizeof(OrganizationReadModel(id=1, name='Org#1')) < sys.getsizeof(org) + sys.getsizeof(org.__dict__)
+
+
+def test_entity_hash():
+    assert hash(Organization(id=1, name='Org#1')) == hash(Organization(id=1, name='Org#2'))
+    assert 2 == len({Organization(id=1, name='Org#1'), Organization(id=1, name='Org#1'),
+                     Organization(id=2, name='Org#2')})
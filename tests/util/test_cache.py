@@ -0,0 +1,29 @@
+from fas.util.cache import TTLCache
+
+
+def test_ttl_cache(clock):
+    cache = TTLCache(max_size=2, ttl=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert 1 == cache.get('a')
+    cache.set('c', 3)  # b is evicted as the least recently used
+    assert cache.get('b') is None
+    assert 3 == cache.get('c')
+    clock.now = 10
+    assert cache.get('a') is None
+    assert 0 == cache.get('c', 0)
+    assert 0 == len(cache)
+    assert (2, 3) == (cache.hits, cache.misses)
+
+
+def test_ttl_cache_invalidation():
+    cache = TTLCache()
+    cache.set('a', 1)
+    generation = cache.generation
+    cache.delete('a')
+    cache.set('a', 2, generation=generation)  # loaded before the deletion
+    assert cache.get('a') is None
+    cache.set('a', 3, generation=cache.generation)
+    assert 3 == cache.get('a')
+    cache.clear()
+    assert cache.get('a') is None
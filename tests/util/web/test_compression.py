@@ -0,0 +1,101 @@
+from starlette.responses import Response, StreamingResponse, PlainTextResponse
+from starlette.testclient import TestClient
+
+from fas.util.web import CompressionMiddleware
+from fas.util.web.compression import negotiate_encoding
+
+BODY = 'Hello, world! ' * 100
+
+
+def create_client(response_factory, **kwargs) -> TestClient:
+    async def app(scope, receive, send):
+        await response_factory()(scope, receive, send)
+
+    return TestClient(CompressionMiddleware(app, **kwargs))
+
+
+def get(client: TestClient, accept_encoding: str = 'gzip', **kwargs):
+    # the gzip body is decoded by the test client
+    response = client.get('/', headers={'Accept-Encoding': accept_encoding}, **kwargs)
+    return response, response.content
+
+
+def test_negotiate_encoding():
+    assert 'gzip' == negotiate_encoding('gzip', ('gzip',))
+    assert 'gzip' == negotiate_encoding('deflate, gzip;q=0.5', ('gzip',))
+    assert 'gzip' == negotiate_encoding('*', ('gzip',))
+    assert negotiate_encoding('gzip;q=0', ('gzip',)) is None
+    assert negotiate_encoding('*;q=0', ('gzip',)) is None
+    assert negotiate_encoding('identity', ('gzip',)) is None
+    assert 'br' == negotiate_encoding('gzip, br', ('br', 'zstd', 'gzip'))
+    assert 'gzip' == negotiate_encoding('gzip, br;q=0.8', ('br', 'zstd', 'gzip'))
+    assert 'zstd' == negotiate_encoding('zstd, gzip', ('br', 'zstd', 'gzip'))
+
+
+def test_compress():
+    client = create_client(lambda: PlainTextResponse(BODY, headers={'Vary': 'Cookie'}))
+    response, body = get(client)
+    assert 'gzip' == response.headers['content-encoding']
+    assert 'Cookie, Accept-Encoding' == response.headers['vary']
+    assert int(response.headers['content-length']) < len(BODY) / 10
+    assert BODY == body.decode()
+
+    response, body = get(client, accept_encoding='identity')
+    assert 'content-encoding' not in response.headers
+    assert BODY == body.decode()
+
+
+def test_not_compressed():
+    response, body = get(create_client(lambda: PlainTextResponse('Hello, world!')))
+    assert 'content-encoding' not in response.headers
+    assert b'Hello, world!' == body
+
+    response, body = get(create_client(lambda: Response(BODY, media_type='image/png')))
+    assert 'content-encoding' not in response.headers
+    assert BODY == body.decode()
+
+    response, body = get(create_client(lambda: PlainTextResponse(BODY, headers={'Cache-Control': 'no-transform'})))
+    assert 'content-encoding' not in response.headers
+    assert BODY == body.decode()
+
+    response, body = get(create_client(lambda: Response(status_code=204)))
+    assert 'content-encoding' not in response.headers
+
+
+def test_compress_stream():
+    async def iter_lines():
+        for i in range(1000):
+            yield f'{i},{BODY}\n'
+
+    client = create_client(lambda: StreamingResponse(iter_lines(), media_type='text/csv'))
+    response, body = get(client)
+    assert 'gzip' == response.headers['content-encoding']
+    assert 'content-length' not in response.headers
+    assert ''.join(f'{i},{BODY}\n' for i in range(1000)) == body.decode()
+
+
+def test_cache():
+    responses = []
+
+    def create_response():
+        etag = f'"{len(responses) // 2}"'  # changed every two responses
+        responses.append(etag)
+        return PlainTextResponse(BODY, headers={'ETag': etag})
+
+    client = create_client(create_response)
+    cache = client.app.cache
+    response, body = get(client)
+    assert 'W/"0"' == response.headers['etag']
+    assert BODY == body.decode()
+    assert (0, 1) == (cache.hits, len(cache))
+    response, body = get(client)
+    assert 'W/"0"' == response.headers['etag']
+    assert BODY == body.decode()
+    assert (1, 1) == (cache.hits, len(cache))
+    response, body = get(client)
+    assert 'W/"1"' == response.headers['etag']
+    assert (1, 2) == (cache.hits, len(cache))
+    get(client, params={'q': 1})
+    assert (1, 3) == (cache.hits, len(cache))
+    client.post('/', headers={'Accept-Encoding': 'gzip'})
+    assert (1, 3) == (cache.hits, len(cache))
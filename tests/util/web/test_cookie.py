@@ -1,4 +1,7 @@
+import email.utils
+import http.cookies
 import time
+from datetime import datetime, timedelta
 from typing import Callable, Union
 
 import pytest
@@ -7,6 +10,7 @@ from starlette.responses import Response
 from starlette.testclient import TestClient
 
 from fas.util.web import get_cookie, set_cookie, get_secure_cookie, set_secure_cookie, delete_cookie, delete_all_cookies
+from fas.util.web.cookie import format_http_timestamp
 from . import present, past
 
 
@@ -145,3 +149,68 @@ def test_delete_all_cookies():
     response = client.get('/')
     assert not response.cookies.get('mycookie1')
     assert not response.cookies.get('mycookie2')
+
+
+NOW = 1582934399.5  # the time frozen while setting the cookies expiring in days
+
+
+def simple_cookie_header(name, value, *, domain=None, path='/', expires=None, expires_days=None, max_age=None,
+                         secure=False, httponly=True, samesite='Lax') -> bytes:
+    """
+    The header built by http.cookies.SimpleCookie, which set_cookie should build the same
+    """
+    cookie = http.cookies.SimpleCookie()
+    cookie[name] = value
+    morsel = cookie[name]
+    if domain:
+        morsel['domain'] = domain
+    if path:
+        morsel['path'] = path
+    if expires_days is not None and not expires:
+        expires = datetime.utcfromtimestamp(NOW) + timedelta(days=expires_days)
+    if expires:
+        morsel['expires'] = format_http_timestamp(expires)
+    if max_age is not None:
+        morsel['max-age'] = max_age
+    parts = [cookie.output(header='').strip()]
+    if secure:
+        parts.append('Secure')
+    if httponly:
+        parts.append('HttpOnly')
+    if samesite:
+        parts.append(f'SameSite={http.cookies._quote(samesite)}')
+    return '; '.join(parts).encode('latin-1')
+
+
+@pytest.mark.parametrize('value', ['', 'value', 'va l', 'Hello, "cookies"!', '\\', '\u00e9', 'a;b'])
+@pytest.mark.parametrize('options', [
+    {}, {'domain': 'example.com', 'path': '/api'}, {'path': None, 'samesite': None, 'httponly': False},
+    {'secure': True, 'samesite': 'Strict'}, {'expires_days': 30}, {'expires_days': -365, 'max_age': 0},
+    {'expires': 1359312200.9, 'max_age': 3600}, {'expires': datetime(2020, 2, 29, 23, 59, 59), 'path': '/a '},
+    {'expires': time.gmtime(1359312200), 'samesite': 'a b'}])
+def test_set_cookie_header(value: str, options: dict, monkeypatch):
+    monkeypatch.setattr(time, 'time_ns', lambda: int(NOW * 1000000000))
+    response = Response()
+    set_cookie(response, 'key', value, **options)
+    assert [(b'set-cookie', simple_cookie_header('key', value, **options))] == response.raw_headers
+
+
+@pytest.mark.parametrize('name', ['path', 'Expires', 'max_age_', 'ключ'])
+def test_cookie_name_rejected_by_simple_cookie(name: str):
+    try:
+        http.cookies.SimpleCookie()[name] = 'value'
+        expected = None
+    except http.cookies.CookieError as e:
+        expected = str(e)
+    response = Response()
+    if expected is None:
+        set_cookie(response, name, 'value')
+    else:
+        with pytest.raises(http.cookies.CookieError) as e:
+            set_cookie(response, name, 'value')
+        assert expected == str(e.value)
+
+
+def test_format_http_timestamp():
+    for ts in (0, 1359312200, 1359312200.5, 1582934399, 2000000000):
+        assert email.utils.formatdate(ts, usegmt=True) == format_http_timestamp(ts)
@@ -0,0 +1,36 @@
+from starlette.responses import PlainTextResponse
+
+from fas.util.web import make_etag, etag_matches, set_etag, not_modified_response
+
+
+def test_make_etag():
+    etag = make_etag('organization', 1, '123')
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag('organization', 1, '123')
+    assert etag != make_etag('organization', 1, '124')
+    assert etag != make_etag('organization', 11, '23')
+
+
+def test_etag_matches():
+    etag = make_etag('organization', 1, '123')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'W/{etag}', etag)
+    assert etag_matches(etag, f'W/{etag}')
+    assert etag_matches(f'"x", W/{etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('', etag)
+    assert not etag_matches('"x"', etag)
+    assert not etag_matches('"x", W/"y"', etag)
+
+
+def test_not_modified_response():
+    etag = make_etag('organization', 1, '123')
+    response = not_modified_response(etag)
+    assert 304 == response.status_code
+    assert b'' == response.body
+    assert etag == response.headers['etag']
+    assert 'private, no-cache' == response.headers['cache-control']
+    assert 'content-length' not in response.headers
+
+    response = set_etag(PlainTextResponse('Hello, world!'), etag)
+    assert etag == response.headers['etag']
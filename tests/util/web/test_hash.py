@@ -1,7 +1,24 @@
-from fas.util.web import hash_password, verify_password
+import pytest
+from argon2 import PasswordHasher
+
+from fas.util.web import hash_password, verify_password, password_needs_rehash, hash_password_async, \
+    verify_password_async
 
 
 def test_hash_password():
     assert verify_password(hash_password('pass1'), 'pass1')
     assert not verify_password(hash_password('pass1'), 'pass2')
     assert not verify_password(hash_password('pass2'), 'pass1')
+
+
+@pytest.mark.asyncio
+async def test_hash_password_async():
+    assert await verify_password_async(await hash_password_async('pass1'), 'pass1')
+    assert not await verify_password_async(await hash_password_async('pass1'), 'pass2')
+    assert not await verify_password_async('invalid', 'pass1')
+
+
+def test_password_needs_rehash():
+    assert not password_needs_rehash(hash_password('pass1'))
+    assert password_needs_rehash(PasswordHasher(time_cost=1).hash('pass1'))
+    assert password_needs_rehash('invalid')
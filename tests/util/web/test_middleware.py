@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.testclient import TestClient
+
+from fas.environment import settings
+from fas.util.database import DBPool
+from fas.util.web import DBMiddleware, HeadersMiddleware
+
+
+def test_headers_middleware():
+    async def app(scope, receive, send):
+        response = Response('Hello, world!', media_type='text/plain', headers={'X-Frame-Options': 'ALLOW'})
+        await response(scope, receive, send)
+
+    client = TestClient(HeadersMiddleware(app, headers={'X-Content-Type-Options': 'nosniff',
+                                                        'X-Frame-Options': 'DENY'}))
+    response = client.get('/')
+    assert 'nosniff' == response.headers['x-content-type-options']
+    assert 'DENY' == response.headers['x-frame-options']
+
+
+@pytest.fixture
+def pool(migrate_database):
+    loop = asyncio.get_event_loop()  # where the test client runs the app
+    pool = DBPool(**settings.DB)
+    loop.run_until_complete(pool.open())
+    yield pool
+    loop.run_until_complete(pool.close())
+
+
+def test_db_middleware(pool: DBPool):
+    clients = []
+
+    async def app(scope, receive, send):
+        request = Request(scope, receive)
+        db = request.state.db
+        clients.append(db)
+        if request.url.path == '/lazy':
+            response = Response(str(db.is_connected))
+        elif request.url.path == '/stream':
+            await db.get_scalar('SELECT 1')
+
+            async def numbers():
+                yield str(db.is_connected)  # released when the response started
+                for i in range(3):
+                    yield str(await db.get_scalar('SELECT :i::INT', i=i))
+
+            response = StreamingResponse(numbers())
+        else:
+            await db.get_scalar('SELECT 1')
+            raise Exception('failed')
+        await response(scope, receive, send)
+
+    client = TestClient(DBMiddleware(app, pool=pool))
+    assert 'False' == client.get('/lazy').text
+    assert 'False012' == client.get('/stream').text
+    with pytest.raises(Exception):
+        client.get('/failed')
+    assert 3 == len(clients)
+    assert not any(db.is_connected for db in clients)
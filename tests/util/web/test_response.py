@@ -0,0 +1,57 @@
+import datetime as dt
+import json
+from typing import List
+
+from fastapi import FastAPI
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+
+from fas.model.organization import Organization
+from fas.util.model import read_model
+from fas.util.web import EntityJSONResponse, entity_response
+
+app = FastAPI()
+
+
+@app.get('/organizations', response_model=List[Organization])
+@entity_response
+async def list_organizations(name: str = 'Org'):
+    return [Organization(id=1, name=f'{name}#1'), read_model(Organization)(id=2, name=f'{name}#2')]
+
+
+@app.get('/sync', response_model=List[Organization])
+@entity_response
+def list_organizations_sync():
+    return [Organization(id=1, name='组织')]
+
+
+@app.get('/passthrough', response_model=List[Organization])
+@entity_response
+async def passthrough():
+    return PlainTextResponse('hello')
+
+
+client = TestClient(app)
+
+
+def test_entity_response():
+    response = client.get('/organizations', params={'name': 'O'})
+    assert 200 == response.status_code
+    assert 'application/json' == response.headers['content-type']
+    assert b'[{"id":1,"name":"O#1"},{"id":2,"name":"O#2"}]' == response.content
+
+    assert [{'id': 1, 'name': '组织'}] == client.get('/sync').json()
+    assert 'hello' == client.get('/passthrough').text
+
+
+def test_openapi_schema_kept():
+    schema = client.get('/openapi.json').json()
+    operation = schema['paths']['/organizations']['get']
+    assert 'name' == operation['parameters'][0]['name']
+    assert '#/components/schemas/Organization' == \
+           operation['responses']['200']['content']['application/json']['schema']['items']['$ref']
+
+
+def test_render_non_json_types():
+    content = {'at': dt.datetime(2020, 1, 2, 3, 4, 5), 'tags': {'a'}}
+    assert {'at': '2020-01-02T03:04:05', 'tags': ['a']} == json.loads(EntityJSONResponse(content).body)
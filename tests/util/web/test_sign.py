@@ -70,3 +70,23 @@ def test_non_ascii():
     signed = create_signed_value(SECRET, value)
     decoded = decode_signed_value(SECRET, signed)
     assert value == decoded
+
+
+def test_secret_rotation():
+    old_signed = create_signed_value(SECRET, 'value', with_timestamp=True)
+    secrets = ['new secret', SECRET]
+    new_signed = create_signed_value(secrets, 'value', with_timestamp=True)
+    assert new_signed == create_signed_value('new secret', 'value', with_timestamp=True)
+    assert b'value' == decode_signed_value(secrets, old_signed)
+    assert b'value' == decode_signed_value(secrets, new_signed)
+    assert decode_signed_value(SECRET, new_signed) is None
+    assert decode_signed_value(['new secret'], old_signed) is None
+
+
+def test_verified_value_expired(monkeypatch):
+    signed = create_signed_value(SECRET, 'value', with_timestamp=True)
+    assert b'value' == decode_signed_value(SECRET, signed, max_age_days=1)
+    monkeypatch.setattr(time, 'time', lambda: present() + 86400 * 2)
+    # verified before, but expired now
+    assert decode_signed_value(SECRET, signed, max_age_days=1) is None
+    assert b'value' == decode_signed_value(SECRET, signed)
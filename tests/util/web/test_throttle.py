@@ -0,0 +1,41 @@
+import pytest
+
+from fas.util.database import DBClient
+from fas.util.web import format_throttle_metrics
+from fas.util.web.throttle import Throttle, MemoryThrottle, DBThrottle
+
+
+def test_abstract_throttle():
+    with pytest.raises(TypeError):
+        Throttle('test_abstract', rate=1, burst=1)
+
+
+@pytest.mark.asyncio
+async def test_memory_throttle(clock):
+    throttle = MemoryThrottle('test_memory', rate=0.5, burst=2, max_keys=2, clock=clock)
+    assert 0 == await throttle.consume('a')
+    assert 0 == await throttle.consume('a')
+    assert 2 == await throttle.consume('a')
+    assert 0 == await throttle.consume('b')
+    clock.now = 1
+    assert 1 == await throttle.consume('a')
+    clock.now = 2
+    assert 0 == await throttle.consume('a')
+    assert 2 == await throttle.consume('a')
+    await throttle.consume('c')  # b is dropped as the least recently used
+    assert 0 == await throttle.consume('b')
+    assert 0 == await throttle.consume('b')
+    assert (7, 3) == (throttle.allowed_count, throttle.rejected_count)
+    assert 'fas_throttle_attempts_total{throttle="test_memory",result="rejected"} 3\n' in format_throttle_metrics()
+
+
+@pytest.mark.asyncio
+async def test_db_throttle(db: DBClient):
+    throttle = DBThrottle('test_db', rate=0.001, burst=2)
+    assert 0 == await throttle.consume('a', db=db)
+    assert 0 == await throttle.consume('a', db=db)
+    assert 900 < await throttle.consume('a', db=db) <= 1000
+    assert 0 == await throttle.consume('b', db=db)
+    assert 2 == await db.get_scalar("SELECT COUNT(*) FROM throttle_bucket WHERE throttle='test_db'")
+    with pytest.raises(Exception):
+        await throttle.consume('a')